@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 
-from .models import CustomUser, OTPVerification
+from .models import CustomUser, EmailOutbox, OTPVerification
 
 
 # ───────────────────  CustomUser admin  ──────────────────────
@@ -54,3 +54,11 @@ class OTPVerificationAdmin(admin.ModelAdmin):
     list_filter = ("is_used", "created_at")
     search_fields = ("user__email", "otp_code")
     readonly_fields = ("created_at", "is_expired")
+
+
+# ───────────────────  Outbox admin  ──────────────────────────
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ("recipient", "subject", "created_at", "available_at", "attempts")
+    search_fields = ("recipient", "subject")
+    readonly_fields = ("created_at",)
@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
 
 
 class AuthenticationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'authentication'
+
+    def ready(self):
+        from . import user_cache
+
+        post_save.connect(user_cache.user_changed, sender=get_user_model())
+        post_delete.connect(user_cache.user_changed, sender=get_user_model())
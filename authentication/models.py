@@ -64,4 +64,21 @@ class OTPVerification(models.Model):
                 if not OTPVerification.objects.filter(user=self.user, otp_code=code, is_used=False).exists():
                     self.otp_code = code
                     break
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+class EmailOutbox(models.Model):
+    # Messages written alongside the rows that need them and delivered by the
+    # send_outbox Celery task, so requests never wait on SMTP.
+    recipient = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    available_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True, default="")
+
+    class Meta:
+        indexes = [models.Index(fields=["available_at", "id"])]
+
+    def __str__(self):
+        return f"{self.subject} to {self.recipient}"
@@ -0,0 +1,117 @@
+import hashlib
+import hmac
+import secrets
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from django_redis import get_redis_connection
+
+from .models import OTPVerification
+
+# One-time e-mail verification codes. settings.OTP_BACKEND picks where they
+# live: RedisOTPBackend keeps a keyed hash of the current code per address,
+# expiring on its own, and verifies and consumes it in one round trip;
+# DatabaseOTPBackend keeps the OTPVerification rows as before.
+VERIFIED, INVALID, EXPIRED, LOCKED = "verified", "invalid", "expired", "locked"
+
+
+def get_backend():
+    return import_string(settings.OTP_BACKEND)()
+
+
+class BaseOTPBackend:
+    def issue(self, user) -> str:
+        """Replace any outstanding code for ``user`` and return a new one."""
+        raise NotImplementedError
+
+    def verify(self, email: str, code: str) -> str:
+        """Check ``code`` for ``email`` and consume it if it matches. Returns
+        VERIFIED, INVALID, EXPIRED or LOCKED (too many wrong codes)."""
+        raise NotImplementedError
+
+    def last_issued(self, email: str) -> datetime | None:
+        raise NotImplementedError
+
+
+class DatabaseOTPBackend(BaseOTPBackend):
+    def issue(self, user) -> str:
+        OTPVerification.objects.filter(user=user, is_used=False).update(is_used=True)
+        return OTPVerification.objects.create(user=user).otp_code
+
+    def verify(self, email: str, code: str) -> str:
+        otp = (
+            OTPVerification.objects.filter(user__email__iexact=email, otp_code=code, is_used=False)
+            .order_by("-created_at")
+            .first()
+        )
+        if otp is None:
+            return INVALID
+        if otp.is_expired:
+            return EXPIRED
+        otp.is_used = True
+        otp.save(update_fields=["is_used"])
+        return VERIFIED
+
+    def last_issued(self, email: str) -> datetime | None:
+        latest = OTPVerification.objects.filter(user__email__iexact=email).order_by("-created_at").first()
+        return latest.created_at if latest else None
+
+
+class RedisOTPBackend(BaseOTPBackend):
+    CODE_KEY = "otp:code:{email}"
+    ATTEMPTS_KEY = "otp:attempts:{email}"
+
+    # Wrong guesses are counted per address over OTP_TTL whichever code they
+    # were aimed at, so asking for new codes does not reset the limit.
+    VERIFY_SCRIPT = """
+    local stored = redis.call('HGET', KEYS[1], 'digest')
+    if not stored then
+        return 'expired'
+    end
+    local attempts = tonumber(redis.call('GET', KEYS[2]) or '0')
+    if attempts >= tonumber(ARGV[2]) then
+        return 'locked'
+    end
+    if stored ~= ARGV[1] then
+        if redis.call('INCR', KEYS[2]) == 1 then
+            redis.call('EXPIRE', KEYS[2], ARGV[3])
+        end
+        return 'invalid'
+    end
+    redis.call('DEL', KEYS[1], KEYS[2])
+    return 'verified'
+    """
+
+    def __init__(self):
+        self.redis = get_redis_connection(settings.OTP_REDIS_ALIAS)
+
+    def _keys(self, email):
+        email = email.lower()
+        return self.CODE_KEY.format(email=email), self.ATTEMPTS_KEY.format(email=email)
+
+    def _digest(self, email, code):
+        message = f"{email.lower()}:{code}".encode()
+        return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+    def issue(self, user) -> str:
+        code = f"{secrets.randbelow(900000) + 100000}"
+        key, _ = self._keys(user.email)
+        pipe = self.redis.pipeline()
+        pipe.delete(key)
+        pipe.hset(key, mapping={"digest": self._digest(user.email, code), "issued": time.time()})
+        pipe.expire(key, settings.OTP_TTL)
+        pipe.execute()
+        return code
+
+    def verify(self, email: str, code: str) -> str:
+        result = self.redis.register_script(self.VERIFY_SCRIPT)(
+            keys=self._keys(email),
+            args=[self._digest(email, code), settings.OTP_MAX_ATTEMPTS, settings.OTP_TTL],
+        )
+        return result.decode()
+
+    def last_issued(self, email: str) -> datetime | None:
+        issued = self.redis.hget(self._keys(email)[0], "issued")
+        return datetime.fromtimestamp(float(issued), tz=dt_timezone.utc) if issued else None
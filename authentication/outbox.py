@@ -0,0 +1,111 @@
+import logging
+import smtplib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+# Each worker process keeps a small pool of mail connections open between
+# batches instead of paying a connect, TLS and login round trip per message,
+# and spreads each batch over them since every message costs several SMTP
+# round trips.
+_pool = []
+
+
+def enqueue(recipient: str, subject: str, body: str) -> EmailOutbox:
+    """Queue a message; it is handed to a worker once the transaction commits."""
+    from .tasks import send_outbox
+
+    email = EmailOutbox.objects.create(recipient=recipient, subject=subject, body=body)
+    # The row is already committed when this runs; if the broker is down the
+    # error is logged and the beat task sends the message instead.
+    transaction.on_commit(send_outbox.delay, robust=True)
+    return email
+
+
+def _get_connection(slot: int):
+    while len(_pool) <= slot:
+        _pool.append(get_connection(fail_silently=False))
+    connection = _pool[slot]
+    connection.open()  # no-op while the connection is up
+    return connection
+
+
+def _send(connection, message: EmailMessage) -> None:
+    try:
+        connection.send_messages([message])
+    except smtplib.SMTPServerDisconnected:
+        # The server dropped the idle connection; reconnect once.
+        connection.close()
+        connection.open()
+        connection.send_messages([message])
+
+
+def _send_slice(slot: int, emails: list) -> dict:
+    # Runs on its own thread and connection; returns {pk: error} for failures.
+    failures = {}
+    try:
+        connection = _get_connection(slot)
+    except (smtplib.SMTPException, OSError) as exc:
+        return dict.fromkeys((email.pk for email in emails), exc)
+    for email in emails:
+        try:
+            _send(connection, EmailMessage(email.subject, email.body, None, [email.recipient]))
+        except (smtplib.SMTPException, OSError) as exc:
+            failures[email.pk] = exc
+    return failures
+
+
+def _claim(batch_size: int) -> list:
+    # Leasing the rows keeps concurrent workers from sending them twice; a
+    # worker that dies mid-batch leaves them to be retried after the lease.
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True)
+            .filter(available_at__lte=now, attempts__lt=settings.EMAIL_OUTBOX_MAX_ATTEMPTS)
+            .order_by("available_at", "id")[:batch_size]
+        )
+        EmailOutbox.objects.filter(pk__in=[email.pk for email in batch]).update(
+            available_at=now + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE)
+        )
+    return batch
+
+
+def send_pending(batch_size: int | None = None) -> int:
+    """Deliver queued messages a batch at a time over the pooled connections;
+    returns the number sent."""
+    batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+    sent = 0
+    while True:
+        batch = _claim(batch_size)
+        if not batch:
+            return sent
+
+        slots = min(settings.EMAIL_OUTBOX_CONNECTIONS, len(batch))
+        failures = {}
+        with ThreadPoolExecutor(slots) as executor:
+            for result in executor.map(_send_slice, range(slots), (batch[i::slots] for i in range(slots))):
+                failures.update(result)
+
+        for pk, exc in failures.items():
+            logger.warning("Sending outbox message %s failed: %s", pk, exc)
+            EmailOutbox.objects.filter(pk=pk).update(
+                attempts=F("attempts") + 1,
+                last_error=str(exc),
+                available_at=timezone.now() + timedelta(seconds=settings.EMAIL_OUTBOX_RETRY_DELAY),
+            )
+        delivered = [email.pk for email in batch if email.pk not in failures]
+        EmailOutbox.objects.filter(pk__in=delivered).delete()
+        sent += len(delivered)
+        if not delivered:
+            # Nothing got through; leave the rest for the next run.
+            return sent
@@ -1,27 +1,34 @@
 from datetime import timedelta
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.mail import send_mail
+from django.db import transaction
 from django.utils import timezone
 from rest_framework import serializers
 
-from .models import OTPVerification
+from . import otp, outbox
 
 User = get_user_model()
 
 
 # ────────────────  helpers  ──────────────────────────────────
 def _send_otp_email(email: str, otp_code: str) -> None:
+    # Queued, not sent: a Celery worker delivers it after the commit.
     subject = "Your verification code"
     message = f"Use the following OTP to verify your e‑mail: {otp_code}"
-    send_mail(subject, message, None, [email], fail_silently=False)
+    outbox.enqueue(email, subject, message)
 
 
-def _create_and_email_otp(user: User) -> OTPVerification:
-    OTPVerification.objects.filter(user=user, is_used=False).update(is_used=True)
-    otp = OTPVerification.objects.create(user=user)
-    _send_otp_email(user.email, otp.otp_code)
-    return otp
+def _find_user(email: str) -> User | None:
+    # normalize_email() keeps the local part's case, so match any case.
+    return User.objects.filter(email__iexact=email).order_by("id").first()
+
+
+def _create_and_email_otp(user: User) -> str:
+    with transaction.atomic():
+        otp_code = otp.get_backend().issue(user)
+        _send_otp_email(user.email, otp_code)
+    return otp_code
 
 
 # ────────────────  serializers  ──────────────────────────────
@@ -46,35 +53,22 @@ class VerifyOTPSerializer(serializers.Serializer):
     otp_code = serializers.CharField(max_length=6)
 
     def validate(self, attrs):
-        email = attrs["email"].lower()
-        otp_code = attrs["otp_code"]
-
-        try:
-            user = User.objects.get(email=email)
-        except User.DoesNotExist:
+        # Looked up first: the backend consumes a matching code.
+        attrs["user"] = _find_user(attrs["email"])
+        if attrs["user"] is None:
             raise serializers.ValidationError("User not found.")
-
-        try:
-            otp = OTPVerification.objects.get(
-                user=user, otp_code=otp_code, is_used=False
-            )
-        except OTPVerification.DoesNotExist:
-            raise serializers.ValidationError("Invalid OTP.")
-
-        if otp.is_expired:
+        result = otp.get_backend().verify(attrs["user"].email, attrs["otp_code"])
+        if result == otp.EXPIRED:
             raise serializers.ValidationError("OTP has expired.")
-
-        attrs["user"] = user
-        attrs["otp"] = otp
+        if result == otp.LOCKED:
+            raise serializers.ValidationError("Too many invalid attempts; request a new OTP later.")
+        if result != otp.VERIFIED:
+            raise serializers.ValidationError("Invalid OTP.")
         return attrs
 
     def save(self, **kwargs):
-        user: User = self.validated_data["user"]
-        otp: OTPVerification = self.validated_data["otp"]
-
-        otp.is_used = True
-        otp.save(update_fields=["is_used"])
-
+        # save() rather than a queryset update so the cached user is dropped.
+        user = self.validated_data["user"]
         user.is_email_verified = True
         user.save(update_fields=["is_email_verified"])
         return user
@@ -84,21 +78,18 @@ class RefreshOTPSerializer(serializers.Serializer):
     email = serializers.EmailField()
 
     def validate_email(self, value):
-        try:
-            user = User.objects.get(email=value.lower())
-        except User.DoesNotExist:
+        user = _find_user(value)
+        if user is None:
             raise serializers.ValidationError("User not found.")
         if user.is_email_verified:
             raise serializers.ValidationError("E‑mail already verified.")
         return value
 
     def save(self, **kwargs):
-        user = User.objects.get(email=self.validated_data["email"].lower())
+        user = _find_user(self.validated_data["email"])
 
-        latest = (
-            OTPVerification.objects.filter(user=user).order_by("-created_at").first()
-        )
-        if latest and timezone.now() - latest.created_at < timedelta(seconds=60):
+        last_issued = otp.get_backend().last_issued(user.email)
+        if last_issued and timezone.now() - last_issued < timedelta(seconds=settings.OTP_RESEND_INTERVAL):
             raise serializers.ValidationError("Please wait before requesting another OTP.")
 
         _create_and_email_otp(user)
@@ -0,0 +1,8 @@
+from celery import shared_task
+
+from . import outbox
+
+
+@shared_task(ignore_result=True)
+def send_outbox():
+    return outbox.send_pending()
@@ -1,7 +1,21 @@
+import smtplib
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend as LocmemBackend
+from django.test import override_settings
 from django.urls import reverse
-from rest_framework.test import APITestCase
+from django_redis import get_redis_connection
+from rest_framework.test import APIRequestFactory, APITestCase
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework import status
-from authentication.models import OTP, CustomUser
+
+from authentication import otp, outbox, throttling, user_cache
+from authentication.authentication import CachedJWTAuthentication
+from authentication.models import OTPVerification as OTP, CustomUser, EmailOutbox
 
 
 class AuthFlowTests(APITestCase):
@@ -88,4 +102,265 @@ class AuthFlowTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         
         user.refresh_from_db()
-        self.assertFalse(user.is_email_verified)
\ No newline at end of file
+        self.assertFalse(user.is_email_verified)
+
+
+class FlakyBackend(LocmemBackend):
+    # Rejects mail to refused@example.com; counts the connections opened.
+    opened = 0
+
+    def open(self):
+        if getattr(self, "is_open", False):
+            return False
+        self.is_open = True
+        FlakyBackend.opened += 1
+        return True
+
+    def send_messages(self, messages):
+        if any("refused@example.com" in message.to for message in messages):
+            raise smtplib.SMTPRecipientsRefused({"refused@example.com": (550, b"no such user")})
+        return super().send_messages(messages)
+
+
+class EmailOutboxTests(APITestCase):
+    def setUp(self):
+        outbox._pool.clear()
+        self.register_url = reverse("auth:register")
+
+    def tearDown(self):
+        outbox._pool.clear()
+
+    @override_settings(OTP_BACKEND="authentication.otp.DatabaseOTPBackend")
+    def test_registration_queues_the_otp_instead_of_sending_it(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(
+                self.register_url, {"email": "queued@example.com", "password": "SecurePass123"}
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(mail.outbox, [])
+
+        email = EmailOutbox.objects.get()
+        otp = OTP.objects.get(user__email="queued@example.com")
+        self.assertEqual(email.recipient, "queued@example.com")
+        self.assertIn(otp.otp_code, email.body)
+
+        self.assertEqual(outbox.send_pending(), 1)
+        self.assertEqual(mail.outbox[0].to, ["queued@example.com"])
+        self.assertIn(otp.otp_code, mail.outbox[0].body)
+        self.assertFalse(EmailOutbox.objects.exists())
+
+    @override_settings(OTP_BACKEND="authentication.otp.DatabaseOTPBackend")
+    def test_broker_errors_do_not_fail_registration(self):
+        def delay():
+            raise ConnectionError("broker down")
+
+        with patch("authentication.tasks.send_outbox.delay", delay), \
+                self.assertLogs(level="ERROR") as logs, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                self.register_url, {"email": "brokerless@example.com", "password": "SecurePass123"}
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn("broker down", logs.output[0])
+        self.assertEqual(EmailOutbox.objects.get().recipient, "brokerless@example.com")
+
+    def test_batches_share_one_connection_and_failures_are_retried_later(self):
+        for recipient in ("a@example.com", "refused@example.com", "b@example.com"):
+            outbox.enqueue(recipient, "Subject", "Body")
+
+        FlakyBackend.opened = 0
+        with self.settings(EMAIL_BACKEND="authentication.tests.FlakyBackend", EMAIL_OUTBOX_CONNECTIONS=2), \
+                self.assertLogs("authentication.outbox", "WARNING"):
+            self.assertEqual(outbox.send_pending(batch_size=2), 2)
+            self.assertEqual(FlakyBackend.opened, 2)
+
+            failed = EmailOutbox.objects.get()
+            self.assertEqual((failed.recipient, failed.attempts), ("refused@example.com", 1))
+            self.assertIn("no such user", failed.last_error)
+            self.assertEqual(outbox.send_pending(), 0)
+
+            with self.settings(EMAIL_OUTBOX_RETRY_DELAY=0, EMAIL_OUTBOX_MAX_ATTEMPTS=2):
+                EmailOutbox.objects.update(available_at=failed.available_at - timedelta(seconds=60))
+                self.assertEqual(outbox.send_pending(), 0)
+                self.assertEqual(EmailOutbox.objects.get().attempts, 2)
+                self.assertEqual(outbox.send_pending(), 0)
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ["a@example.com", "b@example.com"])
+
+
+class OTPBackendTests(APITestCase):
+    def setUp(self):
+        self.redis = otp.RedisOTPBackend().redis
+        self.clear_redis()
+        self.user = CustomUser.objects.create_user(email="otp@example.com", password="SecurePass123")
+        self.verify_url = reverse("auth:verify")
+        self.refresh_url = reverse("auth:refresh-otp")
+
+    def tearDown(self):
+        self.clear_redis()
+
+    def clear_redis(self):
+        keys = [*self.redis.scan_iter("otp:*"), *self.redis.scan_iter("throttle:*")]
+        if keys:
+            self.redis.delete(*keys)
+
+    def test_redis_codes_are_hashed_expire_and_are_consumed_once(self):
+        backend = otp.RedisOTPBackend()
+        code = backend.issue(self.user)
+        stored = self.redis.hgetall("otp:code:otp@example.com")
+        self.assertNotIn(code.encode(), b"".join(stored.values()))
+        self.assertLessEqual(self.redis.ttl("otp:code:otp@example.com"), settings.OTP_TTL)
+        self.assertGreater(self.redis.ttl("otp:code:otp@example.com"), 0)
+
+        replaced = backend.issue(self.user)
+        if replaced != code:
+            self.assertEqual(backend.verify("otp@example.com", code), otp.INVALID)
+        self.assertEqual(backend.verify("OTP@example.com", replaced), otp.VERIFIED)
+        self.assertEqual(backend.verify("otp@example.com", replaced), otp.EXPIRED)
+
+    def test_redis_locks_after_too_many_wrong_codes(self):
+        backend = otp.RedisOTPBackend()
+        code = backend.issue(self.user)
+        wrong = "000000" if code != "000000" else "111111"
+        with self.settings(OTP_MAX_ATTEMPTS=2):
+            self.assertEqual(backend.verify("otp@example.com", wrong), otp.INVALID)
+            self.assertEqual(backend.verify("otp@example.com", wrong), otp.INVALID)
+            self.assertEqual(backend.verify("otp@example.com", code), otp.LOCKED)
+            code = backend.issue(self.user)
+            self.assertEqual(backend.verify("otp@example.com", code), otp.LOCKED)
+
+    def test_verify_and_refresh_endpoints(self):
+        for backend in ("authentication.otp.RedisOTPBackend", "authentication.otp.DatabaseOTPBackend"):
+            with self.subTest(backend=backend), self.settings(OTP_BACKEND=backend):
+                CustomUser.objects.filter(pk=self.user.pk).update(is_email_verified=False)
+                code = otp.get_backend().issue(self.user)
+
+                response = self.client.post(self.refresh_url, {"email": self.user.email})
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+                response = self.client.post(self.verify_url, {"email": self.user.email, "otp_code": "12345"})
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                response = self.client.post(self.verify_url, {"email": self.user.email, "otp_code": code})
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.user.refresh_from_db()
+                self.assertTrue(self.user.is_email_verified)
+
+                response = self.client.post(self.verify_url, {"email": self.user.email, "otp_code": code})
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+    def test_verify_matches_the_email_in_any_case(self):
+        user = CustomUser.objects.create_user(email="Alice@Example.com", password="SecurePass123")
+        for backend in ("authentication.otp.RedisOTPBackend", "authentication.otp.DatabaseOTPBackend"):
+            with self.subTest(backend=backend), self.settings(OTP_BACKEND=backend):
+                CustomUser.objects.filter(pk=user.pk).update(is_email_verified=False)
+                self.clear_redis()
+                code = otp.get_backend().issue(user)
+
+                response = self.client.post(self.verify_url, {"email": "alice@example.com", "otp_code": code})
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                user.refresh_from_db()
+                self.assertTrue(user.is_email_verified)
+
+        response = self.client.post(self.verify_url, {"email": "nobody@example.com", "otp_code": "123456"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CachedJWTAuthenticationTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email="cached@example.com", password="SecurePass123")
+        self.factory = APIRequestFactory()
+        self.auth = CachedJWTAuthentication()
+
+    def tearDown(self):
+        user_cache.invalidate(self.user.pk)
+
+    def authenticate(self):
+        request = self.factory.get("/", HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}")
+        return self.auth.authenticate(request)[0]
+
+    def test_user_is_loaded_once_then_served_from_cache(self):
+        with self.assertNumQueries(1):
+            user = self.authenticate()
+        self.assertEqual((user.pk, user.email, user.is_email_verified), (self.user.pk, self.user.email, False))
+
+        user_cache._local.clear()
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+            self.authenticate()
+        self.assertEqual(user, self.user)
+
+    def test_saving_or_verifying_the_user_drops_the_cached_copy(self):
+        self.authenticate()
+        code = otp.get_backend().issue(self.user)
+        response = self.client.post(reverse("auth:verify"), {"email": self.user.email, "otp_code": code})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(self.authenticate().is_email_verified)
+
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+
+class TokenBucketThrottleTests(APITestCase):
+    def setUp(self):
+        self.redis = get_redis_connection("job_state")
+        self.clear_buckets()
+        throttling.local_buckets.buckets.clear()
+        self.register_url = reverse("auth:register")
+
+    def tearDown(self):
+        self.clear_buckets()
+
+    def clear_buckets(self):
+        keys = list(self.redis.scan_iter("throttle:*"))
+        if keys:
+            self.redis.delete(*keys)
+
+    def register(self, index):
+        return self.client.post(self.register_url, {"email": f"burst{index}@example.com", "password": "SecurePass123"})
+
+    def test_parse_rate(self):
+        self.assertEqual(throttling.parse_rate("120/min"), (120, 2.0))
+        self.assertEqual(throttling.parse_rate("10/hour"), (10, 10 / 3600))
+
+    @override_settings(API_THROTTLE_RATES={"register": {"default": "2/hour"}})
+    def test_anonymous_clients_get_429_with_retry_after(self):
+        self.assertEqual(self.register(1).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.register(2).status_code, status.HTTP_201_CREATED)
+        response = self.register(3)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreater(int(response["Retry-After"]), 1700)
+
+    @override_settings(API_THROTTLE_RATES={"job-create": {"user": "1/min", "staff": "2/min"}})
+    def test_rates_depend_on_the_tier_and_are_per_user(self):
+        url = reverse("jobs:jobs:job-list")
+        data = {"name": "Throttled", "description": "rate limited", "scheduled_time": "2030-01-01T00:00:00Z"}
+        user = CustomUser.objects.create_user(email="tier@example.com", password="x", is_email_verified=True)
+        staff = CustomUser.objects.create_user(
+            email="staff@example.com", password="x", is_email_verified=True, is_staff=True
+        )
+
+        self.client.force_authenticate(user=user)
+        self.assertEqual(self.client.post(url, data, format="json").status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.client.post(url, data, format="json").status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+        self.client.force_authenticate(user=staff)
+        self.assertEqual(self.client.post(url, data, format="json").status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.client.post(url, data, format="json").status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.client.post(url, data, format="json").status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_falls_back_to_local_buckets_without_redis(self):
+        caches = {**settings.CACHES, "unreachable": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": "redis://127.0.0.1:1/0",
+            "OPTIONS": {"CLIENT_CLASS": "django_redis.client.DefaultClient"},
+        }}
+        with self.settings(
+            CACHES=caches,
+            API_THROTTLE_REDIS_ALIAS="unreachable",
+            API_THROTTLE_RATES={"register": {"default": "1/hour"}},
+        ), self.assertLogs("authentication.throttling", "WARNING"):
+            self.assertEqual(self.register(1).status_code, status.HTTP_201_CREATED)
+            self.assertEqual(self.register(2).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
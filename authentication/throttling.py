@@ -0,0 +1,123 @@
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+# Token buckets per (scope, client). A view opts in with ``throttle_scope``,
+# or per action with ``throttle_scopes`` on a viewset; settings.API_THROTTLE_RATES
+# maps each scope to a rate per tier ("anon", "user", "staff", falling back to
+# "default"), written like DRF rates: "120/min" refills 120 tokens a minute
+# into a bucket that holds 120. Views without a scope or rate are not limited.
+KEY = "throttle:{scope}:{ident}"
+DURATIONS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+# Refill and take one token in a single round trip, on Redis's clock so every
+# API process agrees. Returns {allowed, seconds until a token is available}.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'at')
+local tokens = tonumber(bucket[1]) or capacity
+local at = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - at) * rate)
+local allowed = 0
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'at', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(wait)}
+"""
+
+
+def parse_rate(rate):
+    """"120/min" -> (capacity, tokens per second)."""
+    count, period = rate.split("/")
+    count = int(count)
+    return count, count / DURATIONS[period[0]]
+
+
+def get_tier(request):
+    user = request.user
+    if not user or not user.is_authenticated:
+        return "anon"
+    return "staff" if user.is_staff else "user"
+
+
+class LocalBuckets:
+    """In-process token buckets, used while Redis is unreachable; limits
+    then apply per process rather than across the deployment."""
+
+    def __init__(self):
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def take(self, key, capacity, rate):
+        now = time.monotonic()
+        with self.lock:
+            tokens, at = self.buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - at) * rate)
+            if tokens >= 1:
+                self.buckets[key] = (tokens - 1, now)
+                return True, 0.0
+            self.buckets[key] = (tokens, now)
+            return False, (1 - tokens) / rate
+
+
+local_buckets = LocalBuckets()
+
+
+class TokenBucketThrottle(BaseThrottle):
+    def __init__(self):
+        self.retry_after = None
+
+    def get_scope(self, view):
+        scopes = getattr(view, "throttle_scopes", None)
+        if scopes is not None:
+            return scopes.get(getattr(view, "action", None))
+        return getattr(view, "throttle_scope", None)
+
+    def get_rate(self, scope, tier):
+        rates = settings.API_THROTTLE_RATES.get(scope, {})
+        rate = rates.get(tier, rates.get("default"))
+        return None if rate is None else parse_rate(rate)
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(view)
+        if scope is None:
+            return True
+        tier = get_tier(request)
+        rate = self.get_rate(scope, tier)
+        if rate is None:
+            return True
+
+        ident = f"user:{request.user.pk}" if tier != "anon" else f"ip:{self.get_ident(request)}"
+        allowed, wait = self.take(KEY.format(scope=scope, ident=ident), *rate)
+        if not allowed:
+            self.retry_after = wait
+        return allowed
+
+    def take(self, key, capacity, rate):
+        try:
+            redis = get_redis_connection(settings.API_THROTTLE_REDIS_ALIAS)
+            allowed, wait = redis.register_script(TOKEN_BUCKET_SCRIPT)(keys=[key], args=[capacity, rate])
+            return bool(allowed), float(wait)
+        except RedisError as exc:
+            logger.warning("Rate limiting in-process; Redis is unavailable: %s", exc)
+            return local_buckets.take(key, capacity, rate)
+
+    def wait(self):
+        return None if self.retry_after is None else math.ceil(self.retry_after)
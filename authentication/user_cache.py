@@ -0,0 +1,84 @@
+import json
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
+from django_redis import get_redis_connection
+
+# The fields API requests read from request.user, cached per process for
+# AUTH_USER_CACHE_LOCAL_TTL seconds and in Redis for AUTH_USER_CACHE_TTL, so
+# authenticating a JWT request does not query the user table. Saving or
+# deleting a user drops both copies (post_save / post_delete receivers); other
+# processes' local copies expire within the short local TTL. Other fields are
+# deferred and load from the database if read.
+KEY = "auth:user:{user_id}"
+FIELDS = ("id", "email", "first_name", "last_name", "is_email_verified", "is_active", "is_staff", "is_superuser")
+
+_local = {}
+
+
+def _redis():
+    return get_redis_connection(settings.AUTH_USER_CACHE_REDIS_ALIAS)
+
+
+def _user(values):
+    User = get_user_model()
+    field_names = [field.attname for field in User._meta.concrete_fields if field.attname in values]
+    return User.from_db(DEFAULT_DB_ALIAS, field_names, [values[name] for name in field_names])
+
+
+def _remember(user_id, values):
+    _local[str(user_id)] = (time.monotonic() + settings.AUTH_USER_CACHE_LOCAL_TTL, values)
+
+
+def _local_values(user_id):
+    entry = _local.get(str(user_id))
+    if entry is not None and entry[0] > time.monotonic():
+        return entry[1]
+    _local.pop(str(user_id), None)
+    return None
+
+
+def get(user_id):
+    """The user with primary key ``user_id``, or None if there is none."""
+    values = _local_values(user_id)
+    if values is None:
+        cached = _redis().get(KEY.format(user_id=user_id))
+        if cached is not None:
+            values = json.loads(cached)
+        else:
+            values = get_user_model().objects.filter(pk=user_id).values(*FIELDS).first()
+            if values is None:
+                return None
+            _redis().set(KEY.format(user_id=user_id), json.dumps(values), ex=settings.AUTH_USER_CACHE_TTL)
+        _remember(user_id, values)
+    return _user(values)
+
+
+async def aget(user_id):
+    from jobs import async_redis
+
+    values = _local_values(user_id)
+    if values is None:
+        client = async_redis.get_redis_connection(settings.AUTH_USER_CACHE_REDIS_ALIAS)
+        cached = await client.get(KEY.format(user_id=user_id))
+        if cached is not None:
+            values = json.loads(cached)
+        else:
+            values = await get_user_model().objects.filter(pk=user_id).values(*FIELDS).afirst()
+            if values is None:
+                return None
+            await client.set(KEY.format(user_id=user_id), json.dumps(values), ex=settings.AUTH_USER_CACHE_TTL)
+        _remember(user_id, values)
+    return _user(values)
+
+
+def invalidate(user_id):
+    _local.pop(str(user_id), None)
+    _redis().delete(KEY.format(user_id=user_id))
+
+
+def user_changed(sender, instance, **kwargs):
+    # post_save and post_delete receiver for the user model.
+    invalidate(instance.pk)
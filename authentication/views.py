@@ -15,6 +15,7 @@ from .models import CustomUser
 # ─────────────  Registration / OTP endpoints  ────────────────
 class RegisterView(APIView):
     permission_classes = [permissions.AllowAny]
+    throttle_scope = "register"
 
     def post(self, request):
         ser = RegistrationSerializer(data=request.data)
@@ -26,6 +27,7 @@ class RegisterView(APIView):
 
 class VerifyOTPView(APIView):
     permission_classes = [permissions.AllowAny]
+    throttle_scope = "otp"
 
     def post(self, request):
         ser = VerifyOTPSerializer(data=request.data)
@@ -37,6 +39,7 @@ class VerifyOTPView(APIView):
 
 class RefreshOTPView(APIView):
     permission_classes = [permissions.AllowAny]
+    throttle_scope = "otp"
 
     def post(self, request):
         ser = RefreshOTPSerializer(data=request.data)
@@ -59,4 +62,5 @@ class EmailVerifiedTokenSerializer(TokenObtainPairSerializer):
 
 class LoginView(TokenObtainPairView):
     permission_classes = [permissions.AllowAny]
+    throttle_scope = "login"
     serializer_class = EmailVerifiedTokenSerializer
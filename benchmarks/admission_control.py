@@ -0,0 +1,84 @@
+"""Cost of admission control per submission, and where a flood of jobs stops.
+
+    python benchmarks/admission_control.py --checks 20000 --busy 20000
+
+Times ``--checks`` admission.admit() calls with the load sampled every
+JOB_ADMISSION_SAMPLE_INTERVAL and sampled on every call, then submits batches
+of ``--batch`` jobs through POST /api/jobs/bulk/ with no workers running
+until the API refuses them at the ``--busy`` pending watermark.
+"""
+import argparse
+import time
+from datetime import timedelta
+
+from common import BENCH_REDIS_DB, percentile, report, setup
+
+
+def time_checks(admission, checks):
+    latencies = []
+    for _ in range(checks):
+        started = time.perf_counter()
+        admission.admit(0)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--checks', type=int, default=20_000)
+    parser.add_argument('--busy', type=int, default=20_000, help="Pending-jobs watermark for the 429 responses.")
+    parser.add_argument('--batch', type=int, default=1000)
+    args = parser.parse_args()
+
+    setup()
+
+    from django.conf import settings
+    from django.utils import timezone
+    from django_redis import get_redis_connection
+    from rest_framework.test import APIRequestFactory, force_authenticate
+
+    from authentication.models import CustomUser
+    from job_processing_system.celery import app
+    from jobs import admission, counters, scheduler
+    from jobs.views import JobViewSet
+
+    app.conf.broker_url = f"redis://localhost:6379/{BENCH_REDIS_DB}"
+    settings.JOB_ADMISSION_LIMITS = {**settings.JOB_ADMISSION_LIMITS, 'pending': (args.busy, args.busy * 5)}
+    counters.ensure_totals()
+
+    rows = []
+    for label, interval in (("sampled", settings.JOB_ADMISSION_SAMPLE_INTERVAL), ("every call", 0)):
+        settings.JOB_ADMISSION_SAMPLE_INTERVAL = interval
+        admission._sample = None
+        latencies = time_checks(admission, args.checks)
+        rows += [
+            (f"admit() {label} p50", f"{percentile(latencies, 50) * 1000:.1f} us"),
+            (f"admit() {label} p99", f"{percentile(latencies, 99) * 1000:.1f} us"),
+        ]
+
+    user = CustomUser.objects.create_user(email="bench@example.com", password="bench-password", is_email_verified=True)
+    bulk = JobViewSet.as_view({'post': 'bulk'})
+    factory = APIRequestFactory()
+    scheduled_time = (timezone.now() + timedelta(hours=1)).isoformat()
+    payload = [{"name": "Flood", "description": "flood", "scheduled_time": scheduled_time}] * args.batch
+
+    accepted = 0
+    while True:
+        request = factory.post('/api/jobs/bulk/', payload, format='json')
+        force_authenticate(request, user=user)
+        response = bulk(request)
+        if response.status_code != 201:
+            break
+        accepted += response.data["created"]
+
+    redis = get_redis_connection('job_state')
+    rows += [
+        ("jobs accepted", f"{accepted:,}"),
+        ("then", f"{response.status_code}, Retry-After {response['Retry-After']}"),
+        ("schedule size in Redis", f"{redis.memory_usage(scheduler.SCHEDULE_KEY) / 1024:,.0f} KiB"),
+    ]
+    report(f"{args.checks:,} admission checks; flood in batches of {args.batch:,}, busy at {args.busy:,}", rows)
+
+
+if __name__ == '__main__':
+    main()
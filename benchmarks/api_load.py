@@ -0,0 +1,169 @@
+"""Requests per second and latency of the read endpoints, WSGI vs ASGI.
+
+    pip install gunicorn uvicorn
+    python benchmarks/api_load.py --concurrency 200 --duration 10
+
+Starts the project under gunicorn (threaded WSGI workers) and under uvicorn
+(ASGI workers) with the same number of processes, then drives each with
+``--concurrency`` keep-alive connections for ``--duration`` seconds per
+scenario:
+
+* ``read``: job detail, result and summary requests, round robin.
+* ``wait``: ``result/?wait=1`` on jobs that stay in progress, i.e. clients
+  long-polling while the server holds their requests open.
+
+The servers use a throwaway SQLite file and Redis database 15.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from common import BASE_DIR, percentile, report
+
+BENCH_DIR = Path(__file__).resolve().parent
+SERVERS = {
+    'WSGI (gunicorn gthread)': lambda args: [
+        'gunicorn', 'job_processing_system.wsgi:application', '--bind', f'127.0.0.1:{args.port}',
+        '--workers', str(args.workers), '--threads', str(args.threads), '--worker-class', 'gthread',
+        '--log-level', 'warning',
+    ],
+    'ASGI (uvicorn)': lambda args: [
+        'uvicorn', 'job_processing_system.asgi:application', '--port', str(args.port),
+        '--workers', str(args.workers), '--log-level', 'warning', '--no-access-log',
+    ],
+}
+
+
+def prepare(args, env):
+    """Create the database and the benchmark user's jobs; return (token, paths)."""
+    os.environ.update(env)
+    import django
+    django.setup()
+
+    from django.core.management import call_command
+    from django.utils import timezone
+    from django_redis import get_redis_connection
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from authentication.models import CustomUser
+    from jobs.models import Job, JobResult
+
+    get_redis_connection('job_state').flushdb()
+    call_command('migrate', verbosity=0)
+    user = CustomUser.objects.create_user(
+        email="bench@example.com", password="bench-password", is_email_verified=True
+    )
+    now = timezone.now()
+    done = Job.objects.bulk_create(
+        Job(user=user, name=f"Done {i}", description="benchmark", scheduled_time=now, status='completed')
+        for i in range(args.jobs)
+    )
+    JobResult.objects.bulk_create(JobResult(job=job, output="done", completed_at=now) for job in done)
+    running = Job.objects.bulk_create(
+        Job(user=user, name=f"Running {i}", description="benchmark", scheduled_time=now, status='in-progress')
+        for i in range(args.jobs)
+    )
+
+    paths = {
+        'read': [
+            path for job in done
+            for path in (f'/api/jobs/{job.id}/', f'/api/jobs/{job.id}/result/', '/api/jobs/summary/')
+        ],
+        'wait': [f'/api/jobs/{job.id}/result/?wait=1' for job in running],
+    }
+    return str(AccessToken.for_user(user)), paths
+
+
+async def client(port, token, paths, offset, deadline, latencies, errors):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    i = offset
+    try:
+        while time.perf_counter() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            started = time.perf_counter()
+            writer.write(
+                f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nAuthorization: Bearer {token}\r\n\r\n".encode()
+            )
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            await reader.readexactly(length)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if not (head.startswith(b"HTTP/1.1 200") or head.startswith(b"HTTP/1.1 400")):
+                errors.append(head.split(b"\r\n", 1)[0])
+    finally:
+        writer.close()
+
+
+async def load(args, token, paths):
+    latencies, errors = [], []
+    started = time.perf_counter()
+    deadline = started + args.duration
+    await asyncio.gather(*(
+        client(args.port, token, paths, n * 7, deadline, latencies, errors)
+        for n in range(args.concurrency)
+    ))
+    return len(latencies) / (time.perf_counter() - started), latencies, errors
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server did not start on port {port}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=16, help="Threads per gunicorn worker.")
+    parser.add_argument('--jobs', type=int, default=500)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    database = tempfile.NamedTemporaryFile(suffix='.sqlite3', delete=False)
+    env = {
+        'DJANGO_SETTINGS_MODULE': 'server_settings',
+        'BENCH_DB_PATH': database.name,
+        'PYTHONPATH': os.pathsep.join([str(BENCH_DIR), str(BASE_DIR)]),
+    }
+    sys.path.insert(0, str(BENCH_DIR))
+    token, paths = prepare(args, env)
+
+    try:
+        for name, command in SERVERS.items():
+            server = subprocess.Popen(command(args), cwd=BASE_DIR, env={**os.environ, **env})
+            try:
+                wait_for_port(args.port)
+                for scenario, scenario_paths in paths.items():
+                    rate, latencies, errors = asyncio.run(load(args, token, scenario_paths))
+                    report(f"{name}, {scenario}: {args.concurrency} connections, {args.workers} processes", [
+                        ("requests/s", f"{rate:,.0f}"),
+                        ("p50 latency", f"{percentile(latencies, 50):,.1f} ms"),
+                        ("p99 latency", f"{percentile(latencies, 99):,.1f} ms"),
+                        ("errors", f"{len(errors):,}"),
+                    ])
+            finally:
+                server.terminate()
+                server.wait()
+    finally:
+        os.unlink(database.name)
+
+
+if __name__ == '__main__':
+    main()
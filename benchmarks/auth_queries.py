@@ -0,0 +1,62 @@
+"""Database queries and latency per JWT-authenticated request.
+
+    python benchmarks/auth_queries.py --requests 2000
+
+Sends ``--requests`` GET /api/jobs/summary/ requests (served from the Redis
+counters, so authentication is the only database work) through the DRF view
+with the stock simplejwt JWTAuthentication and with CachedJWTAuthentication.
+"""
+import argparse
+import time
+
+from common import percentile, report, setup
+
+
+def run(view, factory, token, requests):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    latencies = []
+    with CaptureQueriesContext(connection) as queries:
+        for _ in range(requests):
+            request = factory.get('/api/jobs/summary/', HTTP_AUTHORIZATION=f"Bearer {token}")
+            started = time.perf_counter()
+            response = view(request)
+            latencies.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200, response.data
+    return len(queries) / requests, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    setup()
+
+    from rest_framework.test import APIRequestFactory
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from authentication.authentication import CachedJWTAuthentication
+    from authentication.models import CustomUser
+    from jobs.views import JobSummaryView
+
+    user = CustomUser.objects.create_user(email="bench@example.com", password="bench-password", is_email_verified=True)
+    token = AccessToken.for_user(user)
+    factory = APIRequestFactory()
+
+    rows = []
+    for label, authentication in (("JWTAuthentication", JWTAuthentication), ("CachedJWTAuthentication", CachedJWTAuthentication)):
+        view = JobSummaryView.as_view(authentication_classes=[authentication])
+        queries, latencies = run(view, factory, token, args.requests)
+        rows += [
+            (f"{label} queries/request", f"{queries:.2f}"),
+            (f"{label} p50", f"{percentile(latencies, 50):.3f} ms"),
+            (f"{label} p99", f"{percentile(latencies, 99):.3f} ms"),
+        ]
+    report(f"{args.requests:,} GET /api/jobs/summary/ requests", rows)
+
+
+if __name__ == '__main__':
+    main()
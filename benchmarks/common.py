@@ -0,0 +1,43 @@
+import os
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'job_processing_system.settings')
+
+# Benchmarks run against a throwaway Redis database and a test database so
+# they never touch real data.
+BENCH_REDIS_DB = int(os.getenv('BENCH_REDIS_DB', '15'))
+
+
+def setup(database=True):
+    import django
+    from django.conf import settings
+
+    for alias, config in settings.CACHES.items():
+        if config['BACKEND'].startswith('django_redis'):
+            config['LOCATION'] = f"redis://localhost:6379/{BENCH_REDIS_DB}"
+    django.setup()
+
+    from django_redis import get_redis_connection
+    get_redis_connection('job_state').flushdb()
+
+    if database:
+        from django.db import connection
+        connection.creation.create_test_db(verbosity=0)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(title, rows):
+    print(title)
+    width = max(len(label) for label, _ in rows)
+    for label, value in rows:
+        print(f"  {label:<{width}}  {value}")
@@ -0,0 +1,54 @@
+"""Completions per second for a single worker process running complete_job.
+
+    python benchmarks/complete_throughput.py --jobs 2000
+    python benchmarks/complete_throughput.py --jobs 5 --blocking-delay 1
+
+``--blocking-delay`` re-introduces the old ``time.sleep`` inside each
+completion to show the throughput before it was removed.
+"""
+import argparse
+import time
+
+from common import report, setup
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--jobs', type=int, default=2000)
+    parser.add_argument('--blocking-delay', type=float, default=0.0)
+    args = parser.parse_args()
+
+    setup()
+
+    from django.utils import timezone
+
+    from authentication.models import CustomUser
+    from jobs.models import Job
+    from jobs.tasks import complete_job, start_job
+
+    user = CustomUser.objects.create_user(email="bench@example.com", password="bench-password")
+    jobs = Job.objects.bulk_create(
+        Job(user=user, name=f"Job {i}", description="benchmark", scheduled_time=timezone.now())
+        for i in range(args.jobs)
+    )
+    for job in jobs:
+        start_job(job.id)
+
+    started = time.perf_counter()
+    for job in jobs:
+        if args.blocking_delay:
+            time.sleep(args.blocking_delay)
+        complete_job(job.id)
+    elapsed = time.perf_counter() - started
+
+    completed = Job.objects.filter(status='completed').count()
+    report("complete_job throughput, one worker process", [
+        ("blocking delay", f"{args.blocking_delay:g}s"),
+        ("jobs completed", f"{completed:,}"),
+        ("elapsed", f"{elapsed:.2f}s"),
+        ("completions/s", f"{completed / elapsed:,.1f}"),
+    ])
+
+
+if __name__ == '__main__':
+    main()
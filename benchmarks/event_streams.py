@@ -0,0 +1,70 @@
+"""Memory per idle event stream and publish-to-delivery latency in one process.
+
+    python benchmarks/event_streams.py --streams 10000 --events 2000
+
+Opens ``--streams`` jobs.events streams (what GET /api/jobs/events/ returns)
+spread over ``--users`` users on a single event loop, then publishes
+``--events`` transitions to random users through Redis and times how long
+each takes to reach every open stream of that user.
+"""
+import argparse
+import asyncio
+import random
+import time
+import tracemalloc
+
+from common import percentile, report, setup
+
+
+async def run(args):
+    from jobs import events
+
+    rng = random.Random(args.seed)
+    user_ids = [rng.randrange(args.users) for _ in range(args.streams)]
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    streams = [events.stream(user_id) for user_id in user_ids]
+    for stream in streams:
+        await anext(stream)  # subscribes and yields the retry hint
+    per_stream = (tracemalloc.get_traced_memory()[0] - before) / args.streams
+    tracemalloc.stop()
+
+    by_user = {}
+    for stream, user_id in zip(streams, user_ids):
+        by_user.setdefault(user_id, []).append(stream)
+
+    latencies = []
+    loop = asyncio.get_running_loop()
+    for job_id in range(args.events):
+        user_id = rng.choice(user_ids)
+        started = time.perf_counter()
+        await loop.run_in_executor(None, events.publish, [(user_id, job_id, 'pending', 'in-progress')])
+        await asyncio.gather(*(anext(stream) for stream in by_user[user_id]))
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    for stream in streams:
+        await stream.aclose()
+    return per_stream, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--streams', type=int, default=10_000)
+    parser.add_argument('--users', type=int, default=2_000)
+    parser.add_argument('--events', type=int, default=2_000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    setup(database=False)
+
+    per_stream, latencies = asyncio.run(run(args))
+    report(f"{args.streams:,} open streams over {args.users:,} users, one process", [
+        ("memory per idle stream", f"{per_stream / 1024:.1f} KiB"),
+        ("delivery p50", f"{percentile(latencies, 50):.2f} ms"),
+        ("delivery p99", f"{percentile(latencies, 99):.2f} ms"),
+    ])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Handler throughput of each jobs.executors backend for CPU- and I/O-bound work.
+
+    python benchmarks/executor_throughput.py --jobs 400 --workers 8 --async-concurrency 100
+
+CPU-bound handlers hash a buffer repeatedly; I/O-bound handlers wait
+``--io-wait`` seconds (time.sleep, or asyncio.sleep on the asyncio backend).
+"""
+import argparse
+import asyncio
+import hashlib
+import time
+from concurrent.futures import wait
+
+from common import report, setup
+
+CPU_ROUNDS = 2000
+IO_WAIT = 0.02
+
+
+def cpu_bound(job):
+    digest = b'x' * 64
+    for _ in range(CPU_ROUNDS):
+        digest = hashlib.sha256(digest).digest()
+    return digest.hex()
+
+
+def io_bound(job):
+    time.sleep(IO_WAIT)
+    return 'done'
+
+
+async def cpu_bound_async(job):
+    return cpu_bound(job)
+
+
+async def io_bound_async(job):
+    await asyncio.sleep(IO_WAIT)
+    return 'done'
+
+
+def main():
+    global IO_WAIT
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--jobs', type=int, default=400)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--async-concurrency', type=int, default=100)
+    parser.add_argument('--io-wait', type=float, default=IO_WAIT)
+    args = parser.parse_args()
+    IO_WAIT = args.io_wait
+
+    setup(database=False)
+
+    from django.conf import settings
+
+    from jobs import executors
+
+    settings.JOB_EXECUTOR_BACKENDS.update({
+        'thread': {'max_workers': args.workers},
+        'process': {'max_workers': args.workers},
+        'asyncio': {'max_workers': args.async_concurrency},
+    })
+    for backend in ('thread', 'process'):
+        executors.handler(f'cpu-{backend}', backend=backend)(cpu_bound)
+        executors.handler(f'io-{backend}', backend=backend)(io_bound)
+    executors.handler('cpu-asyncio', backend='asyncio')(cpu_bound_async)
+    executors.handler('io-asyncio', backend='asyncio')(io_bound_async)
+
+    rows = []
+    for kind in ('cpu', 'io'):
+        for backend in executors.BACKEND_CLASSES:
+            name = f'{kind}-{backend}'
+            # Warm the pool up so worker start-up is not measured.
+            wait([executors.submit(name, {}) for _ in range(args.workers)])
+
+            started = time.perf_counter()
+            futures = [executors.submit(name, {'id': i}) for i in range(args.jobs)]
+            wait(futures)
+            elapsed = time.perf_counter() - started
+            rows.append((f"{kind:<3} on {backend:<7}", f"{args.jobs / elapsed:>9,.1f} jobs/s"))
+
+    report(
+        f"Executor throughput, {args.jobs} jobs, {args.workers} thread/process workers, "
+        f"{args.async_concurrency} concurrent coroutines",
+        rows
+    )
+
+
+if __name__ == '__main__':
+    main()
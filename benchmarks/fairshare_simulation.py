@@ -0,0 +1,106 @@
+"""Small-user tail latency while one user floods the system: FIFO vs fair share.
+
+    python benchmarks/fairshare_simulation.py --heavy-jobs 50000 --small-users 50
+
+Simulated clock: each tick the workers accept ``--capacity`` jobs. A heavy
+user has ``--heavy-jobs`` jobs due at tick 0; every small user submits
+``--small-jobs`` jobs due at random ticks. FIFO dispatches in due order (what
+a single broker queue does); fair share runs jobs.fairshare's deficit
+round-robin against Redis.
+"""
+import argparse
+import heapq
+import random
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+from common import percentile, report, setup
+
+SimJob = namedtuple('SimJob', 'id user_id priority scheduled_time')
+EPOCH = datetime(2030, 1, 1, tzinfo=timezone.utc)
+HEAVY_USER = 1
+
+
+def make_jobs(args):
+    rng = random.Random(args.seed)
+    jobs = [SimJob(i, HEAVY_USER, 0, EPOCH) for i in range(args.heavy_jobs)]
+    for user_id in range(2, args.small_users + 2):
+        for _ in range(args.small_jobs):
+            due = EPOCH + timedelta(seconds=rng.randrange(args.arrival_window))
+            jobs.append(SimJob(len(jobs), user_id, 0, due))
+    return jobs
+
+
+def by_tick(jobs):
+    arrivals = {}
+    for job in jobs:
+        arrivals.setdefault(int((job.scheduled_time - EPOCH).total_seconds()), []).append(job)
+    return arrivals
+
+
+def simulate_fifo(jobs, capacity):
+    arrivals = by_tick(jobs)
+    ready = []
+    dispatched = {}
+    tick = 0
+    while len(dispatched) < len(jobs):
+        for job in arrivals.get(tick, []):
+            heapq.heappush(ready, (job.scheduled_time, job.id))
+        for _ in range(min(capacity, len(ready))):
+            _, job_id = heapq.heappop(ready)
+            dispatched[job_id] = tick
+        tick += 1
+    return dispatched
+
+
+def simulate_fair_share(jobs, capacity):
+    from jobs import fairshare
+
+    arrivals = by_tick(jobs)
+    dispatched = {}
+    tick = 0
+    while len(dispatched) < len(jobs):
+        due = arrivals.get(tick, [])
+        for offset in range(0, len(due), 1000):
+            fairshare.enqueue(due[offset:offset + 1000])
+        for job_id in fairshare.pop(capacity, EPOCH + timedelta(seconds=tick)):
+            dispatched[job_id] = tick
+        tick += 1
+    return dispatched
+
+
+def latencies(jobs, dispatched, small):
+    return [
+        dispatched[job.id] - (job.scheduled_time - EPOCH).total_seconds()
+        for job in jobs if (job.user_id != HEAVY_USER) == small
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--heavy-jobs', type=int, default=50_000)
+    parser.add_argument('--small-users', type=int, default=50)
+    parser.add_argument('--small-jobs', type=int, default=5)
+    parser.add_argument('--arrival-window', type=int, default=600)
+    parser.add_argument('--capacity', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    setup(database=False)
+
+    jobs = make_jobs(args)
+    for name, simulate in (("FIFO", simulate_fifo), ("fair share", simulate_fair_share)):
+        dispatched = simulate(jobs, args.capacity)
+        small = latencies(jobs, dispatched, small=True)
+        heavy = latencies(jobs, dispatched, small=False)
+        report(f"{name}: {args.heavy_jobs:,} heavy jobs, {args.small_users} small users, "
+               f"{args.capacity} jobs/tick", [
+            ("small users p50 wait", f"{percentile(small, 50):,.0f} ticks"),
+            ("small users p99 wait", f"{percentile(small, 99):,.0f} ticks"),
+            ("small users max wait", f"{max(small):,.0f} ticks"),
+            ("heavy user drained at", f"tick {max(heavy):,.0f}"),
+        ])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""Signup latency and OTP e-mails per second against a local SMTP stand-in.
+
+    python benchmarks/otp_email.py --signups 300 --rtt 20
+
+Runs a minimal SMTP server in a background thread that waits ``--rtt``
+milliseconds before each reply (``--connect-rtt`` for the greeting), then:
+
+* registers ``--signups`` users the old way, sending the OTP e-mail inside
+  the request on a fresh connection, and the outbox way, where the request
+  only writes the OTP and the outbox row;
+* delivers the queued e-mails with the outbox worker's batched sends over one
+  persistent connection, against one connection per message as before.
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+from common import BENCH_REDIS_DB, percentile, report, setup
+
+
+class SMTPStandIn:
+    """Accepts every message; replies after a fixed delay to mimic a remote server."""
+
+    def __init__(self, rtt, connect_rtt):
+        self.rtt = rtt / 1000
+        self.connect_rtt = connect_rtt / 1000
+        self.connections = self.messages = 0
+        self.ready = threading.Event()
+
+    def start(self):
+        threading.Thread(target=asyncio.run, args=(self.serve(),), daemon=True).start()
+        self.ready.wait()
+        return self.port
+
+    async def serve(self):
+        server = await asyncio.start_server(self.session, '127.0.0.1', 0)
+        self.port = server.sockets[0].getsockname()[1]
+        self.ready.set()
+        await server.serve_forever()
+
+    async def reply(self, writer, line):
+        await asyncio.sleep(self.rtt)
+        writer.write(line.encode() + b'\r\n')
+        await writer.drain()
+
+    async def session(self, reader, writer):
+        self.connections += 1
+        await asyncio.sleep(self.connect_rtt)
+        writer.write(b'220 localhost ESMTP stand-in\r\n')
+        while line := await reader.readline():
+            command = line.decode().strip().upper()
+            if command.startswith(('EHLO', 'HELO')):
+                await self.reply(writer, '250 localhost')
+            elif command == 'DATA':
+                await self.reply(writer, '354 End data with <CR><LF>.<CR><LF>')
+                while (await reader.readline()) not in (b'.\r\n', b''):
+                    pass
+                self.messages += 1
+                await self.reply(writer, '250 OK')
+            elif command == 'QUIT':
+                await self.reply(writer, '221 Bye')
+                break
+            else:
+                await self.reply(writer, '250 OK')
+        writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--signups', type=int, default=300)
+    parser.add_argument('--rtt', type=float, default=20.0, help="Delay before each SMTP reply, in ms.")
+    parser.add_argument('--connect-rtt', type=float, default=60.0,
+                        help="Delay before the greeting, standing in for TCP and TLS setup, in ms.")
+    parser.add_argument('--batch-size', type=int, default=100)
+    args = parser.parse_args()
+
+    setup()
+
+    from django.conf import settings
+    from django.core.mail import send_mail
+    from rest_framework.test import APIRequestFactory
+
+    from authentication import outbox
+    from authentication.models import EmailOutbox
+    from authentication.views import RegisterView
+    from job_processing_system.celery import app
+
+    smtp = SMTPStandIn(args.rtt, args.connect_rtt)
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+    settings.EMAIL_HOST, settings.EMAIL_PORT = '127.0.0.1', smtp.start()
+    settings.EMAIL_USE_TLS = False
+    app.conf.broker_url = f"redis://localhost:6379/{BENCH_REDIS_DB}"
+
+    register = RegisterView.as_view()
+    factory = APIRequestFactory()
+
+    def signup(email):
+        request = factory.post('/api/register/', {"email": email, "password": "bench-password"}, format='json')
+        started = time.perf_counter()
+        response = register(request)
+        assert response.status_code == 201, response.data
+        return started
+
+    inline_latencies = []
+    for i in range(args.signups):
+        started = signup(f"inline{i}@example.com")
+        # The request used to send the OTP before responding.
+        email = EmailOutbox.objects.latest('id')
+        send_mail(email.subject, email.body, None, [email.recipient], fail_silently=False)
+        inline_latencies.append((time.perf_counter() - started) * 1000)
+    EmailOutbox.objects.all().delete()
+
+    outbox_latencies = []
+    for i in range(args.signups):
+        started = signup(f"outbox{i}@example.com")
+        outbox_latencies.append((time.perf_counter() - started) * 1000)
+
+    queued = list(EmailOutbox.objects.values_list('subject', 'body', 'recipient'))
+    started = time.perf_counter()
+    for subject, body, recipient in queued:
+        send_mail(subject, body, None, [recipient], fail_silently=False)
+    per_message_rate = len(queued) / (time.perf_counter() - started)
+
+    connections = smtp.connections
+    started = time.perf_counter()
+    sent = outbox.send_pending(batch_size=args.batch_size)
+    batched_rate = sent / (time.perf_counter() - started)
+
+    report(f"{args.signups:,} signups, SMTP reply delay {args.rtt:g} ms, connect {args.connect_rtt:g} ms", [
+        ("signup p50, send in request", f"{percentile(inline_latencies, 50):.1f} ms"),
+        ("signup p99, send in request", f"{percentile(inline_latencies, 99):.1f} ms"),
+        ("signup p50, outbox", f"{percentile(outbox_latencies, 50):.1f} ms"),
+        ("signup p99, outbox", f"{percentile(outbox_latencies, 99):.1f} ms"),
+        ("emails/s, connection per message", f"{per_message_rate:,.1f}"),
+        ("emails/s, outbox worker", f"{batched_rate:,.1f}"),
+        ("outbox worker connections", f"{smtp.connections - connections}"),
+    ])
+
+
+if __name__ == '__main__':
+    main()
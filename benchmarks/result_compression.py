@@ -0,0 +1,106 @@
+"""Storage size and read latency of compressed JobResult text.
+
+    python benchmarks/result_compression.py --results 2000 --log-lines 200
+
+Writes ``--results`` results whose output is a synthetic job log, once
+through the model (compressed) and once as plain text the way rows were
+stored before compression, then compares the bytes stored and the time to
+load a result and read its output.
+"""
+import argparse
+import random
+import time
+
+from common import percentile, report, setup
+
+LEVELS = ('INFO', 'INFO', 'INFO', 'DEBUG', 'WARNING', 'ERROR')
+MESSAGES = (
+    "Fetched batch {n} from upstream in {ms} ms",
+    "Processed {n} records, {ms} skipped",
+    "Retrying connection to worker-{n} after {ms} ms",
+    "Checkpoint {n} written",
+    "Cache hit ratio {ms}% for shard {n}",
+)
+
+
+def make_log(rng, lines):
+    return "\n".join(
+        f"2026-10-18T12:{i // 60 % 60:02d}:{i % 60:02d}.{rng.randrange(1000):03d}Z "
+        f"{rng.choice(LEVELS):<7} jobs.worker: "
+        + rng.choice(MESSAGES).format(n=rng.randrange(10_000), ms=rng.randrange(1000))
+        for i in range(lines)
+    )
+
+
+def read_latencies(result_ids, rounds):
+    from jobs.models import JobResult
+
+    latencies = []
+    for _ in range(rounds):
+        for pk in result_ids:
+            started = time.perf_counter()
+            len(JobResult.objects.get(pk=pk).output)
+            latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--results', type=int, default=2000)
+    parser.add_argument('--log-lines', type=int, default=200)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    setup()
+
+    from django.db import connection
+    from django.utils import timezone
+
+    from authentication.models import CustomUser
+    from jobs.models import Job, JobResult
+
+    rng = random.Random(args.seed)
+    logs = [make_log(rng, args.log_lines) for _ in range(args.results)]
+    user = CustomUser.objects.create_user(email="bench@example.com", password="bench-password")
+    jobs = Job.objects.bulk_create(
+        Job(user=user, name=f"Job {i}", description="benchmark", scheduled_time=timezone.now(), status='completed')
+        for i in range(2 * args.results)
+    )
+
+    compressed = JobResult.objects.bulk_create(
+        JobResult(job=job, output=log) for job, log in zip(jobs, logs)
+    )
+    plain = JobResult.objects.bulk_create(JobResult(job=job) for job in jobs[args.results:])
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            "UPDATE jobs_jobresult SET output = %s WHERE id = %s",
+            [(log, result.pk) for result, log in zip(plain, logs)],
+        )
+
+    def stored_bytes(results):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT SUM(LENGTH(CAST(output AS BLOB))) FROM jobs_jobresult "
+                f"WHERE id IN ({','.join('%s' for _ in results)})",
+                [result.pk for result in results],
+            )
+            return cursor.fetchone()[0]
+
+    plain_bytes, compressed_bytes = stored_bytes(plain), stored_bytes(compressed)
+    plain_reads = read_latencies([result.pk for result in plain], args.rounds)
+    compressed_reads = read_latencies([result.pk for result in compressed], args.rounds)
+
+    report(f"{args.results:,} results, {args.log_lines} log lines each", [
+        ("plain text stored", f"{plain_bytes / 1024 ** 2:.2f} MiB"),
+        ("compressed stored", f"{compressed_bytes / 1024 ** 2:.2f} MiB"),
+        ("ratio", f"{plain_bytes / compressed_bytes:.1f}x"),
+        ("plain read p50", f"{percentile(plain_reads, 50):.3f} ms"),
+        ("plain read p99", f"{percentile(plain_reads, 99):.3f} ms"),
+        ("compressed read p50", f"{percentile(compressed_reads, 50):.3f} ms"),
+        ("compressed read p99", f"{percentile(compressed_reads, 99):.3f} ms"),
+    ])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Dispatch latency of jobs.scheduler with a large backlog of future jobs.
+
+    python benchmarks/scheduler_dispatch.py --backlog 1000000 --due 20000
+
+Loads ``--backlog`` jobs scheduled a day ahead, then streams ``--due`` jobs
+coming due over ``--window`` seconds and runs the same claim loop as
+``manage.py run_scheduler``. Reports how late each job was claimed and how
+long each claim round-trip took.
+"""
+import argparse
+import time
+
+from common import percentile, report, setup
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--backlog', type=int, default=1_000_000)
+    parser.add_argument('--due', type=int, default=20_000)
+    parser.add_argument('--window', type=float, default=10.0)
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    setup(database=False)
+
+    from jobs import scheduler
+    conn = scheduler._redis()
+
+    start = time.time()
+    future = start + 86400
+    pipe = conn.pipeline(transaction=False)
+    for offset in range(0, args.backlog, 10_000):
+        pipe.zadd(scheduler.SCHEDULE_KEY, {
+            str(job_id): future + job_id
+            for job_id in range(offset, min(offset + 10_000, args.backlog))
+        })
+        pipe.execute()
+    load_time = time.time() - start
+
+    first_due = time.time() + 1.0
+    due_at = {
+        args.backlog + i: first_due + args.window * i / args.due
+        for i in range(args.due)
+    }
+    conn.zadd(scheduler.SCHEDULE_KEY, {str(job_id): ts for job_id, ts in due_at.items()})
+
+    lateness = []
+    claim_times = []
+    remaining = args.due
+    while remaining:
+        t0 = time.perf_counter()
+        claimed = scheduler.claim_due(args.batch_size)
+        claim_times.append(time.perf_counter() - t0)
+        now = time.time()
+        for job_id in claimed:
+            lateness.append(now - due_at[job_id])
+        remaining -= len(claimed)
+        if len(claimed) < args.batch_size:
+            next_due = scheduler.next_due()
+            delay = 1.0 if next_due is None else next_due - time.time()
+            time.sleep(min(max(delay, 0.001), 1.0))
+
+    report(f"Scheduler dispatch with {args.backlog:,} future jobs queued", [
+        ("backlog load time", f"{load_time:.1f}s"),
+        ("jobs claimed", f"{len(lateness):,}"),
+        ("claim calls", f"{len(claim_times):,}"),
+        ("claim p50", f"{percentile(claim_times, 50) * 1000:.3f}ms"),
+        ("claim p99", f"{percentile(claim_times, 99) * 1000:.3f}ms"),
+        ("dispatch lateness p50", f"{percentile(lateness, 50) * 1000:.2f}ms"),
+        ("dispatch lateness p99", f"{percentile(lateness, 99) * 1000:.2f}ms"),
+        ("dispatch lateness max", f"{max(lateness) * 1000:.2f}ms"),
+        ("backlog left", f"{conn.zcard(scheduler.SCHEDULE_KEY):,}"),
+    ])
+    conn.delete(scheduler.SCHEDULE_KEY)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,18 @@
+"""Settings for API servers started by the load benchmarks: the project
+settings with a throwaway SQLite file and Redis database (see common.py)."""
+import os
+
+from job_processing_system.settings import *  # noqa: F401,F403
+from job_processing_system.settings import CACHES
+
+DEBUG = False
+ALLOWED_HOSTS = ['127.0.0.1', 'localhost']
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['BENCH_DB_PATH'],
+    }
+}
+for config in CACHES.values():
+    if config['BACKEND'].startswith('django_redis'):
+        config['LOCATION'] = f"redis://localhost:6379/{os.getenv('BENCH_REDIS_DB', '15')}"
@@ -0,0 +1,65 @@
+"""Time added to a request by the token-bucket throttle.
+
+    python benchmarks/throttle_overhead.py --checks 20000
+
+Times ``--checks`` TokenBucketThrottle.allow_request() calls for one client
+against Redis (one script call per check) and against the in-process
+fallback buckets, next to a view with no throttle scope.
+"""
+import argparse
+import time
+
+from common import percentile, report, setup
+
+
+def time_checks(throttle, request, view, checks):
+    latencies = []
+    for _ in range(checks):
+        started = time.perf_counter()
+        throttle.allow_request(request, view)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--checks', type=int, default=20_000)
+    args = parser.parse_args()
+
+    setup(database=False)
+
+    from django.conf import settings
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    from authentication import throttling
+
+    settings.API_THROTTLE_RATES = {'bench': {'default': '1000000000/min'}}
+    request = Request(APIRequestFactory().post('/api/register/'))
+
+    class View:
+        throttle_scope = 'bench'
+
+    class UnscopedView:
+        pass
+
+    class LocalThrottle(throttling.TokenBucketThrottle):
+        def take(self, key, capacity, rate):
+            return throttling.local_buckets.take(key, capacity, rate)
+
+    rows = []
+    for label, throttle, view in (
+        ("no scope", throttling.TokenBucketThrottle(), UnscopedView()),
+        ("Redis script", throttling.TokenBucketThrottle(), View()),
+        ("in-process fallback", LocalThrottle(), View()),
+    ):
+        latencies = time_checks(throttle, request, view, args.checks)
+        rows += [
+            (f"{label} p50", f"{percentile(latencies, 50) * 1000:.1f} us"),
+            (f"{label} p99", f"{percentile(latencies, 99) * 1000:.1f} us"),
+        ]
+    report(f"{args.checks:,} throttle checks, one client", rows)
+
+
+if __name__ == '__main__':
+    main()
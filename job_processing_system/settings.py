@@ -1,5 +1,6 @@
 from pathlib import Path
 import os
+import sys
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -84,18 +85,43 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    # Job outputs above JOB_OUTPUT_INLINE_MAX_BYTES; any storage backend works.
+    "job_outputs": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "OPTIONS": {"location": BASE_DIR / "media" / "job-outputs"},
+    },
+}
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 AUTH_USER_MODEL = "authentication.CustomUser"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "authentication.authentication.CachedJWTAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    "DEFAULT_THROTTLE_CLASSES": [
+        "authentication.throttling.TokenBucketThrottle",
+    ],
 }
 
+# Token-bucket limits per throttle scope and user tier (see
+# authentication/throttling.py); "120/min" allows bursts of 120 requests and
+# refills at 2 a second.
+API_THROTTLE_RATES = {
+    "job-create": {"user": "120/min", "staff": "1200/min"},
+    "job-transition": {"user": "300/min", "staff": "3000/min"},
+    "register": {"default": "10/hour"},
+    "otp": {"default": "10/min"},
+    "login": {"default": "20/min"},
+}
+API_THROTTLE_REDIS_ALIAS = "job_state"
+
 if DEBUG:
     EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
     DEFAULT_FROM_EMAIL = "debug@example.com"
@@ -107,20 +133,147 @@ else:
     EMAIL_HOST_USER = os.getenv("SMTP_USER")
     EMAIL_HOST_PASSWORD = os.getenv("SMTP_PASS")
     DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
+    EMAIL_TIMEOUT = 10
+
+# authentication.user_cache: how long JWT-authenticated users are cached in
+# Redis, and in each process (which other processes' changes can leave stale).
+AUTH_USER_CACHE_REDIS_ALIAS = "job_state"
+AUTH_USER_CACHE_TTL = 300
+AUTH_USER_CACHE_LOCAL_TTL = 5
+
+# E-mail verification codes (authentication.otp). The Redis backend keeps codes
+# in the OTP_REDIS_ALIAS cache's Redis; DatabaseOTPBackend uses OTPVerification.
+OTP_BACKEND = os.getenv("OTP_BACKEND", "authentication.otp.RedisOTPBackend")
+OTP_REDIS_ALIAS = "job_state"
+OTP_TTL = 600
+OTP_MAX_ATTEMPTS = 5
+OTP_RESEND_INTERVAL = 60
+
+# Queued e-mail (authentication.outbox): messages per claimed batch, SMTP
+# connections each worker keeps open, how long a worker holds a batch, the
+# delay before a failed message is retried and how many times it is tried.
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "100"))
+EMAIL_OUTBOX_CONNECTIONS = int(os.getenv("EMAIL_OUTBOX_CONNECTIONS", "4"))
+EMAIL_OUTBOX_LEASE = 60
+EMAIL_OUTBOX_RETRY_DELAY = 30
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
 
 
 CELERY_BROKER_URL = 'redis://localhost:6379'
 
 
+# `manage.py test` clears job state between tests, so it gets a Redis
+# database of its own instead of the live job_state one.
+JOB_STATE_REDIS_DB = os.getenv("TEST_REDIS_DB", "14") if sys.argv[1:2] == ["test"] else "1"
+
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     },
     'job_state': {
         'BACKEND': 'django_redis.cache.RedisCache',
-        'LOCATION': 'redis://localhost:6379/1',
+        'LOCATION': f'redis://localhost:6379/{JOB_STATE_REDIS_DB}',
         'OPTIONS': {
             'CLIENT_CLASS': 'django_redis.client.DefaultClient',
         },
     },
-}
\ No newline at end of file
+}
+
+# Alternative to `manage.py run_scheduler` when running celery beat.
+CELERY_BEAT_SCHEDULE = {
+    'dispatch-due-jobs': {
+        'task': 'jobs.tasks.dispatch_due_jobs',
+        'schedule': 1.0,
+    },
+    'send-email-outbox': {
+        'task': 'authentication.tasks.send_outbox',
+        'schedule': 10.0,
+    },
+    'archive-old-jobs': {
+        'task': 'jobs.tasks.archive_old_jobs',
+        'schedule': 3600.0,
+    },
+}
+
+JOB_BULK_MAX_ITEMS = int(os.getenv("JOB_BULK_MAX_ITEMS", "10000"))
+
+# Concurrency limits for the job handler backends in jobs.executors, and how
+# many more jobs each accepts to wait for a free worker; further jobs go back
+# to the ready queues. Jobs held by a worker are leased for JOB_EXECUTOR_LEASE
+# seconds, renewed every JOB_EXECUTOR_HEARTBEAT; an expired lease fails the job.
+JOB_EXECUTOR_MAX_QUEUED = int(os.getenv("JOB_EXECUTOR_MAX_QUEUED", "4"))
+JOB_EXECUTOR_BACKENDS = {
+    'thread': {
+        'max_workers': int(os.getenv("JOB_THREAD_WORKERS", "8")),
+        'max_queued': JOB_EXECUTOR_MAX_QUEUED,
+    },
+    'process': {
+        'max_workers': int(os.getenv("JOB_PROCESS_WORKERS", str(os.cpu_count() or 1))),
+        'max_queued': JOB_EXECUTOR_MAX_QUEUED,
+    },
+    'asyncio': {
+        'max_workers': int(os.getenv("JOB_ASYNCIO_CONCURRENCY", "100")),
+        'max_queued': JOB_EXECUTOR_MAX_QUEUED,
+    },
+}
+JOB_EXECUTOR_LEASE = 30
+JOB_EXECUTOR_HEARTBEAT = 2
+
+# Fair-share dispatch: at most this many start messages wait in the broker
+# queue; the rest wait in per-user ready queues served by deficit round-robin.
+JOB_DISPATCH_QUEUE_DEPTH = int(os.getenv("JOB_DISPATCH_QUEUE_DEPTH", "100"))
+JOB_FAIR_SHARE_QUANTUM = 1
+
+# Admission control for new jobs (jobs/admission.py): (busy, overloaded)
+# watermarks per load figure, None to ignore one; submissions past them get
+# 429 or 503 with Retry-After JOB_ADMISSION_RETRY_AFTER seconds. The figures
+# are re-read at most every JOB_ADMISSION_SAMPLE_INTERVAL seconds per process.
+JOB_ADMISSION_LIMITS = {
+    'broker_queue': (1000, 10000),
+    'pending': (
+        int(os.getenv("JOB_ADMISSION_PENDING_BUSY", "100000")),
+        int(os.getenv("JOB_ADMISSION_PENDING_OVERLOADED", "500000")),
+    ),
+    'in_progress': (50000, 200000),
+}
+JOB_ADMISSION_RETRY_AFTER = 30
+JOB_ADMISSION_SAMPLE_INTERVAL = 1.0
+
+# Upper bound on the exponential retry backoff of failed jobs, in seconds.
+JOB_RETRY_MAX_DELAY = int(os.getenv("JOB_RETRY_MAX_DELAY", "3600"))
+
+# Server-Sent Events (GET /api/jobs/events/, served over ASGI): events buffered
+# per stream before a slow client is disconnected, seconds between keep-alive
+# comments, and the reconnect delay suggested to clients.
+JOB_EVENTS_QUEUE_SIZE = 100
+JOB_EVENTS_KEEPALIVE = 15
+JOB_EVENTS_RETRY_MS = 3000
+
+# Longest ?wait= accepted by GET /api/jobs/<id>/result/, in seconds.
+JOB_RESULT_MAX_WAIT = 60
+
+# Per-process cache of rendered job detail and result responses (ASGI only):
+# size bound, lifetimes of active and finished jobs' entries in seconds, and
+# how many recent invalidations are remembered to reject racing writes.
+JOB_RESPONSE_CACHE_MAX_BYTES = int(os.getenv("JOB_RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+JOB_RESPONSE_CACHE_ACTIVE_TTL = 30
+JOB_RESPONSE_CACHE_TERMINAL_TTL = 3600
+JOB_RESPONSE_CACHE_TRACKED_INVALIDATIONS = 10000
+
+# Job outputs larger than this many bytes are kept in the job_outputs storage
+# and downloaded from GET /api/jobs/<id>/output/ instead of being inlined.
+JOB_OUTPUT_INLINE_MAX_BYTES = int(os.getenv("JOB_OUTPUT_INLINE_MAX_BYTES", str(64 * 1024)))
+
+# JobResult output and error_message are stored gzip-compressed when at least
+# this many bytes long; see jobs/compression.py.
+JOB_RESULT_COMPRESS_MIN_BYTES = int(os.getenv("JOB_RESULT_COMPRESS_MIN_BYTES", "128"))
+JOB_RESULT_COMPRESS_LEVEL = int(os.getenv("JOB_RESULT_COMPRESS_LEVEL", "6"))
+
+# Terminal jobs finished more than JOB_RETENTION_DAYS ago are moved to the
+# ArchivedJob table (see jobs/retention.py), JOB_ARCHIVE_BATCH_SIZE per
+# transaction and at most JOB_ARCHIVE_ROWS_PER_SECOND on average (0: unpaced).
+JOB_RETENTION_DAYS = int(os.getenv("JOB_RETENTION_DAYS", "30"))
+JOB_ARCHIVE_BATCH_SIZE = int(os.getenv("JOB_ARCHIVE_BATCH_SIZE", "500"))
+JOB_ARCHIVE_ROWS_PER_SECOND = float(os.getenv("JOB_ARCHIVE_ROWS_PER_SECOND", "2000"))
+# Batches per run of the hourly archive_old_jobs task.
+JOB_ARCHIVE_MAX_BATCHES = int(os.getenv("JOB_ARCHIVE_MAX_BATCHES", "100"))
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Job, JobResult
+from . import transitions
+from .models import ArchivedJob, DeadLetter, Job, JobAttempt, JobDependency, JobResult
 
 @admin.register(Job)
 class JobAdmin(admin.ModelAdmin):
@@ -9,6 +10,38 @@ class JobAdmin(admin.ModelAdmin):
     readonly_fields = ('created_at',)
     ordering = ('-created_at',)
 
+@admin.register(JobDependency)
+class JobDependencyAdmin(admin.ModelAdmin):
+    list_display = ('upstream', 'downstream')
+    search_fields = ('upstream__name', 'downstream__name')
+    raw_id_fields = ('upstream', 'downstream')
+
+@admin.register(JobAttempt)
+class JobAttemptAdmin(admin.ModelAdmin):
+    list_display = ('job', 'number', 'failed_at')
+    search_fields = ('job__name', 'job__user__email')
+    raw_id_fields = ('job',)
+
+@admin.register(DeadLetter)
+class DeadLetterAdmin(admin.ModelAdmin):
+    list_display = ('job', 'user', 'attempts', 'created_at')
+    search_fields = ('job__name', 'user__email', 'error_message')
+    raw_id_fields = ('job', 'user')
+    actions = ['replay']
+
+    @admin.action(description='Replay selected jobs')
+    def replay(self, request, queryset):
+        outcomes = transitions.replay_many(queryset.values_list('job_id', flat=True))
+        self.message_user(request, f"Replayed {sum(outcomes.values())} jobs.")
+
+@admin.register(ArchivedJob)
+class ArchivedJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'status', 'created_at', 'archived_at')
+    list_filter = ('status', 'archived_at')
+    search_fields = ('=id', 'user__email')
+    raw_id_fields = ('user',)
+    readonly_fields = ('archived_at',)
+
 @admin.register(JobResult)
 class JobResultAdmin(admin.ModelAdmin):
     list_display = ('job', 'completed_at', 'short_output', 'short_error_message')
@@ -16,6 +49,8 @@ class JobResultAdmin(admin.ModelAdmin):
     readonly_fields = ('completed_at',)
 
     def short_output(self, obj):
+        if obj.output_blob:
+            return f'[stored: {obj.output_size} bytes]'
         return (obj.output[:50] + '...') if obj.output and len(obj.output) > 50 else obj.output
     short_output.short_description = 'Output'
 
@@ -0,0 +1,93 @@
+import time
+
+from django.conf import settings
+from rest_framework import exceptions, status
+
+from . import counters, fairshare
+
+# Admission control for new jobs. The load is sampled at most once every
+# JOB_ADMISSION_SAMPLE_INTERVAL seconds per process: start messages waiting in
+# the broker, and jobs pending and in progress across all users (from the
+# Redis counters; None until the dispatcher has built them, in which case only
+# the broker queue is checked). JOB_ADMISSION_LIMITS gives each figure a (busy, overloaded)
+# pair of watermarks; a submission that would take a figure past the first is
+# refused with 429, past the second with 503, both with a Retry-After.
+OK, BUSY, OVERLOADED = 'ok', 'busy', 'overloaded'
+
+_sample = None
+
+
+class QueueBusy(exceptions.APIException):
+    status_code = status.HTTP_429_TOO_MANY_REQUESTS
+    default_code = 'queue_busy'
+
+    def __init__(self, detail, wait):
+        super().__init__(detail)
+        self.wait = wait
+
+
+class QueueOverloaded(QueueBusy):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_code = 'queue_overloaded'
+
+
+def _measure():
+    totals = counters.get_totals() or {}
+    return {
+        'broker_queue': fairshare.broker_queue_depth(),
+        'pending': totals.get('pending'),
+        'in_progress': totals.get('in-progress'),
+    }
+
+
+def figures():
+    global _sample
+    now = time.monotonic()
+    if _sample is None or _sample[0] <= now:
+        _sample = (now + settings.JOB_ADMISSION_SAMPLE_INTERVAL, _measure())
+    return _sample[1]
+
+
+def assess(load):
+    """(state, figure) for the worst figure in ``load``; figure is None when OK."""
+    worst = (OK, None)
+    for figure, (busy, overloaded) in settings.JOB_ADMISSION_LIMITS.items():
+        value = load[figure]
+        if value is None:
+            continue
+        if overloaded is not None and value > overloaded:
+            return OVERLOADED, figure
+        if busy is not None and value > busy and worst[0] == OK:
+            worst = (BUSY, figure)
+    return worst
+
+
+def get_load():
+    load = figures()
+    state, _ = assess(load)
+    return {
+        **load,
+        'state': state,
+        'limits': {
+            figure: {'busy': busy, 'overloaded': overloaded}
+            for figure, (busy, overloaded) in settings.JOB_ADMISSION_LIMITS.items()
+        },
+        'retry_after': None if state == OK else settings.JOB_ADMISSION_RETRY_AFTER,
+    }
+
+
+def admit(count=1):
+    """Raise QueueBusy or QueueOverloaded unless ``count`` more pending jobs fit."""
+    load = figures()
+    projected = dict(load)
+    if load['pending'] is not None:
+        projected['pending'] += count
+    state, figure = assess(projected)
+    if state == OK:
+        # Count our own submissions until the next sample.
+        load['pending'] = projected['pending']
+        return
+
+    wait = settings.JOB_ADMISSION_RETRY_AFTER
+    detail = f"Job queue is {state} ({figure.replace('_', ' ')}: {load[figure]}); retry in {wait} seconds."
+    raise (QueueOverloaded if state == OVERLOADED else QueueBusy)(detail, wait)
@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete
+from django.utils.module_loading import autodiscover_modules
 
 
 class JobsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'jobs'
+
+    def ready(self):
+        from . import blobs
+
+        post_delete.connect(blobs.delete_result_blob, sender=self.get_model('JobResult'))
+        autodiscover_modules('job_handlers')
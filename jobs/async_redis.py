@@ -0,0 +1,16 @@
+import asyncio
+import weakref
+
+from django.conf import settings
+from redis import asyncio as aioredis
+
+# redis.asyncio clients are bound to the event loop they were first used on,
+# so keep one client per cache alias and loop.
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_redis_connection(alias='job_state'):
+    clients = _clients.setdefault(asyncio.get_running_loop(), {})
+    if alias not in clients:
+        clients[alias] = aioredis.from_url(settings.CACHES[alias]['LOCATION'])
+    return clients[alias]
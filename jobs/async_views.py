@@ -0,0 +1,222 @@
+import asyncio
+import functools
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse
+from rest_framework import exceptions, serializers, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from authentication import user_cache
+
+from . import counters, events, retention
+from .models import ArchivedJob, Job
+from .pagination import JobCursorPagination
+from .serializers import JobResultDetailSerializer, JobSerializer
+from .views import JobResultView, JobSummaryView, JobViewSet, job_queryset
+
+# Async implementations of the read endpoints. Under ASGI they run on the
+# event loop, so a request waiting on the database or Redis does not hold a
+# thread. They answer GET and HEAD with the same payloads as the DRF views;
+# every other method is passed on to the DRF view.
+
+_jwt = JWTAuthentication()
+
+
+async def _authenticate(request):
+    # Honour APIClient.force_authenticate() the way rest_framework's Request does.
+    forced_user = getattr(request, '_force_auth_user', None)
+    if forced_user is not None:
+        return forced_user
+
+    header = _jwt.get_header(request)
+    raw_token = None if header is None else _jwt.get_raw_token(header)
+    if raw_token is None:
+        raise exceptions.NotAuthenticated()
+
+    token = _jwt.get_validated_token(raw_token)
+    try:
+        user_id = token[jwt_settings.USER_ID_CLAIM]
+    except KeyError:
+        raise exceptions.AuthenticationFailed("Token contained no recognizable user identification")
+    user = await user_cache.aget(user_id)
+    if user is None or not user.is_active:
+        raise exceptions.AuthenticationFailed("User not found", code="user_not_found")
+    return user
+
+
+def _render(data, status_code=status.HTTP_200_OK):
+    # A rendered DRF Response, so payloads match the sync views byte for byte.
+    response = Response(data, status=status_code)
+    response.accepted_renderer = JSONRenderer()
+    response.accepted_media_type = JSONRenderer.media_type
+    response.renderer_context = {}
+    return response.render()
+
+
+def _error(exc):
+    data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+    response = _render(data, exc.status_code)
+    if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+        response['WWW-Authenticate'] = _jwt.authenticate_header(None)
+    return response
+
+
+def async_api_view(fallback=None):
+    """Serve GET and HEAD with the decorated coroutine, called with the
+    authenticated, email-verified user; pass other methods to ``fallback``."""
+    fallback = None if fallback is None else sync_to_async(fallback)
+
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def view(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                if fallback is None:
+                    return _error(exceptions.MethodNotAllowed(request.method))
+                return await fallback(request, *args, **kwargs)
+            try:
+                user = await _authenticate(request)
+                if not user.is_email_verified:
+                    raise exceptions.PermissionDenied()
+                response = await handler(Request(request), user, *args, **kwargs)
+            except Http404 as exc:
+                return _error(exceptions.NotFound(*exc.args))
+            except exceptions.APIException as exc:
+                return _error(exc)
+            return response if isinstance(response, HttpResponse) else _render(response)
+
+        view.csrf_exempt = True
+        return view
+    return decorator
+
+
+@async_api_view(JobViewSet.as_view({'post': 'create'}))
+async def job_list(request, user):
+    paginator = JobCursorPagination()
+    page = await paginator.apaginate_queryset(job_queryset(user), request)
+    data = JobSerializer(page, many=True, context={'request': request}).data
+    return paginator.get_paginated_response(data).data
+
+
+def _response_cache(request):
+    # Only ASGI processes keep the long-lived subscription that invalidates
+    # cached responses; a WSGI request's event loop ends with the request.
+    return events.get_response_cache() if isinstance(request._request, ASGIRequest) else None
+
+
+def _cache_ttl(job):
+    if job.is_active:
+        return settings.JOB_RESPONSE_CACHE_ACTIVE_TTL
+    return settings.JOB_RESPONSE_CACHE_TERMINAL_TTL
+
+
+def _cached(content):
+    return HttpResponse(content, content_type='application/json')
+
+
+@async_api_view(JobViewSet.as_view({'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'}))
+async def job_detail(request, user, pk):
+    cache = _response_cache(request)
+    key = ('detail', user.id, pk)
+    if cache is not None:
+        content = cache.get(key)
+        if content is not None:
+            return _cached(content)
+        token = cache.token()
+
+    job = await job_queryset(user).filter(pk=pk).afirst()
+    if job is None:
+        return await _archived_detail(request, user, pk)
+    response = _render(JobSerializer(job, context={'request': request}).data)
+    if cache is not None:
+        cache.set(key, response.content, _cache_ttl(job), token)
+    return response
+
+
+async def _archived(user, pk):
+    # The slow path for jobs moved out of the live tables by jobs.retention.
+    archived = await ArchivedJob.objects.filter(pk=pk, user=user).afirst()
+    if archived is None:
+        raise Http404("No Job matches the given query.")
+    return archived
+
+
+async def _archived_detail(request, user, pk):
+    archived = await _archived(user, pk)
+    data = JobSerializer(retention.load(archived), context={'request': request}).data
+    data['archived_at'] = serializers.DateTimeField().to_representation(archived.archived_at)
+    return data
+
+
+@async_api_view(JobSummaryView.as_view())
+async def job_summary(request, user):
+    return await counters.aget_counts(user.id)
+
+
+async def _finished_job(user, pk):
+    job = await (
+        Job.objects.filter(pk=pk, user=user)
+        .select_related('result')
+        .prefetch_related('attempt_history')
+        .afirst()
+    )
+    if job is None:
+        return retention.load(await _archived(user, pk))
+    return None if job.is_active else job
+
+
+@async_api_view(JobResultView.as_view())
+async def job_result(request, user, pk):
+    wait = request.query_params.get('wait', 0)
+    try:
+        wait = min(float(wait), settings.JOB_RESULT_MAX_WAIT)
+    except ValueError:
+        raise exceptions.ValidationError({"wait": "Must be a number of seconds."})
+
+    cache = _response_cache(request)
+    key = ('result', user.id, pk)
+    if cache is not None:
+        content = cache.get(key)
+        if content is not None:
+            return _cached(content)
+        token = cache.token()
+
+    job = await _finished_job(user, pk)
+    if job is None and wait > 0:
+        # ?wait=<seconds> long-polls: sleep until the job's next published
+        # transition, then check again, until it finishes or time runs out.
+        deadline = time.monotonic() + wait
+        async with events.watch_job(pk) as transitioned:
+            while job is None and (remaining := deadline - time.monotonic()) > 0:
+                transitioned.clear()
+                if cache is not None:
+                    token = cache.token()
+                job = await _finished_job(user, pk)
+                if job is None:
+                    try:
+                        await asyncio.wait_for(transitioned.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        pass
+
+    if job is None:
+        raise exceptions.ValidationError("Result not available until job is completed.")
+    if not hasattr(job, 'result') or not job.result:
+        raise exceptions.NotFound("Result data not found for this job.")
+    response = _render(JobResultDetailSerializer(job.result, context={'request': request}).data)
+    if cache is not None:
+        cache.set(key, response.content, _cache_ttl(job), token)
+    return response
+
+
+@async_api_view()
+async def response_cache_stats(request, user):
+    if not user.is_staff:
+        raise exceptions.PermissionDenied()
+    cache = events.get_response_cache()
+    return {'enabled': cache is not None, **(cache.stats() if cache is not None else {})}
@@ -0,0 +1,46 @@
+import uuid
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.db import transaction
+
+# Outputs above JOB_OUTPUT_INLINE_MAX_BYTES go to the "job_outputs" storage
+# (any Django storage backend, see STORAGES) and the JobResult row keeps only
+# the blob name and the size, so large outputs never travel with the row.
+
+
+def storage():
+    return storages['job_outputs']
+
+
+def prepare_output(job_id, output):
+    """Return the JobResult field values for ``output``, writing it to the
+    blob store first if it is too large to keep inline."""
+    if output is None:
+        return {'output': None}
+    data = output.encode()
+    if len(data) <= settings.JOB_OUTPUT_INLINE_MAX_BYTES:
+        return {'output': output, 'output_size': len(data)}
+    name = storage().save(f"{job_id}/{uuid.uuid4().hex}.txt", ContentFile(data))
+    return {'output': None, 'output_blob': name, 'output_size': len(data)}
+
+
+def discard(fields):
+    """Delete the blob written by prepare_output() for a result that was
+    never saved."""
+    if fields.get('output_blob'):
+        storage().delete(fields['output_blob'])
+
+
+def open_output(result):
+    """Open the result's output, inline or stored, as a binary file."""
+    if result.output_blob:
+        return storage().open(result.output_blob, 'rb')
+    return ContentFile((result.output or '').encode())
+
+
+def delete_result_blob(sender, instance, **kwargs):
+    # post_delete receiver for JobResult; the file goes once the delete commits.
+    if instance.output_blob:
+        transaction.on_commit(lambda: storage().delete(instance.output_blob))
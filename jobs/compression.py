@@ -0,0 +1,88 @@
+import gzip
+
+from django.conf import settings
+from django.db import models
+from django.db.models.query_utils import DeferredAttribute
+
+# JobResult text is mostly repetitive logs, so it is stored gzip-compressed in
+# a binary column. gzip rather than raw zlib or zstd so the stored bytes can
+# be sent as-is to clients that accept "Content-Encoding: gzip". Short values
+# and rows written before compression are kept as plain UTF-8; gzip data
+# always starts with GZIP_MAGIC, which is never valid UTF-8, so both can
+# share the column.
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+class Compressed(bytes):
+    """gzip data loaded from the database and not decompressed yet."""
+
+    def text(self):
+        return gzip.decompress(self).decode()
+
+
+def compress(text):
+    data = text.encode()
+    if len(data) < settings.JOB_RESULT_COMPRESS_MIN_BYTES:
+        return data
+    compressed = gzip.compress(data, compresslevel=settings.JOB_RESULT_COMPRESS_LEVEL, mtime=0)
+    return compressed if len(compressed) < len(data) else data
+
+
+def is_compressed(value):
+    return isinstance(value, (bytes, memoryview)) and bytes(value[:2]) == GZIP_MAGIC
+
+
+def decompress(value):
+    """The text of a stored value, whichever form it is in."""
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, Compressed):
+        return value.text()
+    value = bytes(value)
+    return gzip.decompress(value).decode() if value[:2] == GZIP_MAGIC else value.decode()
+
+
+def stored(instance, name):
+    """The gzip bytes behind ``instance.<name>`` if they are still
+    compressed, without decompressing them; None otherwise."""
+    value = instance.__dict__.get(name)
+    return value if isinstance(value, Compressed) else None
+
+
+class _CompressedAttribute(DeferredAttribute):
+    # Rows are loaded with the compressed bytes; the text is only inflated,
+    # once, when the attribute is read.
+    def __get__(self, instance, cls=None):
+        value = super().__get__(instance, cls)
+        if isinstance(value, Compressed):
+            value = instance.__dict__[self.field.attname] = value.text()
+        return value
+
+    def __set__(self, instance, value):
+        # Defined so the attribute is a data descriptor, which __get__ needs
+        # to see the stored value at all.
+        instance.__dict__[self.field.attname] = value
+
+
+class CompressedTextField(models.TextField):
+    """A TextField kept gzip-compressed in a binary column."""
+
+    descriptor_class = _CompressedAttribute
+
+    def get_internal_type(self):
+        return 'BinaryField'
+
+    def from_db_value(self, value, expression, connection):
+        if value is None or isinstance(value, str):
+            return value
+        value = bytes(value)
+        return Compressed(value) if value[:2] == GZIP_MAGIC else value.decode()
+
+    def get_prep_value(self, value):
+        if value is None or isinstance(value, Compressed):
+            return value
+        return compress(self.to_python(value))
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        value = super().get_db_prep_value(value, connection, prepared)
+        return None if value is None else connection.Database.Binary(bytes(value))
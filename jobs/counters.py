@@ -0,0 +1,143 @@
+from django.db.models import Count
+from django_redis import get_redis_connection
+
+from . import async_redis
+from .models import Job
+
+# Per-user job counts by status, kept in Redis hashes next to the job_state
+# cache and adjusted on every status change so JobSummaryView is an O(1) read.
+# TOTALS_KEY holds the same counts across all users, for admission control.
+COUNTS_KEY = 'jobs:counts:{user_id}'
+TOTALS_KEY = 'jobs:totals'
+STATUSES = [choice for choice, _ in Job.STATUS_CHOICES]
+
+# Only adjust hashes that have been initialised from the database; a missing
+# hash is rebuilt on the next read instead of starting from partial counts.
+_INCREMENT_SCRIPT = """
+for k = 1, #KEYS do
+    if redis.call('EXISTS', KEYS[k]) == 1 then
+        for i = 1, #ARGV, 2 do
+            redis.call('HINCRBY', KEYS[k], ARGV[i], ARGV[i + 1])
+        end
+    end
+end
+"""
+
+
+def _redis():
+    return get_redis_connection('job_state')
+
+
+def _key(user_id):
+    return COUNTS_KEY.format(user_id=user_id)
+
+
+def _increment(user_id, deltas):
+    args = []
+    for status, delta in deltas.items():
+        if delta:
+            args += [status, delta]
+    if args:
+        _redis().register_script(_INCREMENT_SCRIPT)(keys=[_key(user_id), TOTALS_KEY], args=args)
+
+
+def record_created(user_id, count=1, status='pending'):
+    _increment(user_id, {status: count})
+
+
+def record_deleted(user_id, status, count=1):
+    _increment(user_id, {status: -count})
+
+
+def record_transition(user_id, old_status, new_status, count=1):
+    if old_status != new_status:
+        _increment(user_id, {old_status: -count, new_status: count})
+
+
+def count_from_db(user_id):
+    counts = dict.fromkeys(STATUSES, 0)
+    rows = Job.objects.filter(user_id=user_id).values('status').annotate(count=Count('id'))
+    counts.update({row['status']: row['count'] for row in rows})
+    return counts
+
+
+def store(user_id, counts):
+    _redis().hset(_key(user_id), mapping=counts)
+
+
+def _from_hash(stored):
+    counts = dict.fromkeys(STATUSES, 0)
+    counts.update({status.decode(): int(count) for status, count in stored.items()})
+    return counts
+
+
+def get_counts(user_id):
+    stored = _redis().hgetall(_key(user_id))
+    if not stored:
+        counts = count_from_db(user_id)
+        store(user_id, counts)
+        return counts
+    return _from_hash(stored)
+
+
+def get_totals():
+    """Counts across all users, or None until ensure_totals() has built them."""
+    stored = _redis().hgetall(TOTALS_KEY)
+    return _from_hash(stored) if stored else None
+
+
+def ensure_totals():
+    # Counting the whole Job table is too slow for a request, so the
+    # dispatcher rebuilds the totals when they are missing.
+    if not _redis().exists(TOTALS_KEY):
+        counts = dict.fromkeys(STATUSES, 0)
+        rows = Job.objects.values('status').annotate(count=Count('id')).order_by()
+        counts.update({row['status']: row['count'] for row in rows})
+        _redis().hset(TOTALS_KEY, mapping=counts)
+
+
+async def aget_counts(user_id):
+    conn = async_redis.get_redis_connection()
+    stored = await conn.hgetall(_key(user_id))
+    if stored:
+        return _from_hash(stored)
+
+    counts = dict.fromkeys(STATUSES, 0)
+    rows = Job.objects.filter(user_id=user_id).values('status').annotate(count=Count('id'))
+    counts.update({row['status']: row['count'] async for row in rows})
+    await conn.hset(_key(user_id), mapping=counts)
+    return counts
+
+
+def reconcile(fix=False):
+    """Compare stored counters with the Job table; return {user_id: (stored, actual)} for drift."""
+    actual = {}
+    rows = Job.objects.values('user_id', 'status').annotate(count=Count('id')).order_by()
+    for row in rows:
+        actual.setdefault(row['user_id'], dict.fromkeys(STATUSES, 0))[row['status']] = row['count']
+
+    conn = _redis()
+    if fix:
+        conn.delete(TOTALS_KEY)
+        ensure_totals()
+    user_ids = set(actual)
+    for key in conn.scan_iter(COUNTS_KEY.format(user_id='*')):
+        user_ids.add(int(key.decode().rsplit(':', 1)[1]))
+
+    drift = {}
+    for user_id in sorted(user_ids):
+        stored = conn.hgetall(_key(user_id))
+        if not stored:
+            # Not initialised yet; it is built from the database on first read.
+            continue
+        stored_counts = dict.fromkeys(STATUSES, 0)
+        stored_counts.update({status.decode(): int(count) for status, count in stored.items()})
+        expected = actual.get(user_id, dict.fromkeys(STATUSES, 0))
+        if stored_counts != expected:
+            drift[user_id] = (stored_counts, expected)
+            if fix:
+                pipe = conn.pipeline()
+                pipe.delete(_key(user_id))
+                pipe.hset(_key(user_id), mapping=expected)
+                pipe.execute()
+    return drift
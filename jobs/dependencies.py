@@ -0,0 +1,58 @@
+from collections import Counter, defaultdict, deque
+
+from django.db.models import F
+
+from .models import Job, JobDependency
+
+# Each job keeps a count of its unfinished upstream jobs in
+# ``pending_dependencies``. Completing a job decrements its direct successors
+# only, so readiness tracking costs O(out-degree) per completion.
+
+
+def find_cycle(graph):
+    """Return the sorted keys that can never run because of a cycle in
+    ``graph`` ({key: iterable of keys it depends on}), or [] if it is a DAG."""
+    in_degree = {key: len(set(deps)) for key, deps in graph.items()}
+    dependents = defaultdict(list)
+    for key, deps in graph.items():
+        for dep in set(deps):
+            dependents[dep].append(key)
+
+    ready = deque(key for key, degree in in_degree.items() if degree == 0)
+    while ready:
+        for dependent in dependents[ready.popleft()]:
+            in_degree[dependent] -= 1
+            if in_degree[dependent] == 0:
+                ready.append(dependent)
+    return sorted(key for key, degree in in_degree.items() if degree > 0)
+
+
+def release(job_ids):
+    """Decrement the successors of the completed ``job_ids`` and return the
+    ones that became ready. Call inside the completing transaction."""
+    edges = Counter(
+        JobDependency.objects.filter(upstream_id__in=job_ids).values_list('downstream_id', flat=True)
+    )
+    if not edges:
+        return []
+
+    by_count = defaultdict(list)
+    for job_id, count in edges.items():
+        by_count[count].append(job_id)
+    for count, successor_ids in by_count.items():
+        Job.objects.filter(pk__in=successor_ids).update(
+            pending_dependencies=F('pending_dependencies') - count
+        )
+
+    return list(
+        Job.objects.filter(pk__in=list(edges), pending_dependencies=0, status='pending')
+        .only('id', 'scheduled_time')
+    )
+
+
+def pending_dependents(job_ids):
+    return list(
+        Job.objects.filter(upstream_edges__upstream_id__in=job_ids, status='pending')
+        .values_list('id', flat=True)
+        .distinct()
+    )
@@ -0,0 +1,165 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from django_redis import get_redis_connection
+from redis import asyncio as aioredis
+
+from . import async_redis, response_cache
+
+logger = logging.getLogger(__name__)
+
+# Every job transition is published on its owner's channel. API processes
+# listen with a single pattern subscription and fan messages out to the
+# streams open in that process.
+CHANNEL = 'jobs:events:{user_id}'
+
+
+def publish(transitions):
+    """Publish (user_id, job_id, old_status, new_status) tuples."""
+    pipe = get_redis_connection('job_state').pipeline(transaction=False)
+    for user_id, job_id, old_status, new_status in transitions:
+        pipe.publish(
+            CHANNEL.format(user_id=user_id),
+            json.dumps({'id': job_id, 'status': new_status, 'previous': old_status})
+        )
+    pipe.execute()
+
+
+class Broadcaster:
+    """Owns this process's pub/sub connection and one bounded queue per open
+    stream, so an idle stream costs a queue and a suspended coroutine. Also
+    owns the response cache that the same messages invalidate."""
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.queues = defaultdict(set)
+        self.job_waiters = defaultdict(set)
+        self.cache = response_cache.ResponseCache()
+        self.listening = asyncio.Event()
+        self.task = self.loop.create_task(self.listen())
+
+    def subscribe(self, user_id):
+        queue = asyncio.Queue(maxsize=settings.JOB_EVENTS_QUEUE_SIZE)
+        self.queues[user_id].add(queue)
+        return queue
+
+    def unsubscribe(self, user_id, queue):
+        queues = self.queues.get(user_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.queues[user_id]
+
+    def watch(self, job_id):
+        waiter = asyncio.Event()
+        self.job_waiters[job_id].add(waiter)
+        return waiter
+
+    def unwatch(self, job_id, waiter):
+        waiters = self.job_waiters.get(job_id)
+        if waiters is not None:
+            waiters.discard(waiter)
+            if not waiters:
+                del self.job_waiters[job_id]
+
+    def deliver(self, user_id, data):
+        job_id = json.loads(data)['id']
+        self.cache.invalidate(job_id)
+        for waiter in self.job_waiters.get(job_id, ()):
+            waiter.set()
+        for queue in list(self.queues.get(user_id, ())):
+            try:
+                queue.put_nowait(data)
+            except asyncio.QueueFull:
+                # Close streams that cannot keep up instead of buffering for
+                # them; the client reconnects and re-reads the job state.
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+                self.unsubscribe(user_id, queue)
+
+    async def listen(self):
+        client = async_redis.get_redis_connection()
+        while True:
+            try:
+                async with client.pubsub() as pubsub:
+                    await pubsub.psubscribe(CHANNEL.format(user_id='*'))
+                    await pubsub.subscribe(response_cache.INVALIDATE_CHANNEL)
+                    self.listening.set()
+                    async for message in pubsub.listen():
+                        if message['type'] == 'pmessage':
+                            user_id = int(message['channel'].rsplit(b':', 1)[1])
+                            self.deliver(user_id, message['data'].decode())
+                        elif message['type'] == 'message':
+                            for job_id in message['data'].split(b','):
+                                self.cache.invalidate(int(job_id))
+            except aioredis.ConnectionError:
+                logger.warning("Lost the job events subscription, reconnecting.")
+                self.listening.clear()
+                self.cache.clear()
+                await asyncio.sleep(1)
+
+
+_broadcaster = None
+
+
+def _loop_broadcaster():
+    global _broadcaster
+    if _broadcaster is None or _broadcaster.loop is not asyncio.get_running_loop():
+        _broadcaster = Broadcaster()
+    return _broadcaster
+
+
+async def get_broadcaster():
+    broadcaster = _loop_broadcaster()
+    await broadcaster.listening.wait()
+    return broadcaster
+
+
+def get_response_cache():
+    """The running loop's response cache, or None while its subscription is
+    not up (nothing would invalidate the entries)."""
+    broadcaster = _loop_broadcaster()
+    return broadcaster.cache if broadcaster.listening.is_set() else None
+
+
+async def subscribe(user_id):
+    """Return the broadcaster for the running event loop and a queue of the
+    user's job events (JSON strings); None on the queue means disconnect."""
+    broadcaster = await get_broadcaster()
+    return broadcaster, broadcaster.subscribe(user_id)
+
+
+@asynccontextmanager
+async def watch_job(job_id):
+    """Yield an asyncio.Event that is set on the job's next transition.
+    Check the job's state inside the block to avoid missing a transition."""
+    broadcaster = await get_broadcaster()
+    waiter = broadcaster.watch(job_id)
+    try:
+        yield waiter
+    finally:
+        broadcaster.unwatch(job_id, waiter)
+
+
+async def stream(user_id):
+    """Server-Sent Events for one user's jobs, with keep-alive comments so
+    proxies keep the connection open and dead clients are noticed."""
+    broadcaster, queue = await subscribe(user_id)
+    try:
+        yield f"retry: {settings.JOB_EVENTS_RETRY_MS}\n\n"
+        while True:
+            try:
+                data = await asyncio.wait_for(queue.get(), settings.JOB_EVENTS_KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if data is None:
+                return
+            yield f"event: job\ndata: {data}\n\n"
+    finally:
+        broadcaster.unsubscribe(user_id, queue)
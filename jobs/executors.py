@@ -0,0 +1,299 @@
+import asyncio
+import logging
+import threading
+import time
+import traceback
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+from django_redis import get_redis_connection
+
+from . import transitions
+
+logger = logging.getLogger(__name__)
+
+# Job handlers are looked up by ``Job.handler`` and run on one of the
+# backends below. Apps register handlers in a ``job_handlers`` module, which
+# is imported when the jobs app is ready:
+#
+#     @executors.handler('resize-image', backend='process')
+#     def resize_image(job):
+#         ...
+#         return "resized"
+#
+# A handler receives the job as a plain dict and returns its output. Handlers
+# on the ``process`` backend must be importable module-level functions;
+# handlers on the ``asyncio`` backend must be coroutine functions.
+#
+# Each backend accepts at most ``max_workers`` running plus ``max_queued``
+# waiting jobs; start_job takes a slot with reserve() before it starts a job.
+# The jobs a worker holds are leased in Redis and renewed every
+# JOB_EXECUTOR_HEARTBEAT seconds: EXECUTING_KEY scores each job by when its
+# lease runs out, so reclaim() can fail (and so retry) the jobs of a worker
+# that died, and QUEUED_KEY holds the ones still waiting for a free worker,
+# which the dispatcher counts against its budget.
+EXECUTING_KEY = 'jobs:executing'
+QUEUED_KEY = 'jobs:executing:queued'
+
+_RECLAIM_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+for i = 1, #expired, 500 do
+    redis.call('ZREM', KEYS[1], unpack(expired, i, math.min(i + 499, #expired)))
+end
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+return expired
+"""
+
+
+Handler = namedtuple('Handler', 'name func backend')
+
+_handlers = {}
+_backends = {}
+_backends_lock = threading.Lock()
+# {job_id: (backend, future)} for the jobs this process is running.
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+_heartbeat = None
+
+
+def handler(name, backend='thread'):
+    if backend not in BACKEND_CLASSES:
+        raise ValueError(f"Unknown executor backend '{backend}'.")
+
+    def decorator(func):
+        if backend == 'asyncio' and not asyncio.iscoroutinefunction(func):
+            raise TypeError(f"Handler '{name}' must be a coroutine function to run on asyncio.")
+        _handlers[name] = Handler(name, func, backend)
+        return func
+    return decorator
+
+
+def get_handler(name):
+    try:
+        return _handlers[name]
+    except KeyError:
+        raise LookupError(f"No job handler registered as '{name}'.")
+
+
+def registered_handlers():
+    return sorted(_handlers)
+
+
+class Backend:
+    def __init__(self, max_workers, max_queued=0):
+        self.slots = threading.BoundedSemaphore(max_workers + max_queued)
+
+    def reserve(self):
+        return self.slots.acquire(blocking=False)
+
+    def release(self):
+        self.slots.release()
+
+    def waiting(self, future):
+        return not future.running() and not future.done()
+
+
+class ThreadBackend(Backend):
+    def __init__(self, max_workers, max_queued=0):
+        super().__init__(max_workers, max_queued)
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job-handler')
+
+    def submit(self, func, payload):
+        return self.pool.submit(func, payload)
+
+
+class ProcessBackend(Backend):
+    def __init__(self, max_workers, max_queued=0):
+        super().__init__(max_workers, max_queued)
+        self.pool = ProcessPoolExecutor(max_workers=max_workers)
+
+    def submit(self, func, payload):
+        return self.pool.submit(func, payload)
+
+
+class AsyncioBackend(Backend):
+    # One event loop on a daemon thread; the semaphore caps how many
+    # coroutines run at once.
+    def __init__(self, max_workers, max_queued=0):
+        super().__init__(max_workers, max_queued)
+        self.loop = asyncio.new_event_loop()
+        self.semaphore = asyncio.Semaphore(max_workers)
+        threading.Thread(target=self.loop.run_forever, name='job-handler-loop', daemon=True).start()
+
+    def submit(self, func, payload):
+        started = threading.Event()
+        future = asyncio.run_coroutine_threadsafe(self._run(func, payload, started), self.loop)
+        future.started = started
+        return future
+
+    def waiting(self, future):
+        # The concurrent future counts as running while the coroutine waits
+        # for the semaphore.
+        started = getattr(future, 'started', None)
+        return started is not None and not started.is_set() and not future.done()
+
+    async def _run(self, func, payload, started=None):
+        async with self.semaphore:
+            if started is not None:
+                started.set()
+            return await func(payload)
+
+
+BACKEND_CLASSES = {
+    'thread': ThreadBackend,
+    'process': ProcessBackend,
+    'asyncio': AsyncioBackend,
+}
+
+
+def get_backend(name):
+    # Backends are created lazily so pools are started after Celery forks.
+    with _backends_lock:
+        if name not in _backends:
+            options = settings.JOB_EXECUTOR_BACKENDS.get(name, {})
+            _backends[name] = BACKEND_CLASSES[name](**options)
+        return _backends[name]
+
+
+def submit(name, payload):
+    job_handler = get_handler(name)
+    return get_backend(job_handler.backend).submit(job_handler.func, payload)
+
+
+def _handler_backend(name):
+    try:
+        return get_backend(get_handler(name).backend)
+    except LookupError:
+        # Nothing to reserve; run() fails the job.
+        return None
+
+
+def reserve(name):
+    """Take a slot on the backend of handler ``name``; False while it is full."""
+    backend = _handler_backend(name)
+    return backend is None or backend.reserve()
+
+
+def release(name):
+    backend = _handler_backend(name)
+    if backend is not None:
+        backend.release()
+
+
+def _redis():
+    return get_redis_connection('job_state')
+
+
+def _renew(entries):
+    # Call with _in_flight_lock held, so a finished job is never re-added.
+    deadline = time.time() + settings.JOB_EXECUTOR_LEASE
+    pipe = _redis().pipeline(transaction=False)
+    for job_id, (backend, future) in entries.items():
+        pipe.zadd(EXECUTING_KEY, {job_id: deadline})
+        if backend.waiting(future):
+            pipe.zadd(QUEUED_KEY, {job_id: deadline})
+        else:
+            pipe.zrem(QUEUED_KEY, job_id)
+    pipe.execute()
+
+
+def _beat():
+    while True:
+        time.sleep(settings.JOB_EXECUTOR_HEARTBEAT)
+        try:
+            with _in_flight_lock:
+                if _in_flight:
+                    _renew(_in_flight)
+        except Exception:
+            logger.exception("Could not renew the executor leases.")
+
+
+def _track(job_id, backend, future):
+    global _heartbeat
+    with _in_flight_lock:
+        _in_flight[job_id] = (backend, future)
+        _renew({job_id: (backend, future)})
+        if _heartbeat is None:
+            _heartbeat = threading.Thread(target=_beat, name='job-executor-heartbeat', daemon=True)
+            _heartbeat.start()
+
+
+def _untrack(job_id, recorded):
+    with _in_flight_lock:
+        _in_flight.pop(job_id, None)
+        pipe = _redis().pipeline(transaction=False)
+        if recorded:
+            pipe.zrem(EXECUTING_KEY, job_id)
+        pipe.zrem(QUEUED_KEY, job_id)
+        pipe.execute()
+
+
+def queued():
+    """Jobs accepted by the executors of live workers but not yet running."""
+    return _redis().zcount(QUEUED_KEY, time.time(), '+inf')
+
+
+def reclaim(now=None):
+    """Fail the jobs whose worker stopped renewing their lease; the ones
+    with attempts left are retried. Returns their ids."""
+    now = time.time() if now is None else now
+    claim = _redis().register_script(_RECLAIM_SCRIPT)
+    job_ids = [int(job_id) for job_id in claim(keys=[EXECUTING_KEY, QUEUED_KEY], args=[now])]
+    for job_id in job_ids:
+        transitions.fail(job_id, "The worker running this job stopped.")
+    return job_ids
+
+
+# Results are written from a single thread so handlers never hold a database
+# connection and the asyncio loop never blocks on the ORM.
+_completions = ThreadPoolExecutor(max_workers=1, thread_name_prefix='job-completion')
+
+
+def _record(job_id, future):
+    recorded = False
+    try:
+        exc = future.exception()
+        if exc is None:
+            output = future.result()
+            transitions.complete(job_id, output='' if output is None else str(output))
+        else:
+            error = ''.join(traceback.format_exception(exc))
+            transitions.fail(job_id, error)
+        recorded = True
+    finally:
+        # If the outcome could not be written the lease is left to run out,
+        # and reclaim() retries the job.
+        _untrack(job_id, recorded)
+        close_old_connections()
+
+
+def run(job):
+    """Run the job's handler on a slot taken with reserve(); the slot is
+    given back when the handler returns."""
+
+    payload = {
+        'id': job.id,
+        'user_id': job.user_id,
+        'name': job.name,
+        'description': job.description,
+        'scheduled_time': job.scheduled_time.isoformat(),
+        'handler': job.handler,
+    }
+    try:
+        job_handler = get_handler(job.handler)
+        backend = get_backend(job_handler.backend)
+        future = backend.submit(job_handler.func, payload)
+    except Exception as exc:
+        release(job.handler)
+        transitions.fail(job.id, f"Could not start handler: {exc}")
+        return None
+    _track(job.id, backend, future)
+
+    def done(future):
+        backend.release()
+        _completions.submit(_record, job.id, future)
+
+    future.add_done_callback(done)
+    return future
@@ -0,0 +1,176 @@
+from collections import defaultdict
+
+from celery import current_app
+from django.conf import settings
+from django_redis import get_redis_connection
+
+from . import executors
+
+# Due jobs wait in per-user ready queues until a worker slot is free, and
+# deficit round-robin over the users decides who goes next, so one user with
+# a huge backlog cannot starve everybody else. Within a user's queue jobs go
+# out by priority (highest first), then by scheduled time.
+READY_KEY = 'jobs:ready:{user_id}'
+RING_KEY = 'jobs:ready:users'
+ACTIVE_KEY = 'jobs:ready:active'
+DEFICIT_KEY = 'jobs:ready:deficit'
+QUANTUM_KEY = 'jobs:ready:quantum'
+DISPATCHED_KEY = 'jobs:ready:dispatched'
+WAIT_KEY = 'jobs:ready:wait'
+
+MAX_PRIORITY = 9
+# Priority is folded into the ready score ahead of the scheduled timestamp.
+_PRIORITY_SPAN = 1e10
+
+_ENQUEUE_SCRIPT = """
+for i = 1, #ARGV, 3 do
+    local user, job, score = ARGV[i], ARGV[i + 1], ARGV[i + 2]
+    redis.call('ZADD', KEYS[1] .. user, score, job)
+    if redis.call('SADD', KEYS[3], user) == 1 then
+        redis.call('LPUSH', KEYS[2], user)
+    end
+end
+"""
+
+# KEYS: ready prefix, ring, active set, deficits, quanta, dispatched, wait.
+# ARGV: budget, default quantum, now, priority span.
+_POP_SCRIPT = """
+local budget = tonumber(ARGV[1])
+local default_quantum = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local span = tonumber(ARGV[4])
+local out = {}
+local visits = 0
+local max_visits = budget * 10 + redis.call('LLEN', KEYS[2])
+while budget > 0 and visits < max_visits do
+    local user = redis.call('RPOPLPUSH', KEYS[2], KEYS[2])
+    if not user then
+        break
+    end
+    visits = visits + 1
+    local queue = KEYS[1] .. user
+    local quantum = tonumber(redis.call('HGET', KEYS[5], user) or default_quantum)
+    local deficit = tonumber(redis.call('HGET', KEYS[4], user) or 0) + quantum
+    local take = math.min(math.floor(deficit), budget)
+    if take > 0 then
+        local jobs = redis.call('ZRANGE', queue, 0, take - 1, 'WITHSCORES')
+        local waited = 0
+        for i = 1, #jobs, 2 do
+            out[#out + 1] = jobs[i]
+            redis.call('ZREM', queue, jobs[i])
+            waited = waited + math.max(0, now - math.fmod(tonumber(jobs[i + 1]), span))
+        end
+        local taken = #jobs / 2
+        deficit = deficit - taken
+        budget = budget - taken
+        if taken > 0 then
+            redis.call('HINCRBY', KEYS[6], user, taken)
+            redis.call('HINCRBYFLOAT', KEYS[7], user, waited)
+        end
+    end
+    if redis.call('EXISTS', queue) == 0 then
+        redis.call('LREM', KEYS[2], 0, user)
+        redis.call('SREM', KEYS[3], user)
+        redis.call('HDEL', KEYS[4], user)
+    else
+        redis.call('HSET', KEYS[4], user, deficit)
+    end
+end
+return out
+"""
+
+
+def _redis():
+    return get_redis_connection('job_state')
+
+
+def _score(priority, scheduled_time):
+    return (MAX_PRIORITY - priority) * _PRIORITY_SPAN + scheduled_time.timestamp()
+
+
+def enqueue(jobs):
+    args = []
+    for job in jobs:
+        args += [job.user_id, job.id, _score(job.priority, job.scheduled_time)]
+    if args:
+        keys = [READY_KEY.format(user_id=''), RING_KEY, ACTIVE_KEY]
+        _redis().register_script(_ENQUEUE_SCRIPT)(keys=keys, args=args)
+
+
+def discard(job):
+    # True if the job was still waiting in its user's ready queue; an emptied
+    # queue leaves the ring on the next pop().
+    return bool(discard_many([(job.user_id, job.id)]))
+
+
+def discard_many(jobs):
+    """Take (user_id, job_id) pairs out of the ready queues; returns how many
+    were still waiting."""
+    by_user = defaultdict(list)
+    for user_id, job_id in jobs:
+        by_user[user_id].append(job_id)
+    if not by_user:
+        return 0
+    pipe = _redis().pipeline(transaction=False)
+    for user_id, job_ids in by_user.items():
+        pipe.zrem(READY_KEY.format(user_id=user_id), *job_ids)
+    return sum(pipe.execute())
+
+
+def pop(budget, now):
+    if budget <= 0:
+        return []
+    keys = [
+        READY_KEY.format(user_id=''), RING_KEY, ACTIVE_KEY,
+        DEFICIT_KEY, QUANTUM_KEY, DISPATCHED_KEY, WAIT_KEY,
+    ]
+    args = [budget, settings.JOB_FAIR_SHARE_QUANTUM, now.timestamp(), _PRIORITY_SPAN]
+    return [int(job_id) for job_id in _redis().register_script(_POP_SCRIPT)(keys=keys, args=args)]
+
+
+def set_quantum(user_id, quantum):
+    # A user with quantum 2 gets twice the share of a user with quantum 1.
+    if quantum is None:
+        _redis().hdel(QUANTUM_KEY, user_id)
+    else:
+        _redis().hset(QUANTUM_KEY, user_id, quantum)
+
+
+def has_backlog():
+    return _redis().scard(ACTIVE_KEY) > 0
+
+
+def broker_queue_depth():
+    with current_app.pool.acquire(block=True) as conn:
+        queue = current_app.conf.task_default_queue
+        try:
+            return conn.default_channel.queue_declare(queue=queue, passive=True).message_count
+        except conn.channel_errors:
+            # The Redis transport drops empty queues.
+            return 0
+
+
+def dispatch_budget():
+    # Keep the broker queue and the executors' own queues short so dispatch
+    # order is decided here rather than by their FIFOs.
+    return max(0, settings.JOB_DISPATCH_QUEUE_DEPTH - broker_queue_depth() - executors.queued())
+
+
+def stats():
+    conn = _redis()
+    users = [int(user) for user in conn.lrange(RING_KEY, 0, -1)]
+    pipe = conn.pipeline(transaction=False)
+    for user_id in users:
+        pipe.zcard(READY_KEY.format(user_id=user_id))
+    ready = dict(zip(users, pipe.execute()))
+
+    dispatched = {int(user): int(count) for user, count in conn.hgetall(DISPATCHED_KEY).items()}
+    waited = {int(user): float(total) for user, total in conn.hgetall(WAIT_KEY).items()}
+    return {
+        'ready': ready,
+        'dispatched': dispatched,
+        'average_wait': {
+            user_id: waited.get(user_id, 0.0) / count
+            for user_id, count in dispatched.items() if count
+        },
+    }
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from jobs import retention
+
+
+class Command(BaseCommand):
+    help = "Move terminal jobs older than the retention period into the archive table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.JOB_RETENTION_DAYS,
+                            help="Archive jobs that finished more than this many days ago.")
+        parser.add_argument('--batch-size', type=int, default=settings.JOB_ARCHIVE_BATCH_SIZE)
+        parser.add_argument('--max-batches', type=int, default=None)
+        parser.add_argument('--rows-per-second', type=float, default=settings.JOB_ARCHIVE_ROWS_PER_SECOND,
+                            help="Average archiving rate limit; 0 disables pacing.")
+
+    def handle(self, *args, **options):
+        archived = retention.archive(
+            days=options['days'],
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches'],
+            rows_per_second=options['rows_per_second'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} jobs."))
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from jobs.models import JobResult
+
+TEXT_FIELDS = ('output', 'error_message')
+
+
+class Command(BaseCommand):
+    help = "Compress JobResult output and error_message values stored before compression was enabled."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        # Uncompressed values load as str, compressed ones as bytes; only the
+        # str values long enough to be compressed are rewritten.
+        last_id = 0
+        scanned = rewritten = before = 0
+        while True:
+            rows = list(
+                JobResult.objects.filter(pk__gt=last_id).order_by('pk')
+                .values_list('pk', *TEXT_FIELDS)[:options['batch_size']]
+            )
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            scanned += len(rows)
+            with transaction.atomic():
+                for pk, *values in rows:
+                    changes = {
+                        field: value
+                        for field, value in zip(TEXT_FIELDS, values)
+                        if isinstance(value, str) and len(value.encode()) >= settings.JOB_RESULT_COMPRESS_MIN_BYTES
+                    }
+                    if changes:
+                        JobResult.objects.filter(pk=pk).update(**changes)
+                        before += sum(len(value.encode()) for value in changes.values())
+                        rewritten += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Scanned {scanned} results, compressed {rewritten} ({before} bytes of text)."
+        ))
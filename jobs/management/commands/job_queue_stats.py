@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from jobs import fairshare
+
+
+class Command(BaseCommand):
+    help = "Show the fair-share ready queues: backlog, dispatched jobs and average wait per user."
+
+    def handle(self, *args, **options):
+        stats = fairshare.stats()
+        self.stdout.write(f"Broker queue depth: {fairshare.broker_queue_depth()}")
+
+        user_ids = sorted(set(stats['ready']) | set(stats['dispatched']))
+        if not user_ids:
+            self.stdout.write("No jobs have been queued.")
+            return
+
+        self.stdout.write(f"{'user':>8}  {'ready':>8}  {'dispatched':>10}  {'avg wait':>9}")
+        for user_id in user_ids:
+            self.stdout.write(
+                f"{user_id:>8}  {stats['ready'].get(user_id, 0):>8}  "
+                f"{stats['dispatched'].get(user_id, 0):>10}  "
+                f"{stats['average_wait'].get(user_id, 0.0):>8.2f}s"
+            )
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from jobs import counters
+
+
+class Command(BaseCommand):
+    help = "Compare the per-user job status counters with the Job table and report drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true',
+                            help="Overwrite drifted counters with the values from the Job table.")
+
+    def handle(self, *args, **options):
+        drift = counters.reconcile(fix=options['fix'])
+        for user_id, (stored, actual) in drift.items():
+            changes = ", ".join(
+                f"{status}: {stored[status]} -> {actual[status]}"
+                for status in counters.STATUSES
+                if stored[status] != actual[status]
+            )
+            self.stdout.write(f"User {user_id}: {changes}")
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("Counters match the Job table."))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f"Fixed counters for {len(drift)} users."))
+        else:
+            self.stdout.write(self.style.WARNING(f"Counters drifted for {len(drift)} users; rerun with --fix."))
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from jobs import fairshare, scheduler
+from jobs.tasks import dispatch_due_jobs
+
+
+class Command(BaseCommand):
+    help = "Dispatch jobs to the Celery workers as their scheduled_time comes due."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--max-sleep', type=float, default=1.0,
+                            help="Upper bound on the idle wait between polls, in seconds.")
+        parser.add_argument('--rebuild', action='store_true',
+                            help="Re-populate the schedule from pending jobs before starting.")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        max_sleep = options['max_sleep']
+
+        if options['rebuild']:
+            count = scheduler.rebuild()
+            self.stdout.write(f"Rebuilt schedule with {count} pending jobs.")
+
+        self.stdout.write("Scheduler running.")
+        try:
+            while True:
+                dispatched = dispatch_due_jobs(batch_size)
+                if dispatched:
+                    self.stdout.write(f"Dispatched {dispatched} jobs.")
+                if dispatched == batch_size:
+                    continue
+
+                # Sleep until the next job is due, but wake up regularly to
+                # pick up jobs scheduled by other processes in the meantime.
+                next_due = scheduler.next_due()
+                delay = max_sleep if next_due is None else next_due - time.time()
+                if fairshare.has_backlog():
+                    # Ready jobs are waiting for the broker queue to drain.
+                    delay = min(delay, 0.05)
+                time.sleep(min(max(delay, 0.01), max_sleep))
+        except KeyboardInterrupt:
+            self.stdout.write("Scheduler stopped.")
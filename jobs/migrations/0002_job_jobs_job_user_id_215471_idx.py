@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-18 15:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='jobs_job_user_id_215471_idx'),
+        ),
+    ]
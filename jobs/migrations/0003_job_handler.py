@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 15:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0002_job_jobs_job_user_id_215471_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='handler',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+    ]
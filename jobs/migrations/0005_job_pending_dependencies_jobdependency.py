@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-18 15:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0004_job_priority'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='pending_dependencies',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='JobDependency',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('downstream', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upstream_edges', to='jobs.job')),
+                ('upstream', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='downstream_edges', to='jobs.job')),
+            ],
+            options={
+                'verbose_name': 'Job Dependency',
+                'verbose_name_plural': 'Job Dependencies',
+                'unique_together': {('upstream', 'downstream')},
+            },
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2 on 2026-10-18 15:58
+
+import django.core.validators
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0005_job_pending_dependencies_jobdependency'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='max_attempts',
+            field=models.PositiveSmallIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(25)]),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='retry_backoff',
+            field=models.PositiveIntegerField(default=10, help_text='Base retry delay in seconds.'),
+        ),
+        migrations.CreateModel(
+            name='JobAttempt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveSmallIntegerField()),
+                ('error_message', models.TextField()),
+                ('failed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attempt_history', to='jobs.job')),
+            ],
+            options={
+                'verbose_name': 'Job Attempt',
+                'verbose_name_plural': 'Job Attempts',
+                'ordering': ['job', 'failed_at', 'id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DeadLetter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('error_message', models.TextField()),
+                ('attempts', models.PositiveSmallIntegerField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('job', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='dead_letter', to='jobs.job')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dead_letters', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Dead Letter',
+                'verbose_name_plural': 'Dead Letters',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', 'created_at', 'id'], name='jobs_deadle_user_id_47efd9_idx')],
+            },
+        ),
+    ]
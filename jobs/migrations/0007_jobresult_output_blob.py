@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-18 16:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0006_job_retries_deadletter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobresult',
+            name='output_blob',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='jobresult',
+            name='output_size',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2 on 2026-10-18 16:25
+
+import jobs.compression
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0007_jobresult_output_blob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='jobresult',
+            name='error_message',
+            field=jobs.compression.CompressedTextField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='jobresult',
+            name='output',
+            field=jobs.compression.CompressedTextField(blank=True, null=True),
+        ),
+    ]
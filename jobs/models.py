@@ -1,7 +1,10 @@
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.conf import settings
 from django.utils import timezone
 
+from .compression import CompressedTextField
+
 class Job(models.Model):
     STATUS_CHOICES = (
         ('pending', 'Pending'),
@@ -16,6 +19,14 @@ class Job(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     scheduled_time = models.DateTimeField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', db_index=True)
+    handler = models.CharField(max_length=100, blank=True, default='')
+    priority = models.PositiveSmallIntegerField(default=0, validators=[MaxValueValidator(9)])
+    pending_dependencies = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(
+        default=1, validators=[MinValueValidator(1), MaxValueValidator(25)]
+    )
+    retry_backoff = models.PositiveIntegerField(default=10, help_text="Base retry delay in seconds.")
+    attempts = models.PositiveSmallIntegerField(default=0)
 
     def __str__(self):
         return f"{self.name} - {self.status}"
@@ -24,6 +35,7 @@ class Job(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['user', 'status']),
+            models.Index(fields=['user', 'created_at', 'id']),
             models.Index(fields=['scheduled_time']),
         ]
         verbose_name = "Job"
@@ -34,10 +46,61 @@ class Job(models.Model):
         return self.status in ['pending', 'in-progress']
     
 
+class JobDependency(models.Model):
+    upstream = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='downstream_edges')
+    downstream = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='upstream_edges')
+
+    def __str__(self):
+        return f"{self.upstream_id} -> {self.downstream_id}"
+
+    class Meta:
+        unique_together = ('upstream', 'downstream')
+        verbose_name = "Job Dependency"
+        verbose_name_plural = "Job Dependencies"
+
+
+class JobAttempt(models.Model):
+    # One row per failed run; the final outcome is the job's JobResult.
+    # ``number`` counts from 1 again after a dead-lettered job is replayed.
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='attempt_history')
+    number = models.PositiveSmallIntegerField()
+    error_message = models.TextField()
+    failed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Attempt {self.number} of {self.job_id}"
+
+    class Meta:
+        ordering = ['job', 'failed_at', 'id']
+        verbose_name = "Job Attempt"
+        verbose_name_plural = "Job Attempts"
+
+
+class DeadLetter(models.Model):
+    # Jobs that failed on their last allowed attempt, kept until replayed.
+    job = models.OneToOneField(Job, on_delete=models.CASCADE, related_name='dead_letter')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='dead_letters')
+    error_message = models.TextField()
+    attempts = models.PositiveSmallIntegerField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Dead letter for {self.job_id}"
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['user', 'created_at', 'id'])]
+        verbose_name = "Dead Letter"
+        verbose_name_plural = "Dead Letters"
+
+
 class JobResult(models.Model):
     job = models.OneToOneField(Job, on_delete=models.CASCADE, related_name='result')
-    output = models.TextField(null=True, blank=True)
-    error_message = models.TextField(null=True, blank=True)
+    output = CompressedTextField(null=True, blank=True)
+    # Large outputs live in the job_outputs storage instead of ``output``.
+    output_blob = models.CharField(max_length=255, blank=True, default='')
+    output_size = models.PositiveBigIntegerField(null=True, blank=True)
+    error_message = CompressedTextField(null=True, blank=True)
     completed_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -46,4 +109,23 @@ class JobResult(models.Model):
     class Meta:
         ordering = ['-completed_at']
         verbose_name = "Job Result"
-        verbose_name_plural = "Job Results"
\ No newline at end of file
+        verbose_name_plural = "Job Results"
+
+class ArchivedJob(models.Model):
+    # A terminal job moved out of the live tables by jobs.retention, keyed by
+    # its original id. ``payload`` holds the job, its result and its attempts
+    # in Django's JSON serialization format.
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_jobs')
+    status = models.CharField(max_length=20, choices=Job.STATUS_CHOICES)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    payload = CompressedTextField()
+
+    def __str__(self):
+        return f"Archived job {self.id}"
+
+    class Meta:
+        ordering = ['-archived_at']
+        verbose_name = "Archived Job"
+        verbose_name_plural = "Archived Jobs"
@@ -0,0 +1,114 @@
+import binascii
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class JobCursorPagination(BasePagination):
+    # Keyset pagination on (created_at, id), newest first. Every page is a range
+    # scan on the (user, created_at, id) index, so deep pages cost the same as
+    # the first one: no OFFSET and no COUNT(*).
+    page_size = 50
+    max_page_size = 500
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self._set_page(list(self._page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request):
+        return self._set_page([obj async for obj in self._page_queryset(queryset, request)])
+
+    def _page_queryset(self, queryset, request):
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        self.current_page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by('-created_at', '-id')
+        self.reverse = False
+        if self.cursor is not None:
+            self.reverse, created_at, pk = self.cursor
+            if self.reverse:
+                queryset = (
+                    queryset.filter(created_at__gte=created_at)
+                    .exclude(created_at=created_at, id__lte=pk)
+                    .order_by('created_at', 'id')
+                )
+            else:
+                queryset = (
+                    queryset.filter(created_at__lte=created_at)
+                    .exclude(created_at=created_at, id__gte=pk)
+                )
+        return queryset[:self.current_page_size + 1]
+
+    def _set_page(self, page):
+        has_more = len(page) > self.current_page_size
+        page = page[:self.current_page_size]
+        if self.reverse:
+            page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+
+        self.page = page
+        return page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(False, self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(True, self.page[0])
+
+    def encode_cursor(self, reverse, job):
+        raw = f"{int(reverse)}|{job.created_at.isoformat()}|{job.id}"
+        token = urlsafe_b64encode(raw.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            reverse, created_at, pk = urlsafe_b64decode(token.encode()).decode().split('|')
+            created_at = parse_datetime(created_at)
+            if created_at is None:
+                raise ValueError(token)
+            return reverse == '1', created_at, int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
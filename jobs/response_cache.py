@@ -0,0 +1,109 @@
+import time
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from django_redis import get_redis_connection
+
+# Rendered job detail and result responses, per process. Entries are keyed by
+# (endpoint, user_id, job_id) and dropped whenever the job changes: every
+# transition is already published for jobs.events, and edits or deletes that
+# are not transitions are published on INVALIDATE_CHANNEL. The cache belongs
+# to the events broadcaster that delivers those messages, so it never outlives
+# its subscription.
+INVALIDATE_CHANNEL = 'jobs:invalidate'
+
+
+def invalidate(job_ids):
+    """Drop the cached responses of ``job_ids`` in every API process."""
+    job_ids = list(job_ids)
+    if job_ids:
+        get_redis_connection('job_state').publish(INVALIDATE_CHANNEL, ','.join(map(str, job_ids)))
+
+
+class ResponseCache:
+    """Byte-bounded LRU of rendered responses with hit, miss, eviction and
+    invalidation counters."""
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = settings.JOB_RESPONSE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.entries = OrderedDict()
+        self.by_job = defaultdict(set)
+        self.size = 0
+        # Invalidations are numbered so a response rendered from a read that
+        # raced with a transition is not stored afterwards.
+        self.sequence = 0
+        self.invalidated = OrderedDict()
+        self.forgotten = 0
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def token(self):
+        return self.sequence
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None or entry[1] < time.monotonic():
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, key, content, ttl, token):
+        job_id = key[-1]
+        if self.invalidated.get(job_id, 0) > token or self.forgotten > token:
+            # The job changed after the read, or may have: the invalidation
+            # history no longer reaches back that far.
+            return
+        if len(content) > self.max_bytes:
+            return
+        self._remove(key)
+        self.entries[key] = (content, time.monotonic() + ttl)
+        self.by_job[job_id].add(key)
+        self.size += len(content)
+        while self.size > self.max_bytes:
+            self._remove(next(iter(self.entries)))
+            self.evictions += 1
+
+    def invalidate(self, job_id):
+        self.sequence += 1
+        self.invalidated[job_id] = self.sequence
+        self.invalidated.move_to_end(job_id)
+        while len(self.invalidated) > settings.JOB_RESPONSE_CACHE_TRACKED_INVALIDATIONS:
+            self.forgotten = self.invalidated.popitem(last=False)[1]
+        keys = self.by_job.get(job_id, ())
+        if keys:
+            self.invalidations += len(keys)
+            for key in list(keys):
+                self._remove(key)
+
+    def clear(self):
+        # Invalidations may have been missed; nothing cached can be trusted.
+        self.sequence += 1
+        self.forgotten = self.sequence
+        self.invalidated.clear()
+        self.entries.clear()
+        self.by_job.clear()
+        self.size = 0
+
+    def _remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        self.size -= len(entry[0])
+        keys = self.by_job[key[-1]]
+        keys.discard(key)
+        if not keys:
+            del self.by_job[key[-1]]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'bytes': self.size,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
@@ -0,0 +1,111 @@
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import serializers
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import counters, response_cache
+from .models import ArchivedJob, DeadLetter, Job, JobResult
+
+# Terminal jobs older than JOB_RETENTION_DAYS move, with their result and
+# attempt history, into ArchivedJob rows and out of the tables the API lists
+# and counts. Each batch is one short transaction; batches are paced so a
+# large backlog does not saturate the database. Dead-lettered jobs stay until
+# they are replayed.
+TERMINAL = ('completed', 'failed')
+
+
+def _candidates(cutoff, after, batch_size):
+    return list(
+        Job.objects.filter(pk__gt=after, status__in=TERMINAL, dead_letter__isnull=True)
+        .filter(Q(result__completed_at__lt=cutoff) | Q(result__isnull=True, created_at__lt=cutoff))
+        .order_by('pk')
+        .values_list('pk', flat=True)[:batch_size]
+    )
+
+
+def _lock(job_ids):
+    # No joins here: PostgreSQL refuses FOR UPDATE on the nullable side of an
+    # outer join, so the result and attempts are loaded after the lock.
+    return (
+        Job.objects.select_for_update()
+        .filter(pk__in=job_ids, status__in=TERMINAL)
+        .exclude(pk__in=DeadLetter.objects.values('job_id'))
+        .values_list('pk', flat=True)
+    )
+
+
+def archive_batch(job_ids):
+    """Archive the given jobs that are still terminal; returns the ids archived."""
+    with transaction.atomic():
+        locked = list(_lock(job_ids))
+        if not locked:
+            return []
+        jobs = list(
+            Job.objects.filter(pk__in=locked).select_related('result').prefetch_related('attempt_history')
+        )
+        if not jobs:
+            return []
+        archived = []
+        for job in jobs:
+            objects = [job, *([job.result] if hasattr(job, 'result') else []), *job.attempt_history.all()]
+            archived.append(ArchivedJob(
+                id=job.id,
+                user_id=job.user_id,
+                status=job.status,
+                created_at=job.created_at,
+                payload=serializers.serialize('json', objects),
+            ))
+        ArchivedJob.objects.bulk_create(archived)
+
+        won = [job.id for job in jobs]
+        # Stored outputs now belong to the archive; keep the delete below from
+        # removing the blobs.
+        JobResult.objects.filter(job_id__in=won).exclude(output_blob='').update(output_blob='')
+        Job.objects.filter(pk__in=won).delete()
+
+    for (user_id, status), count in Counter((job.user_id, job.status) for job in jobs).items():
+        counters.record_deleted(user_id, status, count)
+    response_cache.invalidate(won)
+    return won
+
+
+def archive(days=None, batch_size=None, max_batches=None, rows_per_second=None):
+    """Archive every terminal job finished more than ``days`` ago, a batch at
+    a time, at most ``rows_per_second`` on average. Returns the number archived."""
+    days = settings.JOB_RETENTION_DAYS if days is None else days
+    batch_size = batch_size or settings.JOB_ARCHIVE_BATCH_SIZE
+    rows_per_second = settings.JOB_ARCHIVE_ROWS_PER_SECOND if rows_per_second is None else rows_per_second
+    cutoff = timezone.now() - timedelta(days=days)
+
+    total = batches = after = 0
+    started = time.monotonic()
+    while max_batches is None or batches < max_batches:
+        job_ids = _candidates(cutoff, after, batch_size)
+        if not job_ids:
+            break
+        after = job_ids[-1]
+        total += len(archive_batch(job_ids))
+        batches += 1
+        if rows_per_second:
+            time.sleep(max(0.0, started + total / rows_per_second - time.monotonic()))
+    return total
+
+
+def load(archived):
+    """Rebuild the unsaved Job of an ArchivedJob, with its ``result`` (if
+    any) and ``attempt_history`` in place for the API serializers."""
+    objects = [item.object for item in serializers.deserialize('json', archived.payload)]
+    job = objects[0]
+    attempts = []
+    for obj in objects[1:]:
+        if isinstance(obj, JobResult):
+            job.result = obj
+        else:
+            attempts.append(obj)
+    job._prefetched_objects_cache = {'attempt_history': attempts}
+    return job
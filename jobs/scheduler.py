@@ -0,0 +1,77 @@
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+from .models import Job
+
+# Due jobs live in a Redis sorted set next to the ``job_state`` cache, scored by
+# their scheduled time, so claiming the next N due jobs is O(log n + N).
+SCHEDULE_KEY = 'jobs:schedule'
+
+# ZRANGEBYSCORE + ZREM in one script: concurrent schedulers never claim the
+# same job twice.
+_CLAIM_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+for i = 1, #due, 500 do
+    redis.call('ZREM', KEYS[1], unpack(due, i, math.min(i + 499, #due)))
+end
+return due
+"""
+
+
+def _redis():
+    return get_redis_connection('job_state')
+
+
+def schedule(job):
+    schedule_many([job])
+
+
+def schedule_many(jobs):
+    mapping = {str(job.id): job.scheduled_time.timestamp() for job in jobs}
+    if mapping:
+        _redis().zadd(SCHEDULE_KEY, mapping)
+
+
+def unschedule(job_id):
+    return unschedule_many([job_id])
+
+
+def unschedule_many(job_ids):
+    # Returns how many of the jobs were still waiting in the schedule.
+    members = [str(job_id) for job_id in job_ids]
+    if not members:
+        return 0
+    return _redis().zrem(SCHEDULE_KEY, *members)
+
+
+def claim_due(limit=100, now=None):
+    now = now or timezone.now()
+    claim = _redis().register_script(_CLAIM_SCRIPT)
+    return [int(job_id) for job_id in claim(keys=[SCHEDULE_KEY], args=[now.timestamp(), limit])]
+
+
+def next_due():
+    head = _redis().zrange(SCHEDULE_KEY, 0, 0, withscores=True)
+    return head[0][1] if head else None
+
+
+def rebuild(batch_size=10000):
+    """Re-populate the schedule from pending jobs, e.g. after a Redis flush."""
+    pending = (
+        Job.objects.filter(status='pending', pending_dependencies=0)
+        .order_by('scheduled_time')
+        .values_list('id', 'scheduled_time')
+    )
+    conn = _redis()
+    total = 0
+    mapping = {}
+    for job_id, scheduled_time in pending.iterator(chunk_size=batch_size):
+        mapping[str(job_id)] = scheduled_time.timestamp()
+        if len(mapping) >= batch_size:
+            conn.zadd(SCHEDULE_KEY, mapping)
+            total += len(mapping)
+            mapping = {}
+    if mapping:
+        conn.zadd(SCHEDULE_KEY, mapping)
+        total += len(mapping)
+    return total
@@ -1,16 +1,73 @@
 from rest_framework import serializers
+from django.conf import settings
+from django.db import transaction
+from django.urls import reverse
 from django.utils import timezone
 
-from .models import Job, JobResult
+from . import dependencies, executors
+from .models import DeadLetter, Job, JobAttempt, JobDependency, JobResult
 
 
 class JobResultSerializer(serializers.ModelSerializer):
+    # Outputs kept in blob storage render as null; clients follow output_url.
+    output_size = serializers.SerializerMethodField()
+    output_url = serializers.SerializerMethodField()
+
     class Meta:
         model = JobResult
-        fields = ("output", "error_message", "completed_at")
+        fields = ("output", "output_size", "output_url", "error_message", "completed_at")
+        read_only_fields = fields
+
+    def get_output_size(self, obj):
+        if obj.output_size is None and obj.output is not None:
+            return len(obj.output.encode())
+        return obj.output_size
+
+    def get_output_url(self, obj):
+        if obj.output is None and not obj.output_blob:
+            return None
+        url = reverse("jobs:job-output", kwargs={"pk": obj.job_id})
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request is not None else url
+
+
+class JobAttemptSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = JobAttempt
+        fields = ("number", "error_message", "failed_at")
+        read_only_fields = fields
+
+
+class JobResultDetailSerializer(JobResultSerializer):
+    attempts = JobAttemptSerializer(source="job.attempt_history", many=True, read_only=True)
+
+    class Meta(JobResultSerializer.Meta):
+        fields = JobResultSerializer.Meta.fields + ("attempts",)
         read_only_fields = fields
 
 
+class JobListSerializer(serializers.ListSerializer):
+    # Invalid items are reported per index instead of failing the whole batch.
+
+    def run_child_validation(self, data):
+        try:
+            return self.child.run_validation(data)
+        except serializers.ValidationError as exc:
+            return exc
+
+    def validate(self, attrs):
+        self.item_errors = {
+            index: item.detail
+            for index, item in enumerate(attrs)
+            if isinstance(item, serializers.ValidationError)
+        }
+        return [item for item in attrs if not isinstance(item, serializers.ValidationError)]
+
+    def create(self, validated_data):
+        jobs = [Job(**attrs) for attrs in validated_data]
+        return Job.objects.bulk_create(jobs, batch_size=1000)
+
+
 class JobSerializer(serializers.ModelSerializer):
     result = JobResultSerializer(read_only=True)
     user = serializers.HiddenField(default=serializers.CurrentUserDefault())
@@ -24,10 +81,17 @@ class JobSerializer(serializers.ModelSerializer):
             "scheduled_time",
             "created_at",
             "status",
+            "handler",
+            "priority",
+            "pending_dependencies",
+            "max_attempts",
+            "retry_backoff",
+            "attempts",
             "result",
             "user",
         )
-        read_only_fields = ("id", "created_at", "status")
+        read_only_fields = ("id", "created_at", "status", "pending_dependencies", "attempts")
+        list_serializer_class = JobListSerializer
 
     def validate_scheduled_time(self, value):
         now = timezone.now()
@@ -35,4 +99,94 @@ class JobSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 f"Scheduled time ({value}) must be in the future. Current time is {now}."
             )
-        return value
\ No newline at end of file
+        return value
+
+    def validate_handler(self, value):
+        if value and value not in executors.registered_handlers():
+            raise serializers.ValidationError(f"Unknown handler '{value}'.")
+        return value
+
+
+class JobBulkTransitionSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False, allow_empty=False,
+        max_length=settings.JOB_BULK_MAX_ITEMS
+    )
+    status = serializers.ChoiceField(choices=Job.STATUS_CHOICES, required=False)
+
+    def validate(self, attrs):
+        if ("ids" in attrs) == ("status" in attrs):
+            raise serializers.ValidationError("Provide either a list of ids or a status filter.")
+        return attrs
+
+
+class DeadLetterSerializer(serializers.ModelSerializer):
+    job_name = serializers.CharField(source="job.name", read_only=True)
+
+    class Meta:
+        model = DeadLetter
+        fields = ("id", "job", "job_name", "error_message", "attempts", "created_at")
+        read_only_fields = fields
+
+
+class DeadLetterReplaySerializer(serializers.Serializer):
+    job_ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False, allow_empty=False,
+        max_length=settings.JOB_BULK_MAX_ITEMS
+    )
+    all = serializers.BooleanField(required=False, default=False)
+
+    def validate(self, attrs):
+        if ("job_ids" in attrs) == attrs["all"]:
+            raise serializers.ValidationError("Provide either a list of job_ids or all=true.")
+        return attrs
+
+
+class JobDAGNodeSerializer(JobSerializer):
+    key = serializers.CharField(max_length=100, write_only=True)
+    depends_on = serializers.ListField(
+        child=serializers.CharField(max_length=100), required=False, default=list, write_only=True
+    )
+
+    class Meta(JobSerializer.Meta):
+        fields = JobSerializer.Meta.fields + ("key", "depends_on")
+        list_serializer_class = serializers.ListSerializer
+
+
+class JobDAGSerializer(serializers.Serializer):
+    jobs = JobDAGNodeSerializer(many=True, allow_empty=False, max_length=settings.JOB_BULK_MAX_ITEMS)
+
+    def validate_jobs(self, nodes):
+        graph = {}
+        for node in nodes:
+            if node["key"] in graph:
+                raise serializers.ValidationError(f"Duplicate key '{node['key']}'.")
+            graph[node["key"]] = set(node["depends_on"])
+
+        for key, deps in graph.items():
+            unknown = sorted(deps - set(graph))
+            if unknown:
+                raise serializers.ValidationError(f"Job '{key}' depends on unknown keys: {', '.join(unknown)}.")
+
+        cycle = dependencies.find_cycle(graph)
+        if cycle:
+            raise serializers.ValidationError(f"Dependency cycle among: {', '.join(cycle)}.")
+        return nodes
+
+    @transaction.atomic
+    def create(self, validated_data):
+        nodes = validated_data["jobs"]
+        jobs = Job.objects.bulk_create([
+            Job(
+                **{field: value for field, value in node.items() if field not in ("key", "depends_on")},
+                pending_dependencies=len(set(node["depends_on"]))
+            )
+            for node in nodes
+        ])
+        by_key = {node["key"]: job for node, job in zip(nodes, jobs)}
+        JobDependency.objects.bulk_create(
+            JobDependency(upstream=by_key[dep], downstream=by_key[node["key"]])
+            for node in nodes
+            for dep in set(node["depends_on"])
+        )
+        return by_key
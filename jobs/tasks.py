@@ -1,54 +1,83 @@
-import time
 from celery import shared_task
+from django.conf import settings
 from django.utils import timezone
-from django.core.cache import caches
 
-from .models import Job, JobResult
-
-state_cache = caches['job_state']
+from . import counters, executors, fairshare, retention, scheduler, transitions
+from .models import Job
 
 
 @shared_task(ignore_result=True)
-def start_job(job_id):
-    job = Job.objects.get(pk=job_id)
-    job.status = Job.STATUS_CHOICES[1][0]
-    job.save(update_fields=['status'])
+def dispatch_due_jobs(limit=500):
+    # Due jobs move from the schedule into the per-user ready queues; the
+    # fair-share queues then decide which of them go to the workers.
+    counters.ensure_totals()
+    executors.reclaim()
+    due_ids = scheduler.claim_due(limit)
+    if due_ids:
+        fairshare.enqueue(
+            Job.objects.filter(pk__in=due_ids, status='pending')
+            .only('id', 'user_id', 'priority', 'scheduled_time')
+        )
 
-    state_cache.set(f"job:{job_id}", 'in-progress')
+    job_ids = fairshare.pop(min(limit, fairshare.dispatch_budget()), timezone.now())
+    # Publish the whole batch over a single broker connection.
+    with start_job.app.producer_or_acquire() as producer:
+        for i, job_id in enumerate(job_ids):
+            try:
+                start_job.apply_async((job_id,), producer=producer)
+            except Exception:
+                # Put undelivered jobs back so the next tick retries them.
+                fairshare.enqueue(Job.objects.filter(pk__in=job_ids[i:], status='pending'))
+                raise
+    return len(job_ids)
 
 
 @shared_task(ignore_result=True)
-def complete_job(job_id):
-    job = Job.objects.get(pk=job_id)
-    if state_cache.get(f"job:{job_id}") != 'in-progress':
-        return
-    
-    time.sleep(1)
-
-    JobResult.objects.create(
-        job=job,
-        output=f"Manually completed at {timezone.now()}",
-        completed_at=timezone.now()
+def start_job(job_id):
+    job = (
+        Job.objects.filter(pk=job_id, status='pending')
+        .only('id', 'user_id', 'name', 'description', 'scheduled_time', 'handler', 'priority')
+        .first()
     )
+    if job is None:
+        return False
+    if job.handler and not executors.reserve(job.handler):
+        # The handler's backend is full: the job stays pending and goes back
+        # to its ready queue, where fair share decides again.
+        fairshare.enqueue([job])
+        return False
+    if not transitions.start(job_id):
+        if job.handler:
+            executors.release(job.handler)
+        return False
+    # Jobs without a handler stay in progress until completed through the API.
+    if job.handler:
+        executors.run(job)
+    return True
 
-    job.status = Job.STATUS_CHOICES[2][0]
-    job.save(update_fields=['status'])
 
-    state_cache.delete(f"job:{job_id}")
+@shared_task(ignore_result=True)
+def complete_job(job_id):
+    return transitions.complete(job_id)
 
 
 @shared_task(ignore_result=True)
 def cancel_job(job_id):
-    job = Job.objects.get(pk=job_id)
-    if state_cache.get(f"job:{job_id}") != 'in-progress':
-        return
-
-    JobResult.objects.create(
-        job=job,
-        error_message="Cancelled by user",
-        completed_at=timezone.now()
-    )
-    job.status = Job.STATUS_CHOICES[3][0]
-    job.save(update_fields=['status'])
+    return transitions.cancel(job_id)
+
 
-    state_cache.delete(f"job:{job_id}")
\ No newline at end of file
+
+@shared_task(ignore_result=True)
+def complete_jobs(job_ids):
+    return transitions.complete_many(job_ids)
+
+
+@shared_task(ignore_result=True)
+def cancel_jobs(job_ids):
+    return transitions.cancel_many(job_ids)
+
+
+@shared_task(ignore_result=True)
+def archive_old_jobs():
+    # Bounded per run so a large backlog is worked off over several runs.
+    return retention.archive(max_batches=settings.JOB_ARCHIVE_MAX_BATCHES)
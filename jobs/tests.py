@@ -1,12 +1,37 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from django.core.management import call_command
+from django.db import OperationalError, close_old_connections, connection
+from django.test import AsyncClient, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from rest_framework.test import APITestCase
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
 from rest_framework import status
 from django.utils import timezone
+import asyncio
+import gzip
+import json
+import shutil
+import tempfile
+import time
 from datetime import timedelta
+from io import StringIO
+from pathlib import Path
 from unittest.mock import patch
 
-from jobs.models import Job, JobResult
+from jobs import admission, compression, counters, events, executors, fairshare, response_cache, retention, scheduler, transitions
+from jobs.models import ArchivedJob, DeadLetter, Job, JobAttempt, JobDependency, JobResult
+from jobs.tasks import cancel_job, complete_job, dispatch_due_jobs, start_job
+from jobs.views import JobViewSet
 from authentication.models import CustomUser
+from rest_framework_simplejwt.tokens import AccessToken
+
+
+def clear_job_redis():
+    conn = scheduler._redis()
+    keys = list(conn.scan_iter('jobs:*'))
+    if keys:
+        conn.delete(*keys)
 
 
 class JobApiTests(APITestCase):
@@ -150,4 +175,1756 @@ class JobApiTests(APITestCase):
         )
         self.client.force_authenticate(user=unverified_user)
         response = self.client.get(self.jobs_url)
-        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+class JobSchedulerTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="scheduler@example.com",
+            password="SecurePass123",
+            is_email_verified=True
+        )
+        self.client.force_authenticate(user=self.user)
+        clear_job_redis()
+
+    def tearDown(self):
+        clear_job_redis()
+
+    def make_job(self, scheduled_time, **kwargs):
+        return Job.objects.create(
+            user=self.user,
+            name="Scheduled Job",
+            description="Runs later",
+            scheduled_time=scheduled_time,
+            **kwargs
+        )
+
+    @patch('jobs.tasks.start_job.delay')
+    def test_create_schedules_instead_of_starting(self, mock_start_job):
+        response = self.client.post(reverse('jobs:jobs:job-list'), {
+            "name": "Later",
+            "description": "Not yet",
+            "scheduled_time": (timezone.now() + timedelta(minutes=5)).isoformat()
+        }, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        mock_start_job.assert_not_called()
+
+        self.assertEqual(scheduler.claim_due(10), [])
+        later = timezone.now() + timedelta(minutes=6)
+        self.assertEqual(scheduler.claim_due(10, now=later), [response.data["id"]])
+
+    def test_claim_due_in_time_order_and_only_once(self):
+        now = timezone.now()
+        late = self.make_job(now - timedelta(seconds=1))
+        early = self.make_job(now - timedelta(seconds=5))
+        future = self.make_job(now + timedelta(hours=1))
+        scheduler.schedule_many([late, early, future])
+
+        self.assertEqual(scheduler.claim_due(10, now=now), [early.id, late.id])
+        self.assertEqual(scheduler.claim_due(10, now=now), [])
+        self.assertEqual(scheduler.next_due(), future.scheduled_time.timestamp())
+
+    @patch('jobs.fairshare.broker_queue_depth', return_value=0)
+    @patch('jobs.tasks.start_job.apply_async')
+    def test_dispatch_due_jobs(self, mock_start_job, mock_depth):
+        due = self.make_job(timezone.now() - timedelta(seconds=1))
+        future = self.make_job(timezone.now() + timedelta(hours=1))
+        scheduler.schedule_many([due, future])
+
+        self.assertEqual(dispatch_due_jobs(), 1)
+        mock_start_job.assert_called_once()
+        self.assertEqual(mock_start_job.call_args.args[0], (due.id,))
+
+    def test_rescheduling_moves_the_job_in_the_schedule(self):
+        job = self.make_job(timezone.now() + timedelta(hours=5))
+        scheduler.schedule(job)
+        url = reverse('jobs:jobs:job-detail', args=[job.id])
+
+        later = timezone.now() + timedelta(days=3)
+        response = self.client.patch(url, {"scheduled_time": later.isoformat()}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(scheduler.claim_due(10, now=timezone.now() + timedelta(hours=6)), [])
+        self.assertEqual(scheduler.claim_due(10, now=later), [job.id])
+
+    def test_priority_change_requeues_a_ready_job(self):
+        job = self.make_job(timezone.now() + timedelta(hours=1))
+        fairshare.enqueue([job])
+
+        response = self.client.patch(
+            reverse('jobs:jobs:job-detail', args=[job.id]), {"priority": 5}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(fairshare.stats()["ready"], {self.user.id: 0})
+        self.assertEqual(scheduler.claim_due(10, now=timezone.now() + timedelta(hours=2)), [job.id])
+
+    def test_cannot_reschedule_a_started_job(self):
+        url_for = lambda job: reverse('jobs:jobs:job-detail', args=[job.id])
+        running = self.make_job(timezone.now() + timedelta(hours=1), status="in-progress")
+        response = self.client.patch(url_for(running), {"priority": 5}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Pending, but already handed to the broker.
+        dispatched = self.make_job(timezone.now() + timedelta(hours=1))
+        response = self.client.patch(url_for(dispatched), {"priority": 5}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Job.objects.get(pk=dispatched.pk).priority, 0)
+
+        response = self.client.patch(url_for(dispatched), {"name": "Renamed"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_rebuild_from_pending_jobs(self):
+        pending = self.make_job(timezone.now() + timedelta(minutes=1))
+        self.make_job(timezone.now() + timedelta(minutes=1), status="completed")
+
+        self.assertEqual(scheduler.rebuild(), 1)
+        self.assertEqual(
+            scheduler.claim_due(10, now=timezone.now() + timedelta(minutes=2)),
+            [pending.id]
+        )
+
+
+class BulkJobSubmissionTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="bulk@example.com",
+            password="SecurePass123",
+            is_email_verified=True
+        )
+        self.client.force_authenticate(user=self.user)
+        self.bulk_url = reverse('jobs:jobs:job-bulk')
+        self.future_time = (timezone.now() + timedelta(minutes=5)).isoformat()
+        clear_job_redis()
+
+    def tearDown(self):
+        clear_job_redis()
+
+    def test_bulk_create_reports_per_item_results(self):
+        payload = [
+            {"name": "Job 1", "description": "first", "scheduled_time": self.future_time},
+            {"name": "Job 2", "description": "past", "scheduled_time": timezone.now().isoformat()},
+            {"name": "Job 3", "description": "third", "scheduled_time": self.future_time},
+        ]
+        with self.assertNumQueries(1):
+            response = self.client.post(self.bulk_url, payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual(response.data["failed"], 1)
+
+        results = response.data["results"]
+        self.assertIn("scheduled_time", results[1]["errors"])
+        created_ids = [results[0]["id"], results[2]["id"]]
+        self.assertEqual(
+            list(Job.objects.filter(id__in=created_ids).values_list("name", flat=True).order_by("name")),
+            ["Job 1", "Job 3"]
+        )
+        self.assertEqual(Job.objects.get(id=results[0]["id"]).user, self.user)
+        self.assertEqual(scheduler._redis().zcard(scheduler.SCHEDULE_KEY), 2)
+
+    def test_bulk_create_all_invalid(self):
+        response = self.client.post(self.bulk_url, [{"name": "No time"}], format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["created"], 0)
+        self.assertFalse(Job.objects.exists())
+
+    def test_bulk_create_rejects_non_list_and_oversized_batches(self):
+        response = self.client.post(self.bulk_url, {"name": "Not a list"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        item = {"name": "Job", "description": "too many", "scheduled_time": self.future_time}
+        with self.settings(JOB_BULK_MAX_ITEMS=2):
+            response = self.client.post(self.bulk_url, [item] * 3, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class JobListQueryTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="queries@example.com",
+            password="SecurePass123",
+            is_email_verified=True
+        )
+        self.other_user = CustomUser.objects.create_user(
+            email="other@example.com",
+            password="SecurePass123",
+            is_email_verified=True
+        )
+        self.client.force_authenticate(user=self.user)
+        self.jobs_url = reverse('jobs:jobs:job-list')
+
+    def create_jobs(self, user, count):
+        for i in range(count):
+            job = Job.objects.create(
+                user=user,
+                name=f"Job {i}",
+                description="query count",
+                scheduled_time=timezone.now() + timedelta(minutes=5),
+                status="completed" if i % 2 else "pending"
+            )
+            if i % 2:
+                JobResult.objects.create(job=job, output=f"output {i}")
+
+    def count_list_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.jobs_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(queries), response
+
+    def test_list_query_count_is_constant(self):
+        self.create_jobs(self.user, 2)
+        small, _ = self.count_list_queries()
+
+        self.create_jobs(self.user, 30)
+        large, response = self.count_list_queries()
+
+        self.assertEqual(small, large)
+        self.assertEqual(large, 1)
+        self.assertEqual(len(response.data["results"]), 32)
+
+    def test_list_only_returns_own_jobs_with_results(self):
+        self.create_jobs(self.user, 2)
+        self.create_jobs(self.other_user, 3)
+
+        _, response = self.count_list_queries()
+        jobs = response.data["results"]
+        self.assertEqual(len(jobs), 2)
+        outputs = sorted(str(job["result"] and job["result"]["output"]) for job in jobs)
+        self.assertEqual(outputs, ["None", "output 1"])
+
+    def test_other_users_job_not_found(self):
+        self.create_jobs(self.other_user, 1)
+        job = Job.objects.get(user=self.other_user)
+        response = self.client.get(reverse('jobs:jobs:job-detail', args=[job.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class JobCursorPaginationTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="pages@example.com",
+            password="SecurePass123",
+            is_email_verified=True
+        )
+        self.client.force_authenticate(user=self.user)
+        self.jobs_url = reverse('jobs:jobs:job-list')
+
+        for i in range(7):
+            Job.objects.create(
+                user=self.user,
+                name=f"Job {i}",
+                description="paged",
+                scheduled_time=timezone.now() + timedelta(minutes=5)
+            )
+        # Force ties on created_at so the id tie-breaker is exercised.
+        created_at = timezone.now()
+        Job.objects.filter(name__in=["Job 2", "Job 3", "Job 4"]).update(created_at=created_at)
+        Job.objects.filter(name__in=["Job 5", "Job 6"]).update(created_at=created_at + timedelta(seconds=1))
+        self.expected = list(
+            Job.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+
+    def get_page(self, url):
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_walk_forward_and_back(self):
+        pages = []
+        url = f"{self.jobs_url}?page_size=3"
+        while url:
+            page = self.get_page(url)
+            pages.append(page)
+            url = page["next"]
+
+        seen = [job["id"] for page in pages for job in page["results"]]
+        self.assertEqual(seen, self.expected)
+        self.assertEqual([len(page["results"]) for page in pages], [3, 3, 1])
+        self.assertIsNone(pages[0]["previous"])
+
+        previous = self.get_page(pages[2]["previous"])
+        self.assertEqual([job["id"] for job in previous["results"]], self.expected[3:6])
+        first = self.get_page(previous["previous"])
+        self.assertEqual([job["id"] for job in first["results"]], self.expected[:3])
+        self.assertEqual(first["next"], pages[0]["next"])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(f"{self.jobs_url}?cursor=not-a-cursor")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class JobExportTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="export@example.com",
+            password="SecurePass123",
+            is_email_verified=True
+        )
+        other_user = CustomUser.objects.create_user(
+            email="other-export@example.com",
+            password="SecurePass123",
+            is_email_verified=True
+        )
+        self.client.force_authenticate(user=self.user)
+        self.export_url = reverse('jobs:jobs:job-export')
+
+        future_time = timezone.now() + timedelta(minutes=5)
+        self.done = Job.objects.create(
+            user=self.user, name="Done", description="has a result",
+            scheduled_time=future_time, status="completed"
+        )
+        JobResult.objects.create(job=self.done, output="all good")
+        self.waiting = Job.objects.create(
+            user=self.user, name="Waiting", description="no result yet",
+            scheduled_time=future_time
+        )
+        Job.objects.create(
+            user=other_user, name="Someone else", description="hidden",
+            scheduled_time=future_time
+        )
+
+    def read_lines(self, content):
+        return [json.loads(line) for line in content.decode().splitlines()]
+
+    def test_export_streams_ndjson(self):
+        response = self.client.get(self.export_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+
+        jobs = self.read_lines(b"".join(response.streaming_content))
+        self.assertEqual([job["id"] for job in jobs], [self.done.id, self.waiting.id])
+        self.assertEqual(jobs[0]["result"]["output"], "all good")
+        self.assertIsNone(jobs[1]["result"])
+
+    def test_export_gzip(self):
+        response = self.client.get(self.export_url, HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+
+        jobs = self.read_lines(gzip.decompress(b"".join(response.streaming_content)))
+        self.assertEqual(len(jobs), 2)
+
+    def test_export_links_outputs_in_blob_storage(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        storages = {
+            "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+            "job_outputs": {"BACKEND": "django.core.files.storage.FileSystemStorage", "OPTIONS": {"location": location}},
+        }
+        with self.settings(STORAGES=storages, JOB_OUTPUT_INLINE_MAX_BYTES=10):
+            Job.objects.filter(pk=self.waiting.pk).update(status=transitions.IN_PROGRESS)
+            transitions.complete(self.waiting.id, "an output too large to keep inline")
+
+            jobs = self.read_lines(b"".join(self.client.get(self.export_url).streaming_content))
+            self.assertEqual(
+                jobs[0]["result"]["output_url"], f"http://testserver/api/jobs/{self.done.id}/output/"
+            )
+            blob = jobs[1]["result"]
+            self.assertIsNone(blob["output"])
+            self.assertEqual(blob["output_size"], 34)
+            self.assertEqual(blob["output_url"], f"http://testserver/api/jobs/{self.waiting.id}/output/")
+
+            response = self.client.get(blob["output_url"])
+            self.assertEqual(b"".join(response.streaming_content), b"an output too large to keep inline")
+
+
+class JobStatusCounterTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="counters@example.com",
+            password="SecurePass123",
+            is_email_verified=True
+        )
+        self.client.force_authenticate(user=self.user)
+        self.summary_url = reverse('jobs:job-summary')
+        clear_job_redis()
+
+    def tearDown(self):
+        clear_job_redis()
+
+    def create_job(self):
+        response = self.client.post(reverse('jobs:jobs:job-list'), {
+            "name": "Counted",
+            "description": "counter test",
+            "scheduled_time": (timezone.now() + timedelta(minutes=5)).isoformat()
+        }, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data["id"]
+
+    def get_summary(self):
+        response = self.client.get(self.summary_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_counters_follow_transitions(self):
+        Job.objects.create(
+            user=self.user, name="Before", description="pre-existing",
+            scheduled_time=timezone.now(), status="completed"
+        )
+        # The first read builds the counters from the database.
+        self.assertEqual(self.get_summary()["completed"], 1)
+
+        first = self.create_job()
+        second = self.create_job()
+        start_job(first)
+        start_job(second)
+        cancel_job(second)
+
+        with self.assertNumQueries(0):
+            summary = self.get_summary()
+        self.assertEqual(summary, {"pending": 0, "in-progress": 1, "completed": 1, "failed": 1})
+        self.assertEqual(summary, counters.count_from_db(self.user.id))
+
+        self.client.delete(reverse('jobs:jobs:job-detail', args=[first]))
+        self.assertEqual(self.get_summary()["in-progress"], 0)
+
+    def test_reconcile_reports_and_fixes_drift(self):
+        self.create_job()
+        self.get_summary()
+        Job.objects.filter(user=self.user).update(status="completed")
+
+        out = StringIO()
+        call_command('reconcile_job_counters', stdout=out)
+        self.assertIn("pending: 1 -> 0", out.getvalue())
+        self.assertEqual(self.get_summary()["pending"], 1)
+
+        call_command('reconcile_job_counters', '--fix', stdout=StringIO())
+        self.assertEqual(self.get_summary(), counters.count_from_db(self.user.id))
+        self.assertEqual(counters.reconcile(), {})
+
+
+class JobTaskTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="tasks@example.com",
+            password="SecurePass123",
+            is_email_verified=True
+        )
+        self.job = Job.objects.create(
+            user=self.user, name="Task Job", description="runs in a worker",
+            scheduled_time=timezone.now()
+        )
+        clear_job_redis()
+
+    def tearDown(self):
+        clear_job_redis()
+
+    @patch('time.sleep')
+    def test_complete_job_does_not_block(self, mock_sleep):
+        start_job(self.job.id)
+        complete_job(self.job.id)
+
+        mock_sleep.assert_not_called()
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, "completed")
+        self.assertTrue(JobResult.objects.filter(job=self.job).exists())
+
+
+class JobTransitionTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="transitions@example.com",
+            password="SecurePass123",
+            is_email_verified=True
+        )
+        self.job = Job.objects.create(
+            user=self.user, name="Stateful", description="state machine",
+            scheduled_time=timezone.now()
+        )
+        clear_job_redis()
+
+    def tearDown(self):
+        clear_job_redis()
+
+    def test_transitions_only_from_allowed_states(self):
+        self.assertFalse(transitions.complete(self.job.id))
+        self.assertTrue(transitions.start(self.job.id))
+        self.assertFalse(transitions.start(self.job.id))
+        self.assertTrue(transitions.complete(self.job.id))
+        self.assertFalse(transitions.cancel(self.job.id))
+
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, "completed")
+        self.assertEqual(JobResult.objects.filter(job=self.job).count(), 1)
+
+    def test_cancel_pending_job_unschedules_it(self):
+        scheduler.schedule(self.job)
+        self.assertTrue(transitions.cancel(self.job.id))
+        self.assertEqual(scheduler.claim_due(10), [])
+        self.assertFalse(transitions.start(self.job.id))
+        self.assertEqual(self.job.result.error_message, "Cancelled by user")
+
+    def test_transition_is_a_single_update(self):
+        with CaptureQueriesContext(connection) as queries:
+            transitions.start(self.job.id)
+        statements = [query["sql"] for query in queries if "SAVEPOINT" not in query["sql"]]
+        self.assertTrue(statements[0].startswith("UPDATE"))
+        self.assertIn("status", statements[0].split("WHERE")[1])
+
+
+class JobTransitionConcurrencyTests(TransactionTestCase):
+    workers = 8
+    rounds = 20
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="race@example.com",
+            password="SecurePass123",
+            is_email_verified=True
+        )
+        clear_job_redis()
+
+    def tearDown(self):
+        clear_job_redis()
+
+    def run_transition(self, action, job_id):
+        try:
+            for _ in range(50):
+                try:
+                    return action(job_id)
+                except OperationalError:
+                    # SQLite reports "database is locked" instead of waiting.
+                    continue
+            raise AssertionError("database stayed locked")
+        finally:
+            close_old_connections()
+
+    def test_conflicting_transitions_have_one_winner(self):
+        for _ in range(self.rounds):
+            job = Job.objects.create(
+                user=self.user, name="Contended", description="race",
+                scheduled_time=timezone.now(), status="in-progress"
+            )
+            actions = [transitions.complete, transitions.cancel] * (self.workers // 2)
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                outcomes = list(pool.map(lambda action: self.run_transition(action, job.id), actions))
+
+            self.assertEqual(outcomes.count(True), 1)
+            self.assertEqual(JobResult.objects.filter(job=job).count(), 1)
+            job.refresh_from_db()
+            result = JobResult.objects.get(job=job)
+            if job.status == "completed":
+                self.assertIsNone(result.error_message)
+            else:
+                self.assertEqual(job.status, "failed")
+                self.assertEqual(result.error_message, "Cancelled by user")
+
+
+class BulkJobTransitionTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="bulk-transitions@example.com",
+            password="SecurePass123",
+            is_email_verified=True
+        )
+        self.other_user = CustomUser.objects.create_user(
+            email="bulk-other@example.com",
+            password="SecurePass123",
+            is_email_verified=True
+        )
+        self.client.force_authenticate(user=self.user)
+        clear_job_redis()
+
+    def tearDown(self):
+        clear_job_redis()
+
+    def make_job(self, status, user=None):
+        return Job.objects.create(
+            user=user or self.user, name=f"{status} job", description="bulk",
+            scheduled_time=timezone.now(), status=status
+        )
+
+    @patch('jobs.tasks.cancel_jobs.delay')
+    def test_bulk_cancel_reports_per_id_outcomes(self, mock_cancel_jobs):
+        pending = self.make_job("pending")
+        running = self.make_job("in-progress")
+        done = self.make_job("completed")
+        foreign = self.make_job("pending", user=self.other_user)
+
+        response = self.client.post(
+            reverse('jobs:jobs:job-bulk-cancel'),
+            {"ids": [pending.id, running.id, done.id, foreign.id, 999999]},
+            format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["accepted"], 2)
+        self.assertEqual(response.data["results"], {
+            pending.id: "accepted",
+            running.id: "accepted",
+            done.id: "skipped: job is completed",
+            foreign.id: "not_found",
+            999999: "not_found",
+        })
+        mock_cancel_jobs.assert_called_once_with([pending.id, running.id])
+
+    @patch('jobs.tasks.complete_jobs.delay')
+    def test_bulk_complete_by_status_filter(self, mock_complete_jobs):
+        running = [self.make_job("in-progress") for _ in range(3)]
+        self.make_job("pending")
+        self.make_job("in-progress", user=self.other_user)
+
+        response = self.client.post(
+            reverse('jobs:jobs:job-bulk-complete'), {"status": "in-progress"}, format="json"
+        )
+        self.assertEqual(response.data["accepted"], 3)
+        self.assertCountEqual(mock_complete_jobs.call_args.args[0], [job.id for job in running])
+
+    @patch('jobs.views.BULK_TRANSITION_CHUNK_SIZE', 2)
+    @patch('jobs.tasks.cancel_jobs.delay')
+    def test_status_filter_is_sent_in_chunks_and_counted(self, mock_cancel_jobs):
+        pending = [self.make_job("pending") for _ in range(5)]
+
+        response = self.client.post(reverse('jobs:jobs:job-bulk-cancel'), {"status": "pending"}, format="json")
+        self.assertEqual(response.data, {"accepted": 5, "skipped": 0})
+        self.assertEqual(
+            [call.args[0] for call in mock_cancel_jobs.call_args_list],
+            [[job.id for job in pending[:2]], [job.id for job in pending[2:4]], [pending[4].id]]
+        )
+
+        mock_cancel_jobs.reset_mock()
+        response = self.client.post(reverse('jobs:jobs:job-bulk-cancel'), {"status": "completed"}, format="json")
+        self.assertEqual(response.data, {"accepted": 0, "skipped": 0})
+        self.make_job("completed")
+        response = self.client.post(reverse('jobs:jobs:job-bulk-cancel'), {"status": "completed"}, format="json")
+        self.assertEqual(response.data, {"accepted": 0, "skipped": 1})
+        mock_cancel_jobs.assert_not_called()
+
+    def test_bulk_transition_requires_ids_or_status(self):
+        url = reverse('jobs:jobs:job-bulk-cancel')
+        self.assertEqual(self.client.post(url, {}, format="json").status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(url, {"ids": [1], "status": "pending"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cancel_many_is_set_based(self):
+        jobs = [self.make_job("pending") for _ in range(5)] + [self.make_job("in-progress") for _ in range(5)]
+        done = self.make_job("completed")
+        counters.get_counts(self.user.id)
+
+        with self.assertNumQueries(6):
+            outcomes = transitions.cancel_many([job.id for job in jobs] + [done.id])
+
+        self.assertEqual(outcomes, {**{job.id: True for job in jobs}, done.id: False})
+        self.assertEqual(Job.objects.filter(status="failed").count(), 10)
+        self.assertEqual(JobResult.objects.filter(error_message="Cancelled by user").count(), 10)
+        self.assertEqual(counters.get_counts(self.user.id), counters.count_from_db(self.user.id))
+
+
+@executors.handler('test-echo')
+def echo_handler(job):
+    return job['description']
+
+
+@executors.handler('test-fail')
+def failing_handler(job):
+    raise RuntimeError(f"boom {job['id']}")
+
+
+@executors.handler('test-async', backend='asyncio')
+async def async_handler(job):
+    return job['name'].upper()
+
+
+class JobExecutorTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="executors@example.com",
+            password="SecurePass123",
+            is_email_verified=True
+        )
+        self.client.force_authenticate(user=self.user)
+        clear_job_redis()
+
+    def tearDown(self):
+        clear_job_redis()
+
+    def make_job(self, handler):
+        return Job.objects.create(
+            user=self.user, name="Handled", description="echo me",
+            scheduled_time=timezone.now(), handler=handler
+        )
+
+    def run_to_completion(self, job):
+        # Record the outcome on this thread so it shares the test transaction.
+        self.assertTrue(transitions.start(job.id))
+        future = executors.submit(job.handler, {'id': job.id, 'name': job.name, 'description': job.description})
+        future.exception(timeout=5)
+        executors._record(job.id, future)
+        job.refresh_from_db()
+        return job
+
+    def test_thread_handler_completes_job(self):
+        job = self.run_to_completion(self.make_job('test-echo'))
+        self.assertEqual(job.status, "completed")
+        self.assertEqual(job.result.output, "echo me")
+
+    def test_asyncio_handler_completes_job(self):
+        job = self.run_to_completion(self.make_job('test-async'))
+        self.assertEqual(job.result.output, "HANDLED")
+
+    def test_handler_error_fails_job(self):
+        job = self.run_to_completion(self.make_job('test-fail'))
+        self.assertEqual(job.status, "failed")
+        self.assertIn(f"RuntimeError: boom {job.id}", job.result.error_message)
+
+    @patch('jobs.executors.run')
+    def test_start_job_dispatches_to_handler(self, mock_run):
+        job = self.make_job('test-echo')
+        start_job(job.id)
+        mock_run.assert_called_once()
+        self.assertEqual(mock_run.call_args.args[0].id, job.id)
+
+        mock_run.reset_mock()
+        start_job(self.make_job('').id)
+        mock_run.assert_not_called()
+
+    def test_backends_accept_a_bounded_number_of_jobs(self):
+        backend = executors.Backend(max_workers=1, max_queued=1)
+        self.assertTrue(backend.reserve())
+        self.assertTrue(backend.reserve())
+        self.assertFalse(backend.reserve())
+        backend.release()
+        self.assertTrue(backend.reserve())
+
+    def test_start_job_requeues_when_the_backend_is_full(self):
+        job = self.make_job('test-echo')
+        with patch('jobs.executors.reserve', return_value=False), patch('jobs.executors.run') as mock_run:
+            self.assertFalse(start_job(job.id))
+        mock_run.assert_not_called()
+        job.refresh_from_db()
+        self.assertEqual(job.status, "pending")
+        self.assertEqual(fairshare.stats()["ready"], {self.user.id: 1})
+
+    @patch('jobs.fairshare.broker_queue_depth', return_value=0)
+    def test_waiting_executor_jobs_count_against_the_dispatch_budget(self, mock_depth):
+        backend = executors.Backend(max_workers=1)
+        waiting, running = Future(), Future()
+        running.set_running_or_notify_cancel()
+        executors._track(1, backend, waiting)
+        executors._track(2, backend, running)
+        self.assertEqual(executors.queued(), 1)
+        with self.settings(JOB_DISPATCH_QUEUE_DEPTH=5):
+            self.assertEqual(fairshare.dispatch_budget(), 4)
+
+        executors._untrack(1, recorded=True)
+        executors._untrack(2, recorded=True)
+        self.assertEqual(executors.queued(), 0)
+        self.assertEqual(executors._redis().zcard(executors.EXECUTING_KEY), 0)
+
+    def test_expired_leases_are_reclaimed(self):
+        job = Job.objects.create(
+            user=self.user, name="Stranded", description="worker died", scheduled_time=timezone.now(),
+            handler='test-echo', status="in-progress", max_attempts=2
+        )
+        executors._redis().zadd(executors.EXECUTING_KEY, {job.id: time.time() - 1})
+
+        self.assertEqual(executors.reclaim(), [job.id])
+        self.assertEqual(executors.reclaim(), [])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ("pending", 1))
+        self.assertEqual(job.attempt_history.get().error_message, "The worker running this job stopped.")
+
+    def test_unknown_handler_rejected(self):
+        response = self.client.post(reverse('jobs:jobs:job-list'), {
+            "name": "Bad handler",
+            "description": "nope",
+            "scheduled_time": (timezone.now() + timedelta(minutes=5)).isoformat(),
+            "handler": "does-not-exist"
+        }, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("handler", response.data)
+
+    def test_asyncio_handlers_must_be_coroutines(self):
+        with self.assertRaises(TypeError):
+            executors.handler('test-not-async', backend='asyncio')(lambda job: None)
+
+
+class FairShareDispatchTests(APITestCase):
+    def setUp(self):
+        self.heavy = CustomUser.objects.create_user(email="heavy@example.com", password="SecurePass123")
+        self.light = CustomUser.objects.create_user(email="light@example.com", password="SecurePass123")
+        self.now = timezone.now()
+        clear_job_redis()
+
+    def tearDown(self):
+        clear_job_redis()
+
+    def make_jobs(self, user, count, priority=0, offset=0):
+        return [
+            Job.objects.create(
+                user=user, name=f"{user.email} {i}", description="fair share",
+                scheduled_time=self.now - timedelta(seconds=100 - offset - i), priority=priority
+            )
+            for i in range(count)
+        ]
+
+    def owners(self, job_ids):
+        users = dict(Job.objects.filter(pk__in=job_ids).values_list("id", "user__email"))
+        return [users[job_id].split("@")[0] for job_id in job_ids]
+
+    def test_round_robin_between_users(self):
+        fairshare.enqueue(self.make_jobs(self.heavy, 20))
+        fairshare.enqueue(self.make_jobs(self.light, 2, offset=50))
+
+        first = fairshare.pop(4, self.now)
+        self.assertCountEqual(self.owners(first), ["heavy", "heavy", "light", "light"])
+        self.assertEqual(self.owners(fairshare.pop(3, self.now)), ["heavy"] * 3)
+
+        stats = fairshare.stats()
+        self.assertEqual(stats["ready"], {self.heavy.id: 15})
+        self.assertEqual(stats["dispatched"], {self.heavy.id: 5, self.light.id: 2})
+        self.assertGreater(stats["average_wait"][self.heavy.id], 50)
+
+    def test_priority_within_a_user(self):
+        low = self.make_jobs(self.heavy, 2)
+        high = self.make_jobs(self.heavy, 1, priority=5, offset=10)
+        fairshare.enqueue(low + high)
+        self.assertEqual(fairshare.pop(3, self.now), [high[0].id, low[0].id, low[1].id])
+
+    def test_quantum_weights_users(self):
+        fairshare.enqueue(self.make_jobs(self.heavy, 30))
+        fairshare.enqueue(self.make_jobs(self.light, 30))
+        fairshare.set_quantum(self.heavy.id, 2)
+
+        owners = self.owners(fairshare.pop(30, self.now))
+        self.assertEqual(owners.count("heavy"), 20)
+        self.assertEqual(owners.count("light"), 10)
+
+    @patch('jobs.fairshare.broker_queue_depth')
+    @patch('jobs.tasks.start_job.apply_async')
+    def test_dispatch_respects_broker_queue_budget(self, mock_start_job, mock_depth):
+        jobs = self.make_jobs(self.heavy, 10)
+        scheduler.schedule_many(jobs)
+
+        with self.settings(JOB_DISPATCH_QUEUE_DEPTH=5):
+            mock_depth.return_value = 2
+            self.assertEqual(dispatch_due_jobs(), 3)
+            mock_depth.return_value = 5
+            self.assertEqual(dispatch_due_jobs(), 0)
+            mock_depth.return_value = 0
+            self.assertEqual(dispatch_due_jobs(), 5)
+
+        self.assertEqual(mock_start_job.call_count, 8)
+        self.assertTrue(fairshare.has_backlog())
+
+    def test_finished_and_deleted_jobs_leave_the_ready_queue(self):
+        cancelled = self.make_jobs(self.heavy, 3)
+        bulk_cancelled = self.make_jobs(self.light, 2)
+        deleted = self.make_jobs(self.heavy, 1, offset=10)
+        fairshare.enqueue(cancelled + bulk_cancelled + deleted)
+
+        transitions.cancel(cancelled[0].id)
+        transitions.cancel_many([job.id for job in bulk_cancelled])
+        self.heavy.is_email_verified = True
+        self.client.force_authenticate(user=self.heavy)
+        response = self.client.delete(reverse('jobs:jobs:job-detail', args=[deleted[0].id]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        self.assertEqual(fairshare.pop(10, self.now), [job.id for job in cancelled[1:]])
+        self.assertFalse(fairshare.has_backlog())
+
+
+class JobDependencyTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="dag@example.com", password="SecurePass123", is_email_verified=True
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('jobs:jobs:job-dag')
+        clear_job_redis()
+
+    def tearDown(self):
+        clear_job_redis()
+
+    def node(self, key, *depends_on):
+        return {
+            "key": key, "name": f"Job {key}", "description": "dag",
+            "scheduled_time": (timezone.now() + timedelta(hours=1)).isoformat(),
+            "depends_on": list(depends_on),
+        }
+
+    def submit_diamond(self):
+        # a -> (b, c) -> d
+        response = self.client.post(self.url, {"jobs": [
+            self.node("a"), self.node("b", "a"), self.node("c", "a"), self.node("d", "b", "c"),
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return {key: Job.objects.get(pk=job_id) for key, job_id in response.data["jobs"].items()}
+
+    def scheduled(self):
+        return sorted(int(job_id) for job_id in scheduler._redis().zrange(scheduler.SCHEDULE_KEY, 0, -1))
+
+    def test_submit_schedules_only_roots(self):
+        jobs = self.submit_diamond()
+        self.assertEqual(JobDependency.objects.count(), 4)
+        self.assertEqual(
+            {key: job.pending_dependencies for key, job in jobs.items()},
+            {"a": 0, "b": 1, "c": 1, "d": 2}
+        )
+        self.assertEqual(self.scheduled(), [jobs["a"].id])
+        self.assertEqual(counters.get_counts(self.user.id)["pending"], 4)
+
+    def test_cycle_is_rejected(self):
+        response = self.client.post(self.url, {"jobs": [
+            self.node("a"), self.node("b", "a", "c"), self.node("c", "b"),
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("cycle", str(response.data["jobs"]))
+        self.assertFalse(Job.objects.exists())
+
+    def test_unknown_dependency_is_rejected(self):
+        response = self.client.post(self.url, {"jobs": [self.node("a", "missing")]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def start(self, *jobs):
+        scheduler.unschedule_many([job.id for job in jobs])
+        Job.objects.filter(pk__in=[job.id for job in jobs]).update(status=transitions.IN_PROGRESS)
+
+    def test_deleting_an_upstream_job_fails_its_dependents(self):
+        jobs = self.submit_diamond()
+        response = self.client.delete(reverse('jobs:jobs:job-detail', args=[jobs["b"].id]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        self.assertEqual(Job.objects.get(pk=jobs["d"].id).status, transitions.FAILED)
+        self.assertEqual(JobResult.objects.get(job=jobs["d"]).error_message, "An upstream job was deleted.")
+        self.assertEqual(Job.objects.get(pk=jobs["c"].id).status, transitions.PENDING)
+        self.assertEqual(counters.get_counts(self.user.id), counters.count_from_db(self.user.id))
+
+    def test_deleting_a_completed_upstream_job_keeps_its_dependents(self):
+        jobs = self.submit_diamond()
+        self.start(jobs["a"])
+        transitions.complete(jobs["a"].id)
+        self.client.delete(reverse('jobs:jobs:job-detail', args=[jobs["a"].id]))
+
+        self.assertEqual(Job.objects.get(pk=jobs["b"].id).status, transitions.PENDING)
+        self.assertEqual(self.scheduled(), sorted([jobs["b"].id, jobs["c"].id]))
+
+    def test_completion_releases_successors(self):
+        jobs = self.submit_diamond()
+        self.start(jobs["a"])
+        transitions.complete(jobs["a"].id)
+        self.assertEqual(self.scheduled(), sorted([jobs["b"].id, jobs["c"].id]))
+
+        self.start(jobs["b"], jobs["c"])
+        transitions.complete(jobs["b"].id)
+        jobs["d"].refresh_from_db()
+        self.assertEqual(jobs["d"].pending_dependencies, 1)
+        self.assertEqual(self.scheduled(), [])
+
+        transitions.complete_many([jobs["c"].id])
+        jobs["d"].refresh_from_db()
+        self.assertEqual(jobs["d"].pending_dependencies, 0)
+        self.assertEqual(self.scheduled(), [jobs["d"].id])
+
+    def test_failure_fails_all_descendants(self):
+        jobs = self.submit_diamond()
+        transitions.cancel(jobs["a"].id)
+
+        statuses = dict(Job.objects.values_list("name", "status"))
+        self.assertEqual(statuses, {"Job a": "failed", "Job b": "failed", "Job c": "failed", "Job d": "failed"})
+        self.assertEqual(JobResult.objects.get(job=jobs["d"]).error_message, "An upstream job failed.")
+        self.assertEqual(self.scheduled(), [])
+        self.assertEqual(counters.get_counts(self.user.id)["failed"], 4)
+
+
+class JobRetryTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="retry@example.com", password="SecurePass123", is_email_verified=True
+        )
+        self.client.force_authenticate(user=self.user)
+        clear_job_redis()
+
+    def tearDown(self):
+        clear_job_redis()
+
+    def make_job(self, max_attempts=3, **kwargs):
+        job = Job.objects.create(
+            user=self.user, name="Flaky", description="retry", scheduled_time=timezone.now(),
+            status=transitions.IN_PROGRESS, max_attempts=max_attempts, retry_backoff=10, **kwargs
+        )
+        return job
+
+    def run_and_fail(self, job, error="boom"):
+        Job.objects.filter(pk=job.pk).update(status=transitions.IN_PROGRESS)
+        return transitions.fail(job.id, error)
+
+    def test_retry_delay_backs_off_with_jitter(self):
+        for attempt, base in ((1, 10), (2, 20), (3, 40)):
+            delay = transitions.retry_delay(10, attempt).total_seconds()
+            self.assertGreaterEqual(delay, base / 2)
+            self.assertLessEqual(delay, base)
+        with self.settings(JOB_RETRY_MAX_DELAY=60):
+            self.assertLessEqual(transitions.retry_delay(10, 20).total_seconds(), 60)
+
+    def test_failure_with_attempts_left_is_rescheduled(self):
+        job = self.make_job()
+        counters.get_counts(self.user.id)
+        before = timezone.now()
+        self.assertTrue(transitions.fail(job.id, "boom"))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, transitions.PENDING)
+        self.assertEqual(job.attempts, 1)
+        self.assertGreaterEqual(job.scheduled_time, before + timedelta(seconds=5))
+        self.assertLessEqual(job.scheduled_time, timezone.now() + timedelta(seconds=10))
+        self.assertEqual(
+            scheduler._redis().zscore(scheduler.SCHEDULE_KEY, job.id), job.scheduled_time.timestamp()
+        )
+        self.assertFalse(JobResult.objects.filter(job=job).exists())
+        self.assertEqual(list(job.attempt_history.values_list("number", "error_message")), [(1, "boom")])
+        self.assertEqual(counters.get_counts(self.user.id)["pending"], 1)
+
+    def test_exhausted_job_is_dead_lettered(self):
+        job = self.make_job(max_attempts=2)
+        downstream = Job.objects.create(
+            user=self.user, name="Downstream", description="retry",
+            scheduled_time=timezone.now(), pending_dependencies=1
+        )
+        JobDependency.objects.create(upstream=job, downstream=downstream)
+
+        self.assertTrue(self.run_and_fail(job, "first"))
+        downstream.refresh_from_db()
+        self.assertEqual(downstream.status, transitions.PENDING)
+
+        self.assertTrue(self.run_and_fail(job, "second"))
+        job.refresh_from_db()
+        self.assertEqual(job.status, transitions.FAILED)
+        self.assertEqual(job.result.error_message, "second")
+        self.assertEqual(DeadLetter.objects.get(job=job).attempts, 2)
+        self.assertEqual(JobAttempt.objects.filter(job=job).count(), 2)
+        downstream.refresh_from_db()
+        self.assertEqual(downstream.status, transitions.FAILED)
+        self.assertFalse(transitions.fail(job.id, "late"))
+
+    def test_list_and_replay_dead_letters(self):
+        jobs = [self.make_job(max_attempts=1) for _ in range(3)]
+        counters.get_counts(self.user.id)
+        for job in jobs:
+            transitions.fail(job.id, "boom")
+
+        response = self.client.get(reverse('jobs:dead-letter-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 3)
+
+        response = self.client.post(
+            reverse('jobs:dead-letter-replay'), {"job_ids": [jobs[0].id, jobs[1].id]}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["job_ids"], [jobs[0].id, jobs[1].id])
+
+        job = Job.objects.get(pk=jobs[0].id)
+        self.assertEqual((job.status, job.attempts), (transitions.PENDING, 0))
+        self.assertFalse(JobResult.objects.filter(job=job).exists())
+        self.assertEqual(job.attempt_history.count(), 1)
+        self.assertIsNotNone(scheduler._redis().zscore(scheduler.SCHEDULE_KEY, job.id))
+        self.assertEqual(list(DeadLetter.objects.values_list("job_id", flat=True)), [jobs[2].id])
+        self.assertEqual(counters.get_counts(self.user.id), counters.count_from_db(self.user.id))
+
+        response = self.client.post(reverse('jobs:dead-letter-replay'), {"all": True}, format='json')
+        self.assertEqual(response.data["replayed"], 1)
+        self.assertFalse(DeadLetter.objects.exists())
+
+    def test_result_includes_attempt_history(self):
+        job = self.make_job()
+        transitions.fail(job.id, "boom")
+        self.run_and_fail(job, "again")
+        Job.objects.filter(pk=job.pk).update(status=transitions.IN_PROGRESS)
+        transitions.complete(job.id, output="done")
+
+        response = self.client.get(reverse('jobs:job-result', kwargs={"pk": job.id}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["output"], "done")
+        self.assertEqual([attempt["error_message"] for attempt in response.data["attempts"]], ["boom", "again"])
+
+
+class JobEventTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="events@example.com", password="SecurePass123", is_email_verified=True
+        )
+        clear_job_redis()
+
+    def tearDown(self):
+        clear_job_redis()
+
+    def make_job(self, **kwargs):
+        return Job.objects.create(
+            user=self.user, name="Watched", description="events", scheduled_time=timezone.now(), **kwargs
+        )
+
+    def test_transitions_are_published(self):
+        pubsub = scheduler._redis().pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(events.CHANNEL.format(user_id=self.user.id))
+        pubsub.get_message(timeout=1)
+        job, other = self.make_job(), self.make_job()
+
+        transitions.start(job.id)
+        transitions.complete(job.id, output="done")
+        transitions.cancel_many([other.id])
+
+        received = []
+        while len(received) < 3:
+            message = pubsub.get_message(timeout=1)
+            self.assertIsNotNone(message)
+            received.append(json.loads(message["data"]))
+        pubsub.close()
+        self.assertEqual(received, [
+            {"id": job.id, "status": "in-progress", "previous": "pending"},
+            {"id": job.id, "status": "completed", "previous": "in-progress"},
+            {"id": other.id, "status": "failed", "previous": "pending"},
+        ])
+
+    async def test_broadcaster_fans_out_per_user(self):
+        broadcaster, first = await events.subscribe(1)
+        _, second = await events.subscribe(1)
+        _, stranger = await events.subscribe(2)
+
+        events.publish([(1, 10, "pending", "in-progress")])
+        for queue in (first, second):
+            data = await asyncio.wait_for(queue.get(), 2)
+            self.assertEqual(json.loads(data)["id"], 10)
+        self.assertTrue(stranger.empty())
+
+        broadcaster.unsubscribe(1, first)
+        broadcaster.unsubscribe(1, second)
+        broadcaster.unsubscribe(2, stranger)
+        self.assertEqual(dict(broadcaster.queues), {})
+
+    async def test_slow_stream_is_closed(self):
+        broadcaster, queue = await events.subscribe(1)
+        with self.settings(JOB_EVENTS_QUEUE_SIZE=2):
+            _, slow = await events.subscribe(1)
+        for job_id in range(3):
+            broadcaster.deliver(1, json.dumps({"id": job_id}))
+        self.assertIsNone(await slow.get())
+        self.assertEqual(broadcaster.queues[1], {queue})
+        broadcaster.unsubscribe(1, queue)
+
+    async def test_event_stream_endpoint(self):
+        job = await Job.objects.acreate(
+            user=self.user, name="Watched", description="events", scheduled_time=timezone.now()
+        )
+        response = await AsyncClient().get(reverse('jobs:job-events'), headers={
+            "Accept": "text/event-stream", "Authorization": f"Bearer {AccessToken.for_user(self.user)}"
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+
+        stream = aiter(response.streaming_content)
+        self.assertTrue((await anext(stream)).startswith(b"retry:"))
+        events.publish([(self.user.id, job.id, "pending", "in-progress")])
+        chunk = await asyncio.wait_for(anext(stream), 2)
+        self.assertEqual(
+            chunk,
+            f'event: job\ndata: {{"id": {job.id}, "status": "in-progress", "previous": "pending"}}\n\n'.encode()
+        )
+        await stream.aclose()
+
+    def test_event_stream_is_refused_under_wsgi(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('jobs:job-events'), headers={"Accept": "text/event-stream"})
+        self.assertEqual(response.status_code, status.HTTP_501_NOT_IMPLEMENTED)
+        self.assertTrue(response.content.startswith(b"event: error\ndata:"))
+        self.assertIn(b"only served over ASGI", response.content)
+
+    async def test_event_stream_requires_authentication(self):
+        response = await AsyncClient().get(reverse('jobs:job-events'), headers={"Accept": "text/event-stream"})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class JobResultWaitTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="wait@example.com", password="SecurePass123", is_email_verified=True
+        )
+        self.headers = {"Authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+        self.job = Job.objects.create(
+            user=self.user, name="Awaited", description="wait",
+            scheduled_time=timezone.now(), status=transitions.IN_PROGRESS
+        )
+        self.url = reverse('jobs:job-result', kwargs={"pk": self.job.id})
+        clear_job_redis()
+
+    def tearDown(self):
+        clear_job_redis()
+
+    async def get(self, wait):
+        return await AsyncClient().get(self.url, {"wait": wait}, headers=self.headers)
+
+    async def test_wait_returns_when_job_completes(self):
+        request = asyncio.ensure_future(self.get(10))
+        await asyncio.sleep(0.3)
+        self.assertFalse(request.done())
+
+        started = time.monotonic()
+        await sync_to_async(transitions.complete)(self.job.id, output="done")
+        response = await asyncio.wait_for(request, 2)
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["output"], "done")
+
+    async def test_wait_times_out(self):
+        started = time.monotonic()
+        response = await self.get(0.3)
+        self.assertGreaterEqual(time.monotonic() - started, 0.3)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_failed_job_returns_its_error(self):
+        await sync_to_async(transitions.fail)(self.job.id, "boom")
+        response = await self.get(10)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["error_message"], "boom")
+
+    async def test_invalid_wait_is_rejected(self):
+        response = await self.get("soon")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("wait", response.json())
+
+
+class JobAsyncViewTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="async@example.com", password="SecurePass123", is_email_verified=True
+        )
+        self.headers = {"Authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+        self.job = Job.objects.create(
+            user=self.user, name="Async", description="asgi", scheduled_time=timezone.now(),
+            status=transitions.COMPLETED
+        )
+        JobResult.objects.create(job=self.job, output="done", completed_at=timezone.now())
+        clear_job_redis()
+
+    def tearDown(self):
+        clear_job_redis()
+
+    async def get(self, url, headers=None):
+        return await AsyncClient().get(url, headers=self.headers if headers is None else headers)
+
+    async def test_read_endpoints(self):
+        response = await self.get(reverse('jobs:jobs:job-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([job["id"] for job in response.json()["results"]], [self.job.id])
+
+        response = await self.get(reverse('jobs:jobs:job-detail', kwargs={"pk": self.job.id}))
+        self.assertEqual(response.json()["result"]["output"], "done")
+
+        response = await self.get(reverse('jobs:job-summary'))
+        self.assertEqual(response.json()["completed"], 1)
+
+        response = await self.get(reverse('jobs:job-result', kwargs={"pk": self.job.id}))
+        self.assertEqual(response.json()["output"], "done")
+
+    async def test_downloads_stream_asynchronously(self):
+        for url, expected in (
+            (reverse('jobs:jobs:job-export'), b'"output": "done"'),
+            (reverse('jobs:job-output', kwargs={"pk": self.job.id}), b"done"),
+        ):
+            response = await self.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            # A sync iterator would be read into memory whole before sending.
+            self.assertTrue(response.is_async)
+            self.assertIn(expected, b"".join([chunk async for chunk in response.streaming_content]))
+
+    async def test_responses_match_sync_views(self):
+        url = reverse('jobs:jobs:job-detail', kwargs={"pk": self.job.id})
+        response = await self.get(url)
+        request = await sync_to_async(APIRequestFactory().get)(url)
+        force_authenticate(request, user=self.user)
+        expected = await sync_to_async(JobViewSet.as_view({'get': 'retrieve'}))(request, pk=self.job.id)
+        expected.render()
+        self.assertEqual(response.content, expected.content)
+
+    async def test_other_methods_use_drf_views(self):
+        response = await AsyncClient().post(reverse('jobs:jobs:job-list'), {
+            "name": "Posted", "description": "asgi",
+            "scheduled_time": (timezone.now() + timedelta(hours=1)).isoformat(),
+        }, content_type="application/json", headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(await Job.objects.filter(user=self.user).acount(), 2)
+
+    async def test_authentication_and_permissions(self):
+        response = await self.get(reverse('jobs:jobs:job-list'), headers={})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn("WWW-Authenticate", response)
+
+        response = await self.get(reverse('jobs:job-summary'), headers={"Authorization": "Bearer nonsense"})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        other = await CustomUser.objects.acreate(email="unverified@example.com")
+        response = await self.get(
+            reverse('jobs:jobs:job-list'), headers={"Authorization": f"Bearer {AccessToken.for_user(other)}"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    async def test_missing_job_is_not_found(self):
+        response = await self.get(reverse('jobs:jobs:job-detail', kwargs={"pk": self.job.id + 100}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class JobResponseCacheTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="cache@example.com", password="SecurePass123", is_email_verified=True
+        )
+        self.headers = {"Authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+        self.job = Job.objects.create(
+            user=self.user, name="Cached", description="cache", scheduled_time=timezone.now(),
+            status=transitions.IN_PROGRESS
+        )
+        self.detail_url = reverse('jobs:jobs:job-detail', kwargs={"pk": self.job.id})
+        self.result_url = reverse('jobs:job-result', kwargs={"pk": self.job.id})
+        clear_job_redis()
+
+    def tearDown(self):
+        clear_job_redis()
+
+    async def get(self, url):
+        return await AsyncClient().get(url, headers=self.headers)
+
+    async def cache(self):
+        return (await events.get_broadcaster()).cache
+
+    async def settle(self):
+        # Let the listener receive messages published from this test.
+        await asyncio.sleep(0.2)
+
+    async def test_detail_is_cached_until_the_job_transitions(self):
+        cache = await self.cache()
+        first = await self.get(self.detail_url)
+        second = await self.get(self.detail_url)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        await sync_to_async(transitions.complete)(self.job.id, output="done")
+        await self.settle()
+        self.assertEqual(cache.invalidations, 1)
+        response = await self.get(self.detail_url)
+        self.assertEqual(response.json()["status"], "completed")
+
+        response = await self.get(self.result_url)
+        self.assertEqual(response.json()["output"], "done")
+        self.assertEqual((await self.get(self.result_url)).content, response.content)
+        self.assertEqual(cache.hits, 2)
+
+    async def test_edits_and_deletes_invalidate(self):
+        cache = await self.cache()
+        await self.get(self.detail_url)
+        await AsyncClient().patch(
+            self.detail_url, {"name": "Renamed"}, content_type="application/json", headers=self.headers
+        )
+        await self.settle()
+        self.assertEqual((await self.get(self.detail_url)).json()["name"], "Renamed")
+
+        await AsyncClient().delete(self.detail_url, headers=self.headers)
+        await self.settle()
+        self.assertEqual((await self.get(self.detail_url)).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(cache.invalidations, 2)
+
+    async def test_cache_is_per_user(self):
+        await self.cache()
+        await self.get(self.detail_url)
+        other = await CustomUser.objects.acreate(email="other-cache@example.com", is_email_verified=True)
+        response = await AsyncClient().get(
+            self.detail_url, headers={"Authorization": f"Bearer {AccessToken.for_user(other)}"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_lru_eviction_and_racing_writes(self):
+        cache = response_cache.ResponseCache(max_bytes=10)
+        cache.set(("detail", 1, 1), b"aaaa", 60, cache.token())
+        cache.set(("detail", 1, 2), b"bbbb", 60, cache.token())
+        cache.get(("detail", 1, 1))
+        cache.set(("detail", 1, 3), b"cccc", 60, cache.token())
+        self.assertIsNone(cache.get(("detail", 1, 2)))
+        self.assertEqual(cache.get(("detail", 1, 1)), b"aaaa")
+        self.assertEqual(cache.stats()["evictions"], 1)
+        self.assertLessEqual(cache.size, 10)
+
+        token = cache.token()
+        cache.invalidate(4)
+        cache.set(("detail", 1, 4), b"dd", 60, token)
+        self.assertIsNone(cache.get(("detail", 1, 4)))
+
+
+class JobOutputStorageTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="blobs@example.com", password="SecurePass123", is_email_verified=True
+        )
+        self.client.force_authenticate(user=self.user)
+        clear_job_redis()
+        self.location = tempfile.mkdtemp()
+        storages = {
+            "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+            "job_outputs": {
+                "BACKEND": "django.core.files.storage.FileSystemStorage",
+                "OPTIONS": {"location": self.location},
+            },
+        }
+        override = self.settings(STORAGES=storages, JOB_OUTPUT_INLINE_MAX_BYTES=16)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def tearDown(self):
+        clear_job_redis()
+        shutil.rmtree(self.location, ignore_errors=True)
+
+    def finish_job(self, output):
+        job = Job.objects.create(
+            user=self.user, name="Big", description="output", scheduled_time=timezone.now(),
+            status=transitions.IN_PROGRESS,
+        )
+        self.assertTrue(transitions.complete(job.id, output))
+        return job
+
+    def test_small_output_stays_inline(self):
+        job = self.finish_job("short")
+        result = JobResult.objects.get(job=job)
+        self.assertEqual((result.output, result.output_blob, result.output_size), ("short", "", 5))
+
+        response = self.client.get(reverse('jobs:job-result', args=[job.id]))
+        self.assertEqual(response.data["output"], "short")
+        self.assertTrue(response.data["output_url"].endswith(reverse('jobs:job-output', args=[job.id])))
+
+    def test_large_output_is_stored_and_listed_by_size(self):
+        output = "0123456789" * 10
+        job = self.finish_job(output)
+        result = JobResult.objects.get(job=job)
+        self.assertIsNone(result.output)
+        self.assertEqual(result.output_size, 100)
+        with open(f"{self.location}/{result.output_blob}") as stored:
+            self.assertEqual(stored.read(), output)
+
+        item = self.client.get(reverse('jobs:jobs:job-list')).json()["results"][0]["result"]
+        self.assertIsNone(item["output"])
+        self.assertEqual(item["output_size"], 100)
+
+        response = self.client.get(item["output_url"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Length"], "100")
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(b"".join(response.streaming_content).decode(), output)
+
+    def test_range_requests(self):
+        job = self.finish_job("0123456789" * 10)
+        url = reverse('jobs:job-output', args=[job.id])
+
+        for header, content_range, body in (
+            ("bytes=10-19", "bytes 10-19/100", "0123456789"),
+            ("bytes=95-", "bytes 95-99/100", "56789"),
+            ("bytes=-3", "bytes 97-99/100", "789"),
+            ("bytes=98-500", "bytes 98-99/100", "89"),
+        ):
+            response = self.client.get(url, HTTP_RANGE=header)
+            self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+            self.assertEqual(response["Content-Range"], content_range)
+            self.assertEqual(b"".join(response.streaming_content).decode(), body)
+
+        response = self.client.get(url, HTTP_RANGE="bytes=100-")
+        self.assertEqual(response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(response["Content-Range"], "bytes */100")
+
+        response = self.client.get(url, HTTP_RANGE="bytes=0-1,5-6")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_output_of_other_users_or_failed_jobs_is_not_found(self):
+        job = self.finish_job("0123456789" * 10)
+        other = CustomUser.objects.create_user(
+            email="blobs-other@example.com", password="SecurePass123", is_email_verified=True
+        )
+        self.client.force_authenticate(user=other)
+        response = self.client.get(reverse('jobs:job-output', args=[job.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        self.client.force_authenticate(user=self.user)
+        failed = Job.objects.create(
+            user=self.user, name="Failed", description="", scheduled_time=timezone.now(),
+            status=transitions.IN_PROGRESS,
+        )
+        transitions.cancel(failed.id)
+        response = self.client.get(reverse('jobs:job-output', args=[failed.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_losing_finish_discards_blob_and_delete_removes_it(self):
+        job = self.finish_job("0123456789" * 10)
+        self.assertFalse(transitions.complete(job.id, "x" * 100))
+        self.assertEqual(len(list(Path(self.location).rglob("*.txt"))), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            job.delete()
+        self.assertEqual(list(Path(self.location).rglob("*.txt")), [])
+
+
+class JobResultCompressionTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="compress@example.com", password="SecurePass123", is_email_verified=True
+        )
+        self.client.force_authenticate(user=self.user)
+        self.log = "\n".join(f"step {i}: ok" for i in range(200))
+
+    def make_result(self, **kwargs):
+        job = Job.objects.create(
+            user=self.user, name="Logs", description="", scheduled_time=timezone.now(), status="completed"
+        )
+        return JobResult.objects.create(job=job, **kwargs)
+
+    def stored_bytes(self, result, column):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT {column} FROM jobs_jobresult WHERE id = %s", [result.pk])
+            return cursor.fetchone()[0]
+
+    def test_text_is_compressed_on_write_and_inflated_on_read(self):
+        result = self.make_result(output=self.log, error_message="short")
+        stored = self.stored_bytes(result, "output")
+        self.assertEqual(bytes(stored[:2]), compression.GZIP_MAGIC)
+        self.assertLess(len(stored), len(self.log) // 5)
+        self.assertEqual(bytes(self.stored_bytes(result, "error_message")), b"short")
+
+        loaded = JobResult.objects.get(pk=result.pk)
+        self.assertIsNotNone(compression.stored(loaded, "output"))
+        self.assertEqual(loaded.output, self.log)
+        self.assertIsNone(compression.stored(loaded, "output"))
+        self.assertEqual(loaded.error_message, "short")
+
+    def test_uncompressed_rows_are_read_and_compressed_in_batches(self):
+        results = [self.make_result() for _ in range(3)]
+        with connection.cursor() as cursor:
+            for result in results:
+                cursor.execute(
+                    "UPDATE jobs_jobresult SET output = %s, error_message = %s WHERE id = %s",
+                    [self.log, "failed once", result.pk],
+                )
+        self.assertEqual(JobResult.objects.get(pk=results[0].pk).output, self.log)
+
+        out = StringIO()
+        call_command("compress_job_results", batch_size=2, stdout=out)
+        self.assertIn("compressed 3", out.getvalue())
+        for result in results:
+            self.assertEqual(bytes(self.stored_bytes(result, "output")[:2]), compression.GZIP_MAGIC)
+            loaded = JobResult.objects.get(pk=result.pk)
+            self.assertEqual((loaded.output, loaded.error_message), (self.log, "failed once"))
+
+    def test_output_download_passes_gzip_through(self):
+        result = self.make_result(output=self.log)
+        url = reverse('jobs:job-output', args=[result.job_id])
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(gzip.decompress(response.content).decode(), self.log)
+
+        response = self.client.get(url)
+        self.assertNotIn("Content-Encoding", response)
+        self.assertEqual(b"".join(response.streaming_content).decode(), self.log)
+
+    def test_export_and_api_render_text(self):
+        self.make_result(output=self.log, error_message="x" * 500)
+        response = self.client.get(reverse('jobs:jobs:job-list'))
+        self.assertEqual(response.json()["results"][0]["result"]["output"], self.log)
+
+        response = self.client.get(reverse('jobs:jobs:job-export'))
+        job = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(job["result"]["error_message"], "x" * 500)
+
+
+class JobRetentionTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="retention@example.com", password="SecurePass123", is_email_verified=True
+        )
+        self.client.force_authenticate(user=self.user)
+        clear_job_redis()
+        self.old = timezone.now() - timedelta(days=40)
+
+    def tearDown(self):
+        clear_job_redis()
+
+    def make_job(self, status, finished=None, **result):
+        job = Job.objects.create(
+            user=self.user, name=f"{status} job", description="", scheduled_time=self.old, status=status
+        )
+        if finished is not None:
+            JobResult.objects.create(job=job, **result)
+            JobResult.objects.filter(job=job).update(completed_at=finished)
+        return job
+
+    def test_archives_only_old_terminal_jobs(self):
+        old_done = self.make_job("completed", self.old, output="done")
+        old_failed = self.make_job("failed", self.old, error_message="boom")
+        JobAttempt.objects.create(job=old_failed, number=1, error_message="boom")
+        recent = self.make_job("completed", timezone.now(), output="done")
+        active = self.make_job("pending")
+        dead = self.make_job("failed", self.old, error_message="boom")
+        DeadLetter.objects.create(job=dead, user=self.user, error_message="boom", attempts=1)
+        self.assertEqual(counters.get_counts(self.user.id)["completed"], 2)
+
+        self.assertEqual(retention.archive(days=30, batch_size=1, rows_per_second=0), 2)
+
+        self.assertEqual(
+            set(Job.objects.values_list("pk", flat=True)), {recent.pk, active.pk, dead.pk}
+        )
+        self.assertEqual(set(ArchivedJob.objects.values_list("pk", flat=True)), {old_done.pk, old_failed.pk})
+        self.assertFalse(JobAttempt.objects.filter(job_id=old_failed.pk).exists())
+        self.assertEqual(counters.get_counts(self.user.id), counters.count_from_db(self.user.id))
+        self.assertEqual(retention.archive(days=30, rows_per_second=0), 0)
+
+    def test_archived_jobs_are_fetchable_by_id(self):
+        job = self.make_job("failed", self.old, error_message="boom")
+        JobAttempt.objects.create(job=job, number=1, error_message="first try")
+        retention.archive(days=30, rows_per_second=0)
+
+        response = self.client.get(reverse('jobs:jobs:job-detail', args=[job.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["status"], "failed")
+        self.assertEqual(response.json()["result"]["error_message"], "boom")
+        self.assertIn("archived_at", response.json())
+
+        response = self.client.get(reverse('jobs:job-result', args=[job.id]))
+        self.assertEqual(response.json()["error_message"], "boom")
+        self.assertEqual([attempt["error_message"] for attempt in response.json()["attempts"]], ["first try"])
+
+        self.assertEqual(self.client.get(reverse('jobs:jobs:job-list')).json()["results"], [])
+
+        other = CustomUser.objects.create_user(
+            email="retention-other@example.com", password="SecurePass123", is_email_verified=True
+        )
+        self.client.force_authenticate(user=other)
+        response = self.client.get(reverse('jobs:jobs:job-detail', args=[job.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_archived_output_blob_is_kept(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        storages = {
+            "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+            "job_outputs": {"BACKEND": "django.core.files.storage.FileSystemStorage", "OPTIONS": {"location": location}},
+        }
+        with self.settings(STORAGES=storages, JOB_OUTPUT_INLINE_MAX_BYTES=4):
+            job = Job.objects.create(
+                user=self.user, name="Big", description="", scheduled_time=self.old, status=transitions.IN_PROGRESS
+            )
+            transitions.complete(job.id, "a large output")
+            JobResult.objects.filter(job=job).update(completed_at=self.old)
+            with self.captureOnCommitCallbacks(execute=True):
+                retention.archive(days=30, rows_per_second=0)
+
+            response = self.client.get(reverse('jobs:job-output', args=[job.id]))
+            self.assertEqual(b"".join(response.streaming_content), b"a large output")
+
+    def test_batch_lock_has_no_outer_joins(self):
+        features = connection.features
+        with patch.object(features, 'has_select_for_update', True), \
+                patch.object(features, 'has_select_for_update_of', True):
+            sql, _ = retention._lock([1, 2]).query.get_compiler(connection=connection).as_sql()
+        self.assertIn("FOR UPDATE", sql)
+        self.assertNotIn("JOIN", sql)
+
+    def test_command_paces_batches(self):
+        for _ in range(3):
+            self.make_job("completed", self.old, output="done")
+        out = StringIO()
+        with patch("jobs.retention.time.sleep") as sleep:
+            call_command("archive_jobs", days=30, batch_size=1, rows_per_second=10, stdout=out)
+        self.assertIn("Archived 3 jobs", out.getvalue())
+        self.assertEqual(sleep.call_count, 3)
+        self.assertGreater(sum(call.args[0] for call in sleep.call_args_list), 0.1)
+
+
+@override_settings(
+    JOB_ADMISSION_LIMITS={'broker_queue': (10, 20), 'pending': (2, 4), 'in_progress': (None, None)},
+    JOB_ADMISSION_SAMPLE_INTERVAL=0,
+)
+@patch('jobs.fairshare.broker_queue_depth', return_value=0)
+class JobAdmissionTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="admission@example.com", password="SecurePass123", is_email_verified=True
+        )
+        self.client.force_authenticate(user=self.user)
+        clear_job_redis()
+        counters.ensure_totals()
+        admission._sample = None
+
+    def tearDown(self):
+        clear_job_redis()
+        admission._sample = None
+
+    def job_data(self, name="Admitted"):
+        return {
+            "name": name,
+            "description": "admission test",
+            "scheduled_time": (timezone.now() + timedelta(minutes=5)).isoformat()
+        }
+
+    def create_job(self):
+        return self.client.post(reverse('jobs:jobs:job-list'), self.job_data(), format="json")
+
+    def test_totals_follow_all_users(self, depth):
+        other = CustomUser.objects.create_user(email="other@example.com", password="SecurePass123")
+        Job.objects.create(user=other, name="Old", description="", scheduled_time=timezone.now())
+        clear_job_redis()
+        self.assertIsNone(counters.get_totals())
+        dispatch_due_jobs()
+        self.assertEqual(counters.get_totals()["pending"], 1)
+
+        job_id = self.create_job().data["id"]
+        start_job(job_id)
+        self.assertEqual(counters.get_totals(), {"pending": 1, "in-progress": 1, "completed": 0, "failed": 0})
+
+    def test_refuses_past_the_watermarks(self, depth):
+        for _ in range(2):
+            self.assertEqual(self.create_job().status_code, status.HTTP_201_CREATED)
+
+        response = self.create_job()
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response["Retry-After"], "30")
+        self.assertEqual(Job.objects.count(), 2)
+
+        depth.return_value = 25
+        response = self.create_job()
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertIn("broker queue: 25", response.data["detail"])
+
+    def test_bulk_and_dag_count_every_job(self, depth):
+        response = self.client.post(
+            reverse('jobs:jobs:job-bulk'), [self.job_data(), self.job_data(), self.job_data()], format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        response = self.client.post(reverse('jobs:jobs:job-dag'), {"jobs": [
+            {**self.job_data(), "key": key, "depends_on": []} for key in "abcde"
+        ]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        response = self.client.post(reverse('jobs:jobs:job-bulk'), [self.job_data(), self.job_data()], format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Job.objects.count(), 2)
+
+    def test_load_endpoint(self, depth):
+        self.create_job()
+        depth.return_value = 12
+
+        response = self.client.get(reverse('jobs:job-load'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["broker_queue"], 12)
+        self.assertEqual(response.data["pending"], 1)
+        self.assertEqual(response.data["state"], admission.BUSY)
+        self.assertEqual(response.data["limits"]["pending"], {"busy": 2, "overloaded": 4})
+        self.assertEqual(response.data["retry_after"], 30)
+
+    def test_only_checks_the_broker_until_totals_are_built(self, depth):
+        clear_job_redis()
+        for _ in range(5):
+            self.assertEqual(self.create_job().status_code, status.HTTP_201_CREATED)
+        self.assertIsNone(self.client.get(reverse('jobs:job-load')).data["pending"])
+
+        depth.return_value = 25
+        self.assertEqual(self.create_job().status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def test_samples_the_load_once_per_interval(self, depth):
+        with self.settings(JOB_ADMISSION_SAMPLE_INTERVAL=60):
+            for _ in range(3):
+                self.create_job()
+        self.assertEqual(depth.call_count, 1)
+        # Submissions admitted since the sample still count toward the limit.
+        self.assertEqual(Job.objects.count(), 2)
@@ -0,0 +1,241 @@
+import random
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+
+from . import blobs, counters, dependencies, events, fairshare, scheduler
+from .models import DeadLetter, Job, JobAttempt, JobResult
+
+PENDING, IN_PROGRESS, COMPLETED, FAILED = (choice for choice, _ in Job.STATUS_CHOICES)
+
+COMPLETE_FROM = (IN_PROGRESS,)
+CANCEL_FROM = (IN_PROGRESS, PENDING)
+
+# Rows moved per transaction by the batch transitions; keeps locks short.
+BATCH_SIZE = 500
+
+state_cache = caches['job_state']
+
+
+def _compare_and_set(job_id, sources, target):
+    # Each attempt is a single conditional UPDATE; the database decides which
+    # of several concurrent transitions wins. Must run inside a transaction.
+    # Returns the status the job moved from, or None if it was not in any of
+    # `sources`.
+    for source in sources:
+        if Job.objects.filter(pk=job_id, status=source).update(status=target):
+            return source
+    return None
+
+
+def _owner(job_id):
+    return Job.objects.values_list('user_id', flat=True).get(pk=job_id)
+
+
+def _transitioned(job_id, user_id, old_status, new_status):
+    counters.record_transition(user_id, old_status, new_status)
+    events.publish([(user_id, job_id, old_status, new_status)])
+    if new_status == IN_PROGRESS:
+        state_cache.set(f"job:{job_id}", IN_PROGRESS)
+    else:
+        state_cache.delete(f"job:{job_id}")
+
+
+def start(job_id):
+    with transaction.atomic():
+        old_status = _compare_and_set(job_id, (PENDING,), IN_PROGRESS)
+        if old_status is None:
+            return False
+        user_id = _owner(job_id)
+    _transitioned(job_id, user_id, old_status, IN_PROGRESS)
+    return True
+
+
+def finish(job_id, target, sources, output=None, error_message=None):
+    # A large output is written to blob storage before the row lock is taken.
+    stored = blobs.prepare_output(job_id, output)
+    with transaction.atomic():
+        old_status = _compare_and_set(job_id, sources, target)
+        if old_status is None:
+            blobs.discard(stored)
+            return False
+        # Only the winner gets here, so the OneToOne result is created once.
+        JobResult.objects.create(
+            job_id=job_id,
+            **stored,
+            error_message=error_message,
+            completed_at=timezone.now()
+        )
+        user_id = _owner(job_id)
+        ready = dependencies.release([job_id]) if target == COMPLETED else []
+        dependents = dependencies.pending_dependents([job_id]) if target == FAILED else []
+    if old_status == PENDING:
+        scheduler.unschedule(job_id)
+        fairshare.discard_many([(user_id, job_id)])
+    scheduler.schedule_many(ready)
+    _transitioned(job_id, user_id, old_status, target)
+    _fail_dependents(dependents)
+    return True
+
+
+def finish_many(job_ids, target, sources, output=None, error_message=None):
+    """Set-based finish(): returns {job_id: won} for every id given."""
+    outcomes = dict.fromkeys(job_ids, False)
+    job_ids = list(outcomes)
+    dependents = []
+    for offset in range(0, len(job_ids), BATCH_SIZE):
+        chunk = job_ids[offset:offset + BATCH_SIZE]
+        with transaction.atomic():
+            rows = list(
+                Job.objects.select_for_update()
+                .filter(pk__in=chunk, status__in=sources)
+                .values_list('id', 'user_id', 'status')
+            )
+            won = [job_id for job_id, _, _ in rows]
+            Job.objects.filter(pk__in=won, status__in=sources).update(status=target)
+            now = timezone.now()
+            JobResult.objects.bulk_create(
+                JobResult(
+                    job_id=job_id,
+                    **blobs.prepare_output(job_id, output),
+                    error_message=error_message,
+                    completed_at=now,
+                )
+                for job_id in won
+            )
+            ready = dependencies.release(won) if target == COMPLETED and won else []
+            if target == FAILED and won:
+                dependents += dependencies.pending_dependents(won)
+
+        was_pending = [(user_id, job_id) for job_id, user_id, status in rows if status == PENDING]
+        scheduler.unschedule_many(job_id for _, job_id in was_pending)
+        fairshare.discard_many(was_pending)
+        scheduler.schedule_many(ready)
+        moved = Counter((user_id, status) for _, user_id, status in rows)
+        for (user_id, old_status), count in moved.items():
+            counters.record_transition(user_id, old_status, target, count)
+        if won:
+            state_cache.delete_many([f"job:{job_id}" for job_id in won])
+        events.publish((user_id, job_id, old_status, target) for job_id, user_id, old_status in rows)
+        outcomes.update(dict.fromkeys(won, True))
+
+    _fail_dependents(dependents)
+    return outcomes
+
+
+def _fail_dependents(dependents, reason="An upstream job failed."):
+    # Jobs waiting on a failed job can never run; fail them too, which in turn
+    # fails their own dependents. The dependents are looked up inside the
+    # failing transaction, so nothing here reads a half-finished state.
+    if dependents:
+        finish_many(dependents, FAILED, (PENDING,), error_message=reason)
+
+
+def delete(job):
+    """Delete ``job``. Jobs still waiting on it could never be released,
+    so they fail as if it had failed. Returns the status it was deleted in."""
+    with transaction.atomic():
+        status = Job.objects.select_for_update().values_list('status', flat=True).get(pk=job.id)
+        unfinished = status in (PENDING, IN_PROGRESS)
+        dependents = dependencies.pending_dependents([job.id]) if unfinished else []
+        job.delete()
+    _fail_dependents(dependents, "An upstream job was deleted.")
+    return status
+
+
+def complete(job_id, output=None):
+    if output is None:
+        output = f"Manually completed at {timezone.now()}"
+    return finish(job_id, COMPLETED, COMPLETE_FROM, output=output)
+
+
+def cancel(job_id, reason="Cancelled by user"):
+    return finish(job_id, FAILED, CANCEL_FROM, error_message=reason)
+
+
+def retry_delay(backoff, attempt):
+    # Exponential backoff with equal jitter: half of the delay is fixed and
+    # half random, so jobs that failed together do not retry in lockstep.
+    delay = min(settings.JOB_RETRY_MAX_DELAY, backoff * 2 ** (attempt - 1))
+    return timedelta(seconds=delay / 2 + random.uniform(0, delay / 2))
+
+
+def fail(job_id, error_message):
+    """Record a failed run of an in-progress job. While the job has attempts
+    left it goes back to pending and is scheduled after a backoff; the last
+    failure fails it for good and moves it to the dead-letter table."""
+    job = (
+        Job.objects.filter(pk=job_id, status=IN_PROGRESS)
+        .only('id', 'user_id', 'attempts', 'max_attempts', 'retry_backoff')
+        .first()
+    )
+    if job is None:
+        return False
+    attempt = job.attempts + 1
+    retry = attempt < job.max_attempts
+
+    with transaction.atomic():
+        # Matching the attempt count read above makes this a compare-and-set.
+        claimed = Job.objects.filter(pk=job_id, status=IN_PROGRESS, attempts=job.attempts)
+        if retry:
+            job.scheduled_time = timezone.now() + retry_delay(job.retry_backoff, attempt)
+            if not claimed.update(status=PENDING, attempts=attempt, scheduled_time=job.scheduled_time):
+                return False
+        else:
+            if not claimed.update(status=FAILED, attempts=attempt):
+                return False
+            JobResult.objects.create(job_id=job_id, error_message=error_message, completed_at=timezone.now())
+            DeadLetter.objects.create(
+                job_id=job_id, user_id=job.user_id, error_message=error_message, attempts=attempt
+            )
+        JobAttempt.objects.create(job_id=job_id, number=attempt, error_message=error_message)
+        dependents = [] if retry else dependencies.pending_dependents([job_id])
+
+    if retry:
+        scheduler.schedule(job)
+        _transitioned(job_id, job.user_id, IN_PROGRESS, PENDING)
+    else:
+        _transitioned(job_id, job.user_id, IN_PROGRESS, FAILED)
+        _fail_dependents(dependents)
+    return True
+
+
+def complete_many(job_ids, output=None):
+    if output is None:
+        output = f"Manually completed at {timezone.now()}"
+    return finish_many(job_ids, COMPLETED, COMPLETE_FROM, output=output)
+
+
+def cancel_many(job_ids, reason="Cancelled by user"):
+    return finish_many(job_ids, FAILED, CANCEL_FROM, error_message=reason)
+
+
+def replay_many(job_ids):
+    """Move dead-lettered jobs back to pending, due now and with a fresh set
+    of attempts. Returns {job_id: replayed} for every id given."""
+    outcomes = dict.fromkeys(job_ids, False)
+    job_ids = list(outcomes)
+    for offset in range(0, len(job_ids), BATCH_SIZE):
+        chunk = job_ids[offset:offset + BATCH_SIZE]
+        with transaction.atomic():
+            rows = list(
+                Job.objects.select_for_update()
+                .filter(pk__in=DeadLetter.objects.filter(job_id__in=chunk).values('job_id'), status=FAILED)
+                .values_list('id', 'user_id')
+            )
+            won = [job_id for job_id, _ in rows]
+            now = timezone.now()
+            Job.objects.filter(pk__in=won).update(status=PENDING, attempts=0, scheduled_time=now)
+            JobResult.objects.filter(job_id__in=won).delete()
+            DeadLetter.objects.filter(job_id__in=won).delete()
+
+        scheduler.schedule_many(Job(id=job_id, scheduled_time=now) for job_id in won)
+        for user_id, count in Counter(user_id for _, user_id in rows).items():
+            counters.record_transition(user_id, FAILED, PENDING, count)
+        events.publish((user_id, job_id, FAILED, PENDING) for job_id, user_id in rows)
+        outcomes.update(dict.fromkeys(won, True))
+    return outcomes
@@ -1,7 +1,15 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import JobViewSet, JobResultView, JobSummaryView
+from . import async_views
+from .views import (
+    DeadLetterListView,
+    DeadLetterReplayView,
+    JobEventsView,
+    JobLoadView,
+    JobOutputView,
+    JobViewSet,
+)
 
 app_name = 'jobs'
 
@@ -9,9 +17,24 @@ router = DefaultRouter()
 router.register(r'jobs', JobViewSet, basename='job')
 
 urlpatterns = [
-    path('jobs/summary/', JobSummaryView.as_view(), name='job-summary'),
+    path('jobs/summary/', async_views.job_summary, name='job-summary'),
 
-    path('jobs/<int:pk>/result/', JobResultView.as_view(), name='job-result'),
+    path('jobs/events/', JobEventsView.as_view(), name='job-events'),
+
+    path('jobs/load/', JobLoadView.as_view(), name='job-load'),
+
+    path('jobs/cache-stats/', async_views.response_cache_stats, name='job-cache-stats'),
+
+    path('jobs/<int:pk>/result/', async_views.job_result, name='job-result'),
+    path('jobs/<int:pk>/output/', JobOutputView.as_view(), name='job-output'),
+
+    path('jobs/dead-letters/', DeadLetterListView.as_view(), name='dead-letter-list'),
+    path('jobs/dead-letters/replay/', DeadLetterReplayView.as_view(), name='dead-letter-replay'),
+
+    # Async list and retrieve; reversed through the router's job-list and
+    # job-detail names, which resolve to the same paths.
+    path('jobs/', async_views.job_list),
+    path('jobs/<int:pk>/', async_views.job_detail),
 
     path('', include((router.urls, app_name), namespace=app_name)),
 ]
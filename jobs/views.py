@@ -1,15 +1,107 @@
+import json
+import re
 from datetime import timedelta
 
-from django.db.models import Count
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import generics, permissions, status, viewsets, exceptions
+from rest_framework import generics, permissions, renderers, status, viewsets, exceptions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
-from .models import Job, JobResult
-from .serializers import JobSerializer, JobResultSerializer
-from .tasks import start_job, complete_job, cancel_job
+from . import (
+    admission, blobs, compression, counters, events, fairshare, response_cache, retention, scheduler, transitions
+)
+from .models import ArchivedJob, DeadLetter, Job, JobResult
+from .pagination import JobCursorPagination
+from .serializers import (
+    DeadLetterReplaySerializer,
+    DeadLetterSerializer,
+    JobBulkTransitionSerializer,
+    JobDAGSerializer,
+    JobResultDetailSerializer,
+    JobSerializer,
+)
+from .tasks import complete_job, complete_jobs, cancel_job, cancel_jobs
+
+
+EXPORT_CHUNK_SIZE = 2000
+# Job ids per message when a bulk transition is given a status filter.
+BULK_TRANSITION_CHUNK_SIZE = 1000
+# Fields that decide when and in which order a pending job is dispatched.
+DISPATCH_FIELDS = ('scheduled_time', 'priority')
+EXPORT_FIELDS = ('id', 'name', 'description', 'scheduled_time', 'created_at', 'status', 'handler', 'priority')
+EXPORT_RESULT_FIELDS = ('output', 'output_size', 'error_message', 'completed_at')
+
+
+def _export_lines(queryset, request):
+    # One NDJSON line per job, yielded a chunk at a time so neither the rows
+    # nor the rendered output are ever held in memory all at once. Outputs in
+    # blob storage are exported as null with their output_url, as the API
+    # renders them.
+    rows = queryset.values(
+        *EXPORT_FIELDS, 'result__id', 'result__output_blob',
+        *(f'result__{field}' for field in EXPORT_RESULT_FIELDS),
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+    lines = []
+    for row in rows:
+        job = {field: row[field] for field in EXPORT_FIELDS}
+        job['result'] = None if row['result__id'] is None else {
+            field: row[f'result__{field}'] for field in EXPORT_RESULT_FIELDS
+        }
+        if job['result'] is not None:
+            for field in ('output', 'error_message'):
+                job['result'][field] = compression.decompress(job['result'][field])
+            has_output = job['result']['output'] is not None or row['result__output_blob']
+            job['result']['output_url'] = request.build_absolute_uri(
+                reverse('jobs:job-output', kwargs={'pk': row['id']})
+            ) if has_output else None
+        lines.append(json.dumps(job, cls=DjangoJSONEncoder))
+        if len(lines) >= EXPORT_CHUNK_SIZE:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+async def _aiter_chunks(chunks):
+    # Pull one chunk at a time on the request's sync thread, where the
+    # iterator's database cursor or open file lives.
+    next_chunk = sync_to_async(next)
+    try:
+        while (chunk := await next_chunk(chunks, None)) is not None:
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close)()
+
+
+def _streaming_content(request, chunks):
+    # Under ASGI, Django drains a sync iterator into a list before sending
+    # anything, so the response would be held in memory whole.
+    return _aiter_chunks(chunks) if isinstance(request._request, ASGIRequest) else chunks
+
+
+def job_queryset(user):
+    # Join the result and load only the columns JobSerializer renders,
+    # so listing costs one query however many jobs are returned.
+    return (
+        Job.objects.filter(user=user)
+        .select_related('result')
+        .only(
+            'id', 'user', 'name', 'description', 'scheduled_time', 'created_at', 'status', 'handler',
+            'priority', 'pending_dependencies', 'max_attempts', 'retry_backoff', 'attempts',
+            'result__job', 'result__output', 'result__output_blob', 'result__output_size',
+            'result__error_message', 'result__completed_at',
+        )
+    )
 
 
 class IsEmailVerified(permissions.BasePermission):
@@ -23,13 +115,167 @@ class IsEmailVerified(permissions.BasePermission):
 
 
 class JobViewSet(viewsets.ModelViewSet):
-    queryset = Job.objects.all()
     serializer_class = JobSerializer
     permission_classes = [IsEmailVerified]
+    pagination_class = JobCursorPagination
+    # Actions that queue broker work are rate limited (settings.API_THROTTLE_RATES).
+    throttle_scopes = {
+        'create': 'job-create',
+        'bulk': 'job-create',
+        'dag': 'job-create',
+        'complete': 'job-transition',
+        'cancel': 'job-transition',
+        'bulk_complete': 'job-transition',
+        'bulk_cancel': 'job-transition',
+    }
+
+    def get_queryset(self):
+        return job_queryset(self.request.user)
 
     def perform_create(self, serializer):
+        admission.admit()
+        job = serializer.save()
+        scheduler.schedule(job)
+        counters.record_created(job.user_id)
+
+    def perform_update(self, serializer):
+        job = serializer.instance
+        moved = any(
+            field in serializer.validated_data and serializer.validated_data[field] != getattr(job, field)
+            for field in DISPATCH_FIELDS
+        )
+        # Jobs still waiting on upstream jobs are read from the database when
+        # they are released, so only a scheduled job has to be taken back out
+        # of the schedule or its ready queue before it changes.
+        requeue = moved and job.status == 'pending' and not job.pending_dependencies
+        if moved and job.status != 'pending':
+            raise exceptions.ValidationError(f"A job that is {job.status} cannot be rescheduled.")
+        if requeue and not (scheduler.unschedule(job.id) or fairshare.discard(job)):
+            raise exceptions.ValidationError("The job is already being started and cannot be rescheduled.")
+
         job = serializer.save()
-        start_job.delay(job.id)
+        if requeue:
+            scheduler.schedule(job)
+        response_cache.invalidate([job.id])
+
+    def perform_destroy(self, instance):
+        job_id = instance.id
+        scheduler.unschedule(job_id)
+        fairshare.discard(instance)
+        deleted_status = transitions.delete(instance)
+        counters.record_deleted(instance.user_id, deleted_status)
+        response_cache.invalidate([job_id])
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        serializer = self.get_serializer(
+            data=request.data, many=True, max_length=settings.JOB_BULK_MAX_ITEMS
+        )
+        serializer.is_valid(raise_exception=True)
+        if serializer.validated_data:
+            admission.admit(len(serializer.validated_data))
+        jobs = serializer.save()
+        scheduler.schedule_many(jobs)
+        counters.record_created(request.user.id, len(jobs))
+
+        created = iter(jobs)
+        errors = serializer.item_errors
+        results = [
+            {"errors": errors[index]} if index in errors else {"id": next(created).id}
+            for index in range(len(request.data))
+        ]
+        return Response(
+            {"created": len(jobs), "failed": len(errors), "results": results},
+            status=status.HTTP_201_CREATED if jobs else status.HTTP_400_BAD_REQUEST
+        )
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        queryset = Job.objects.filter(user=request.user).order_by('id')
+        lines = (chunk.encode() for chunk in _export_lines(queryset, request))
+
+        gzip = 'gzip' in request.headers.get('Accept-Encoding', '')
+        response = StreamingHttpResponse(
+            _streaming_content(request, compress_sequence(lines) if gzip else lines),
+            content_type='application/x-ndjson'
+        )
+        if gzip:
+            response.headers['Content-Encoding'] = 'gzip'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        response.headers['Content-Disposition'] = 'attachment; filename="jobs.ndjson"'
+        return response
+
+    @action(detail=False, methods=['post'])
+    def dag(self, request):
+        serializer = JobDAGSerializer(data=request.data, context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+        admission.admit(len(serializer.validated_data['jobs']))
+        jobs = serializer.save()
+
+        # Only jobs without dependencies are scheduled now; the rest are
+        # scheduled as their upstream jobs complete.
+        scheduler.schedule_many(job for job in jobs.values() if not job.pending_dependencies)
+        counters.record_created(request.user.id, len(jobs))
+        return Response(
+            {"jobs": {key: job.id for key, job in jobs.items()}},
+            status=status.HTTP_201_CREATED
+        )
+
+    def bulk_transition(self, request, task, sources):
+        serializer = JobBulkTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        jobs = Job.objects.filter(user=request.user)
+        if "status" in serializer.validated_data:
+            return self.bulk_transition_by_status(jobs, serializer.validated_data["status"], task, sources)
+
+        requested = serializer.validated_data["ids"]
+        found = dict(jobs.filter(pk__in=requested).values_list("id", "status"))
+        results = {}
+        for job_id in requested:
+            if job_id not in found:
+                results[job_id] = "not_found"
+            elif found[job_id] not in sources:
+                results[job_id] = f"skipped: job is {found[job_id]}"
+            else:
+                results[job_id] = "accepted"
+
+        accepted = [job_id for job_id, outcome in results.items() if outcome == "accepted"]
+        if accepted:
+            task.delay(accepted)
+        return Response(
+            {"accepted": len(accepted), "results": results},
+            status=status.HTTP_202_ACCEPTED
+        )
+
+    def bulk_transition_by_status(self, jobs, job_status, task, sources):
+        # A filter can match any number of jobs: stream their ids into
+        # bounded messages and report counts instead of one entry per id.
+        matching = jobs.filter(status=job_status)
+        if job_status not in sources:
+            return Response({"accepted": 0, "skipped": matching.count()}, status=status.HTTP_202_ACCEPTED)
+
+        accepted = 0
+        chunk = []
+        job_ids = matching.order_by('id').values_list('id', flat=True)
+        for job_id in job_ids.iterator(chunk_size=BULK_TRANSITION_CHUNK_SIZE):
+            chunk.append(job_id)
+            if len(chunk) == BULK_TRANSITION_CHUNK_SIZE:
+                task.delay(chunk)
+                accepted += len(chunk)
+                chunk = []
+        if chunk:
+            task.delay(chunk)
+            accepted += len(chunk)
+        return Response({"accepted": accepted, "skipped": 0}, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=['post'], url_path='bulk-complete')
+    def bulk_complete(self, request):
+        return self.bulk_transition(request, complete_jobs, transitions.COMPLETE_FROM)
+
+    @action(detail=False, methods=['post'], url_path='bulk-cancel')
+    def bulk_cancel(self, request):
+        return self.bulk_transition(request, cancel_jobs, transitions.CANCEL_FROM)
 
     @action(detail=True, methods=['post'])
     def complete(self, request, pk=None):
@@ -50,7 +296,7 @@ class JobViewSet(viewsets.ModelViewSet):
 
 
 class JobResultView(generics.RetrieveAPIView):
-    serializer_class = JobResultSerializer
+    serializer_class = JobResultDetailSerializer
     permission_classes = [permissions.IsAuthenticated, IsEmailVerified]
 
     def get_object(self):
@@ -58,7 +304,7 @@ class JobResultView(generics.RetrieveAPIView):
         job_id = self.kwargs["pk"]
         job = get_object_or_404(Job, pk=job_id, user=self.request.user)
         
-        if job.status != "completed":
+        if job.is_active:
             raise exceptions.ValidationError(
                 "Result not available until job is completed."
             )
@@ -71,17 +317,160 @@ class JobResultView(generics.RetrieveAPIView):
         return job.result
 
 
-class JobSummaryView(generics.GenericAPIView):
+OUTPUT_CHUNK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _byte_range(header, size):
+    # A single "bytes=" range as (start, end) inclusive, or None to send the
+    # whole output (no header, or a form not supported, e.g. multiple ranges).
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first == '':
+        start, end = max(size - int(last), 0), size - 1
+        if int(last) == 0:
+            start = size
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError
+    return start, end
+
+
+def _read_chunks(file, start, length):
+    with file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(OUTPUT_CHUNK_SIZE, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
+
+
+class JobOutputView(generics.GenericAPIView):
     permission_classes = [permissions.IsAuthenticated, IsEmailVerified]
 
+    def perform_content_negotiation(self, request, force=False):
+        # The output is plain bytes; errors fall back to JSON whatever was asked for.
+        return super().perform_content_negotiation(request, force=True)
+
     def get(self, request, *args, **kwargs):
-        qs = (
-            Job.objects.filter(user=request.user)
-            .values("status")
-            .annotate(count=Count("id"))
+        result = JobResult.objects.filter(job_id=self.kwargs["pk"], job__user=request.user).first()
+        if result is None:
+            archived = get_object_or_404(ArchivedJob, pk=self.kwargs["pk"], user=request.user)
+            result = getattr(retention.load(archived), 'result', None)
+            if result is None:
+                raise exceptions.NotFound("This job has no output.")
+        # Taken before anything reads result.output, which would inflate it.
+        gzipped = compression.stored(result, 'output')
+        if gzipped is None and result.output is None and not result.output_blob:
+            raise exceptions.NotFound("This job has no output.")
+
+        size = result.output_size
+        if size is None:
+            size = len(result.output.encode())
+        try:
+            byte_range = _byte_range(request.headers.get('Range'), size)
+        except ValueError:
+            response = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        if gzipped is not None and byte_range is None and 'gzip' in request.headers.get('Accept-Encoding', ''):
+            # Send the stored gzip stream as it is instead of inflating it here.
+            response = HttpResponse(gzipped, content_type='text/plain; charset=utf-8')
+            response['Content-Encoding'] = 'gzip'
+            patch_vary_headers(response, ('Accept-Encoding',))
+            response['Content-Disposition'] = f'attachment; filename="job-{result.job_id}-output.txt"'
+            return response
+
+        start, end = byte_range or (0, size - 1)
+        response = StreamingHttpResponse(
+            _streaming_content(request, _read_chunks(blobs.open_output(result), start, end - start + 1)),
+            status=status.HTTP_206_PARTIAL_CONTENT if byte_range else status.HTTP_200_OK,
+            content_type='text/plain; charset=utf-8',
         )
+        if byte_range:
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+        response['Accept-Ranges'] = 'bytes'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        response['Content-Disposition'] = f'attachment; filename="job-{result.job_id}-output.txt"'
+        return response
 
-        result = {status: 0 for status in ["pending", "in-progress", "completed", "failed"]}
-        result.update({item["status"]: item["count"] for item in qs})
-        
-        return Response(result)
+
+class JobSummaryView(generics.GenericAPIView):
+    permission_classes = [permissions.IsAuthenticated, IsEmailVerified]
+
+    def get(self, request, *args, **kwargs):
+        return Response(counters.get_counts(request.user.id))
+
+
+class JobLoadView(generics.GenericAPIView):
+    # Lets clients back off before their submissions are refused.
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        return Response(admission.get_load())
+
+
+class DeadLetterListView(generics.ListAPIView):
+    serializer_class = DeadLetterSerializer
+    permission_classes = [permissions.IsAuthenticated, IsEmailVerified]
+    pagination_class = JobCursorPagination
+
+    def get_queryset(self):
+        return DeadLetter.objects.filter(user=self.request.user).select_related('job')
+
+
+class DeadLetterReplayView(generics.GenericAPIView):
+    permission_classes = [permissions.IsAuthenticated, IsEmailVerified]
+
+    def post(self, request, *args, **kwargs):
+        serializer = DeadLetterReplaySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        dead_letters = DeadLetter.objects.filter(user=request.user)
+        if "job_ids" in serializer.validated_data:
+            dead_letters = dead_letters.filter(job_id__in=serializer.validated_data["job_ids"])
+        outcomes = transitions.replay_many(dead_letters.values_list('job_id', flat=True))
+
+        replayed = sorted(job_id for job_id, won in outcomes.items() if won)
+        return Response({"replayed": len(replayed), "job_ids": replayed})
+
+
+class EventStreamRenderer(renderers.BaseRenderer):
+    # Only error responses go through the renderer; the stream itself is
+    # written by jobs.events.
+    media_type = 'text/event-stream'
+    format = 'sse'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return f"event: error\ndata: {json.dumps(data)}\n\n".encode()
+
+
+class EventStreamUnavailable(exceptions.APIException):
+    status_code = status.HTTP_501_NOT_IMPLEMENTED
+    default_detail = "The job event stream is only served over ASGI."
+    default_code = 'event_stream_unavailable'
+
+
+class JobEventsView(generics.GenericAPIView):
+    permission_classes = [permissions.IsAuthenticated, IsEmailVerified]
+    renderer_classes = [EventStreamRenderer, renderers.JSONRenderer]
+
+    def get(self, request, *args, **kwargs):
+        # Under WSGI Django would drain the endless stream into a list and
+        # never answer, so refuse instead.
+        if not isinstance(request._request, ASGIRequest):
+            raise EventStreamUnavailable()
+        # The async stream is iterated by the ASGI server's event loop, so an
+        # open connection does not hold a worker thread.
+        response = StreamingHttpResponse(events.stream(request.user.id), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response